@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Sun Oct 18 17:48:26 2026
+
+@author: mrutala
+
+Body-fixed (IAU_<body>) rotations for whole arrays of epochs, built with
+NumPy from the orientation constants in a text PCK (e.g. the pck00011.tpc
+fetched by get_GenericKernels), plus batched conversions between
+rectangular, spherical and latitudinal coordinates.
+
+The orientation model is the IAU one used by SPICE (see the PCK Required
+Reading, https://naif.jpl.nasa.gov/pub/naif/toolkit_docs/C/req/pck.html):
+the pole right ascension and declination are quadratics in Julian
+centuries past J2000, the prime meridian angle W is a quadratic in days,
+and each has a sum of trigonometric terms in the system's nutation and
+precession angles. The J2000 -> body-fixed rotation is then
+    [W]_3 [pi/2 - DEC]_1 [pi/2 + RA]_3
+which, with its time derivative, is what pxform and sxform return for an
+IAU_<body> frame; both are written out element by element, so building
+them for a million epochs is a handful of array operations. Only constants
+relative to J2000 are supported.
+'''
+
+import numpy as np
+
+try:
+    from .metakernel_reader import parse_TextKernelData
+except ImportError:
+    from metakernel_reader import parse_TextKernelData
+
+SECONDS_PER_DAY = 86400.
+SECONDS_PER_CENTURY = 36525. * SECONDS_PER_DAY
+
+def _polynomial(coefficients, t):
+    #  The polynomial in t with coefficients (lowest order first), and its
+    #  derivative with respect to t, by Horner's method
+    value = np.zeros_like(t)
+    derivative = np.zeros_like(t)
+    for coefficient in coefficients[::-1]:
+        derivative = derivative * t + value
+        value = value * t + coefficient
+    return(value, derivative)
+
+class BodyOrientations:
+    """
+    The orientation models of every body in the text PCK at filepath
+    """
+    def __init__(self, filepath):
+        with open(filepath) as f:
+            self.variables = parse_TextKernelData(f.read())
+
+    def _get(self, body, item, default=None):
+        values = self.variables.get('BODY{}_{}'.format(body, item))
+        if values is None:
+            return(default)
+        return(np.array(values, dtype=np.float64))
+
+    def _nutation_Angles(self, body, ets, used):
+        #  The nutation/precession angles (radians) of body's system with
+        #  indices used, and their rates (radians/s), each of shape
+        #  (len(used), n_epochs)
+        system = body // 100 if 100 <= body < 1000 else body
+        angles = self._get(system, 'NUT_PREC_ANGLES')
+        if angles is None:
+            raise ValueError('No nutation/precession angles for body {} in this PCK'.format(system))
+        degree = int(self._get(system, 'MAX_PHASE_DEGREE', [1])[0])
+        angles = angles.reshape(-1, degree + 1)[used]
+        t = ets / SECONDS_PER_CENTURY
+        value, derivative = zip(*[_polynomial(row, t) for row in angles])
+        return(np.radians(np.array(value)), np.radians(np.array(derivative)) / SECONDS_PER_CENTURY)
+
+    def get_EulerAngles(self, body, ets):
+        """
+        The pole right ascension, declination and prime meridian angle of
+        body (a NAIF ID) at each of ets, and their rates, as two (3,
+        n_epochs) arrays in radians and radians/s
+        """
+        body = int(body)
+        reference = self.variables.get('BODY{}_CONSTANTS_REF_FRAME'.format(body))
+        if reference is not None and int(reference[0]) != 1:
+            raise ValueError('Body {} orientation constants are not relative to J2000'.format(body))
+        ra = self._get(body, 'POLE_RA')
+        dec = self._get(body, 'POLE_DEC')
+        pm = self._get(body, 'PM')
+        if ra is None or dec is None or pm is None:
+            raise ValueError('No orientation model for body {} in this PCK'.format(body))
+
+        ets = np.asarray(ets, dtype=np.float64)
+        t, d = ets / SECONDS_PER_CENTURY, ets / SECONDS_PER_DAY
+        ra_value, ra_rate = _polynomial(ra, t)
+        dec_value, dec_rate = _polynomial(dec, t)
+        pm_value, pm_rate = _polynomial(pm, d)
+        ra_rate, dec_rate, pm_rate = ra_rate / SECONDS_PER_CENTURY, dec_rate / SECONDS_PER_CENTURY, pm_rate / SECONDS_PER_DAY
+
+        #  Trigonometric terms, evaluating only the angles this body uses
+        terms = [(self._get(body, 'NUT_PREC_RA'), ra_value, ra_rate, True),
+                 (self._get(body, 'NUT_PREC_DEC'), dec_value, dec_rate, False),
+                 (self._get(body, 'NUT_PREC_PM'), pm_value, pm_rate, True)]
+        used = sorted(set(i for coefficients, _, _, _ in terms if coefficients is not None
+                          for i in np.nonzero(coefficients)[0]))
+        if len(used) > 0:
+            angles, angle_rates = self._nutation_Angles(body, ets, used)
+            sines, cosines = np.sin(angles), np.cos(angles)
+            for coefficients, value, rate, is_sine in terms:
+                if coefficients is None:
+                    continue
+                coefficients = np.pad(coefficients, (0, max(0, used[-1] + 1 - len(coefficients))))[used]
+                if is_sine:
+                    value += coefficients @ sines
+                    rate += coefficients @ (cosines * angle_rates)
+                else:
+                    value += coefficients @ cosines
+                    rate -= coefficients @ (sines * angle_rates)
+
+        values = np.radians(np.array([ra_value, dec_value, np.mod(pm_value, 360.)]))
+        rates = np.radians(np.array([ra_rate, dec_rate, pm_rate]))
+        return(values, rates)
+
+    def get_Rotations(self, body, ets, derivatives=False):
+        """
+        The rotations from J2000 to IAU_<body> at each of ets, as an
+        (n_epochs, 3, 3) array (as pxform), and, if derivatives, their time
+        derivatives too
+        """
+        (ra, dec, w), (ra_rate, dec_rate, w_rate) = self.get_EulerAngles(body, np.atleast_1d(ets))
+        #  [W]_3 [x]_1 [z]_3 written out, with x = pi/2 - DEC, z = pi/2 + RA
+        cw, sw = np.cos(w), np.sin(w)
+        cx, sx = np.sin(dec), np.cos(dec)
+        cz, sz = -np.sin(ra), np.cos(ra)
+        rotations = np.empty((len(w), 3, 3))
+        rotations[:, 0, 0] = cw*cz - sw*cx*sz
+        rotations[:, 0, 1] = cw*sz + sw*cx*cz
+        rotations[:, 0, 2] = sw*sx
+        rotations[:, 1, 0] = -sw*cz - cw*cx*sz
+        rotations[:, 1, 1] = -sw*sz + cw*cx*cz
+        rotations[:, 1, 2] = cw*sx
+        rotations[:, 2, 0] = sx*sz
+        rotations[:, 2, 1] = -sx*cz
+        rotations[:, 2, 2] = cx
+        if not derivatives:
+            return(rotations)
+
+        #  The sum of the partial derivatives with respect to each angle,
+        #  times that angle's rate (dx/dt = -dDEC/dt, dz/dt = dRA/dt)
+        x_rate = -dec_rate
+        drotations = np.empty((len(w), 3, 3))
+        drotations[:, 0, 0] = (-sw*cz - cw*cx*sz)*w_rate + sw*sx*sz*x_rate + (-cw*sz - sw*cx*cz)*ra_rate
+        drotations[:, 0, 1] = (-sw*sz + cw*cx*cz)*w_rate - sw*sx*cz*x_rate + (cw*cz - sw*cx*sz)*ra_rate
+        drotations[:, 0, 2] = cw*sx*w_rate + sw*cx*x_rate
+        drotations[:, 1, 0] = (-cw*cz + sw*cx*sz)*w_rate + cw*sx*sz*x_rate + (sw*sz - cw*cx*cz)*ra_rate
+        drotations[:, 1, 1] = (-cw*sz - sw*cx*cz)*w_rate - cw*sx*cz*x_rate + (-sw*cz - cw*cx*sz)*ra_rate
+        drotations[:, 1, 2] = -sw*sx*w_rate + cw*cx*x_rate
+        drotations[:, 2, 0] = cx*sz*x_rate + sx*cz*ra_rate
+        drotations[:, 2, 1] = -cx*cz*x_rate + sx*sz*ra_rate
+        drotations[:, 2, 2] = -sx*x_rate
+        return(rotations, drotations)
+
+    def get_StateTransformations(self, body, ets):
+        """
+        The (n_epochs, 6, 6) state transformations from J2000 to
+        IAU_<body> at each of ets, as sxform
+        """
+        rotations, drotations = self.get_Rotations(body, ets, derivatives=True)
+        transformations = np.zeros((len(rotations), 6, 6))
+        transformations[:, :3, :3] = rotations
+        transformations[:, 3:, 3:] = rotations
+        transformations[:, 3:, :3] = drotations
+        return(transformations)
+
+    def to_BodyFixed(self, body, ets, states):
+        """
+        J2000 positions (..., n_epochs, 3) or states (..., n_epochs, 6) at
+        ets, e.g. from ephemeris.get_States, rotated into IAU_<body>
+        """
+        states = np.asarray(states, dtype=np.float64)
+        if states.shape[-1] == 3:
+            return(np.einsum('nij,...nj->...ni', self.get_Rotations(body, ets), states))
+        rotations, drotations = self.get_Rotations(body, ets, derivatives=True)
+        result = np.empty_like(states)
+        result[..., :3] = np.einsum('nij,...nj->...ni', rotations, states[..., :3])
+        result[..., 3:] = (np.einsum('nij,...nj->...ni', drotations, states[..., :3])
+                           + np.einsum('nij,...nj->...ni', rotations, states[..., 3:]))
+        return(result)
+
+    def from_BodyFixed(self, body, ets, states):
+        """
+        IAU_<body> positions or states at ets rotated back into J2000
+        """
+        states = np.asarray(states, dtype=np.float64)
+        if states.shape[-1] == 3:
+            return(np.einsum('nji,...nj->...ni', self.get_Rotations(body, ets), states))
+        rotations, drotations = self.get_Rotations(body, ets, derivatives=True)
+        result = np.empty_like(states)
+        result[..., :3] = np.einsum('nji,...nj->...ni', rotations, states[..., :3])
+        result[..., 3:] = (np.einsum('nji,...nj->...ni', drotations, states[..., :3])
+                           + np.einsum('nji,...nj->...ni', rotations, states[..., 3:]))
+        return(result)
+
+#  Coordinate conversions, over the last axis of arrays of any shape. Angles
+#  are in radians, and follow SPICE's recsph/reclat conventions
+
+def rectangular_to_Spherical(xyz):
+    """
+    (r, colatitude, longitude) from (x, y, z), as recsph
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    rho = np.hypot(x, y)
+    return(np.stack([np.hypot(rho, z), np.arctan2(rho, z), np.arctan2(y, x)], axis=-1))
+
+def spherical_to_Rectangular(spherical):
+    """
+    (x, y, z) from (r, colatitude, longitude), as sphrec
+    """
+    spherical = np.asarray(spherical, dtype=np.float64)
+    r, colatitude, longitude = spherical[..., 0], spherical[..., 1], spherical[..., 2]
+    rho = r * np.sin(colatitude)
+    return(np.stack([rho * np.cos(longitude), rho * np.sin(longitude), r * np.cos(colatitude)], axis=-1))
+
+def rectangular_to_Latitudinal(xyz):
+    """
+    (r, longitude, latitude) from (x, y, z), as reclat
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    rho = np.hypot(x, y)
+    return(np.stack([np.hypot(rho, z), np.arctan2(y, x), np.arctan2(z, rho)], axis=-1))
+
+def latitudinal_to_Rectangular(latitudinal):
+    """
+    (x, y, z) from (r, longitude, latitude), as latrec
+    """
+    latitudinal = np.asarray(latitudinal, dtype=np.float64)
+    r, longitude, latitude = latitudinal[..., 0], latitudinal[..., 1], latitudinal[..., 2]
+    rho = r * np.cos(latitude)
+    return(np.stack([rho * np.cos(longitude), rho * np.sin(longitude), r * np.sin(latitude)], axis=-1))
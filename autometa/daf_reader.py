@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Thu Oct 15 15:26:41 2026
+
+@author: mrutala
+
+A pure-Python reader for NAIF's Double precision Array Files (DAF), the
+format of binary SPKs, CKs and PCKs. Files are memory-mapped, and only the
+file record and the summary/name records are touched, so indexing what a
+multi-GB SPK contains costs a few kB of reads rather than loading it into
+SPICE.
+
+The layout is described in NAIF's DAF Required Reading:
+https://naif.jpl.nasa.gov/pub/naif/toolkit_docs/C/req/daf.html
+
+Segment indexes are cached (see SegmentIndex), keyed by each file's path,
+size and mtime, so re-indexing a kernel directory after a sync only reads
+the files which are new or have changed.
+'''
+
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+RECORD_BYTES = 1024
+
+#  The summary of one SPK segment. ETs are TDB seconds past J2000; begin and
+#  end are the 1-based double precision addresses of the segment's data
+SPKSegment = namedtuple('SPKSegment', ['target', 'center', 'frame', 'type', 'start_et', 'stop_et',
+                                       'begin', 'end', 'name'])
+
+class DAFError(Exception):
+    """
+    The file isn't a (readable) DAF
+    """
+    pass
+
+class DAFFile:
+    """
+    A memory-mapped DAF. Use as a context manager:
+        >>> with DAFFile('de440s.bsp') as daf:
+        ...     for name, dc, ic in daf.summaries():
+        ...         ...
+    """
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        self._file = open(self.filepath, 'rb')
+        try:
+            self.map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise DAFError('{} is empty'.format(self.filepath))
+        try:
+            self._read_FileRecord()
+        except:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.map.close()
+        self._file.close()
+
+    def _read_FileRecord(self):
+        if len(self.map) < RECORD_BYTES:
+            raise DAFError('{} is too short to be a DAF'.format(self.filepath))
+        record = self.map[:RECORD_BYTES]
+
+        self.id_word = record[0:8].decode('latin-1').strip()
+        if not self.id_word.startswith('DAF/') and self.id_word != 'NAIF/DAF':
+            raise DAFError('{} is not a binary DAF (ID word {!r})'.format(self.filepath, self.id_word))
+
+        #  Files from before 1995 lack the binary format string; for those,
+        #  take whichever byte order gives a sensible ND
+        binary_format = record[88:96].decode('latin-1')
+        if binary_format == 'BIG-IEEE':
+            self.endian = '>'
+        elif binary_format == 'LTL-IEEE':
+            self.endian = '<'
+        else:
+            nd = struct.unpack('<i', record[8:12])[0]
+            self.endian = '<' if 0 <= nd <= 124 else '>'
+
+        self.nd, self.ni = struct.unpack(self.endian + '2i', record[8:16])
+        self.internal_filename = record[16:76].decode('latin-1').strip()
+        self.fward, self.bward, self.free = struct.unpack(self.endian + '3i', record[76:88])
+
+        #  Size of one summary, in doubles, and of one name, in characters
+        self.ss = self.nd + (self.ni + 1) // 2
+        self.nc = 8 * self.ss
+
+    def read_Record(self, recno):
+        """
+        The raw bytes of 1-based record recno
+        """
+        start = (recno - 1) * RECORD_BYTES
+        if recno < 1 or start + RECORD_BYTES > len(self.map):
+            raise DAFError('{}: record {} is out of range'.format(self.filepath, recno))
+        return(self.map[start:start + RECORD_BYTES])
+
+    def summaries(self):
+        """
+        Yield (name, double components, integer components) for each array
+        in the file, in file order, by walking the summary records
+        """
+        recno = self.fward
+        seen = set()
+        while recno > 0:
+            if recno in seen:
+                raise DAFError('{}: summary records form a loop'.format(self.filepath))
+            seen.add(recno)
+
+            summary_record = self.read_Record(recno)
+            name_record = self.read_Record(recno + 1)
+            next_recno, _, nsum = struct.unpack(self.endian + '3d', summary_record[:24])
+
+            for i in range(int(nsum)):
+                offset = 24 + i * self.ss * 8
+                dc = struct.unpack(self.endian + '{}d'.format(self.nd),
+                                   summary_record[offset:offset + 8 * self.nd])
+                ic = struct.unpack(self.endian + '{}i'.format(self.ni),
+                                   summary_record[offset + 8 * self.nd:offset + 8 * self.nd + 4 * self.ni])
+                name = name_record[i * self.nc:(i + 1) * self.nc].decode('latin-1').strip()
+                yield (name, dc, ic)
+
+            recno = int(next_recno)
+
+    def read_Doubles(self, begin, end):
+        """
+        A memoryview of the doubles at 1-based addresses begin to end
+        (inclusive), without copying; cast it, or pass it to
+        numpy.frombuffer with the file's byte order, to use it
+        """
+        start = (begin - 1) * 8
+        stop = end * 8
+        if begin < 1 or stop > len(self.map):
+            raise DAFError('{}: addresses {}-{} are out of range'.format(self.filepath, begin, end))
+        return(memoryview(self.map)[start:stop])
+
+def read_SPKSegments(filepath):
+    """
+    The SPKSegment summaries of every segment in the SPK at filepath
+    """
+    with DAFFile(filepath) as daf:
+        if daf.id_word not in ('DAF/SPK', 'NAIF/DAF') or daf.nd != 2 or daf.ni != 6:
+            raise DAFError('{} is not an SPK'.format(filepath))
+        segments = [SPKSegment(ic[0], ic[1], ic[2], ic[3], dc[0], dc[1], ic[4], ic[5], name)
+                    for name, dc, ic in daf.summaries()]
+    return(segments)
+
+class SegmentIndex:
+    """
+    A persistent index of the segments in many SPKs, stored as JSON at
+    index_filepath. Entries are keyed by absolute path and only trusted
+    while the file keeps the size and mtime it had when indexed.
+    """
+    def __init__(self, index_filepath):
+        self.index_filepath = Path(index_filepath)
+        self._lock = threading.Lock()
+        self._changed = False
+        self.entries = dict()
+        if self.index_filepath.exists():
+            try:
+                with open(self.index_filepath) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = dict()
+
+        #  Running totals of files read vs. answered from the index
+        self.reads = 0
+        self.hits = 0
+
+    def get(self, filepath):
+        """
+        The list of SPKSegments in filepath, read from the file only if it
+        isn't already in the index (or has changed since)
+        """
+        filepath = Path(filepath).resolve()
+        key = str(filepath)
+        stat = filepath.stat()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                self.hits += 1
+                return([SPKSegment(*segment) for segment in entry['segments']])
+
+        segments = read_SPKSegments(filepath)
+        with self._lock:
+            self.entries[key] = {'size': stat.st_size, 'mtime': stat.st_mtime,
+                                 'segments': [list(segment) for segment in segments]}
+            self._changed = True
+            self.reads += 1
+        return(segments)
+
+    def prune(self):
+        """
+        Forget files which no longer exist
+        """
+        with self._lock:
+            for key in [key for key in self.entries if not os.path.exists(key)]:
+                del self.entries[key]
+                self._changed = True
+
+    def save(self):
+        with self._lock:
+            if not self._changed:
+                return
+            self.index_filepath.parent.mkdir(parents=True, exist_ok=True)
+            tmp_filepath = self.index_filepath.with_name(self.index_filepath.name + '.tmp')
+            with open(tmp_filepath, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_filepath, self.index_filepath)
+            self._changed = False
+
+SEGMENT_INDEX_FILENAME = '.autometa_segments.json'
+
+def index_SPKs(filepaths, index_filepath):
+    """
+    A dict of filepath: [SPKSegment, ...] for each SPK in filepaths, using
+    (and updating) the SegmentIndex at index_filepath
+    """
+    index = SegmentIndex(index_filepath)
+    result = dict()
+    for filepath in filepaths:
+        result[Path(filepath)] = index.get(filepath)
+    index.save()
+    return(result)
+
+def index_KernelDirectory(directory, namepattern='**/*.bsp'):
+    """
+    Index every SPK under directory matching namepattern, keeping the index
+    in a hidden file in directory. Returns a dict as index_SPKs does.
+    """
+    directory = Path(directory)
+    filepaths = sorted(f for f in directory.glob(namepattern)
+                       if not f.name.startswith('.') and f.is_file())
+    return(index_SPKs(filepaths, directory / SEGMENT_INDEX_FILENAME))
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Sun Oct 18 09:41:17 2026
+
+@author: mrutala
+
+Batch ephemeris queries: the states (or positions) of many targets at many
+epochs in one call, returned as a single (n_targets, n_epochs, 6) array.
+
+spice.spkezr and spice.spkpos accept lists of ETs, but build a Python list
+of small arrays (one per epoch) which then has to be stacked, and check the
+SPICE error state after every epoch. Here each result is written by CSPICE
+directly into a preallocated NumPy array, and errors are checked once per
+target, which matters when sweeping tens of bodies over millions of epochs.
+
+That needs spiceypy's handle on the CSPICE library and its error check,
+which are internal to spiceypy (tested with spiceypy 8). If a spiceypy
+release moves them, the same results come from its public API instead,
+only more slowly.
+'''
+
+import ctypes
+from contextlib import contextmanager
+
+import numpy as np
+
+@contextmanager
+def furnished(metakernel=None):
+    """
+    Furnish metakernel for the duration of a with block, then unload it
+    again (leaving any other loaded kernels alone). If metakernel is None,
+    whatever is already loaded is used.
+    """
+    import spiceypy as spice
+    if metakernel is None:
+        yield
+        return
+    spice.furnsh(str(metakernel))
+    try:
+        yield
+    finally:
+        spice.unload(str(metakernel))
+
+def _as_ETs(ets):
+    ets = np.ascontiguousarray(ets, dtype=np.float64)
+    if ets.ndim != 1:
+        ets = ets.reshape(-1)
+    return(ets)
+
+def _as_Output(out, shape, name):
+    if out is None:
+        return(np.empty(shape, dtype=np.float64))
+    if out.shape != shape or out.dtype != np.float64 or not out.flags['C_CONTIGUOUS']:
+        raise ValueError('{} must be a C-contiguous float64 array of shape {}'.format(name, shape))
+    return(out)
+
+def _get_LibSPICE(function):
+    #  spiceypy's ctypes function for CSPICE's function, and its error check,
+    #  or None if this spiceypy doesn't have them where we expect
+    try:
+        from spiceypy.utils.libspicehelper import libspice
+        from spiceypy.spiceypy import check_for_spice_error
+        return(getattr(libspice, function), check_for_spice_error)
+    except (ImportError, AttributeError):
+        return(None)
+
+def _evaluate_Public(function, targets, observer, frame, ets, abcorr, out, lighttimes):
+    #  As _evaluate, through spiceypy's public API (which loops over ets)
+    import spiceypy as spice
+    public_function = {'spkezr_c': spice.spkezr, 'spkpos_c': spice.spkpos}[function]
+    for i, target in enumerate(targets):
+        if len(ets) == 0:
+            break
+        values, lts = public_function(target, ets, frame, abcorr, observer)
+        out[i] = values
+        if lighttimes is not None and lighttimes is not False:
+            lighttimes[i] = lts
+
+def _evaluate(function, size, metakernel, targets, observer, frame, ets, abcorr, out, lighttimes):
+    if type(targets) in (str, int):
+        targets = [targets]
+    targets = [str(target) for target in targets]
+    ets = _as_ETs(ets)
+    n_targets, n_epochs = len(targets), len(ets)
+
+    out = _as_Output(out, (n_targets, n_epochs, size), 'out')
+    if lighttimes is True:
+        lighttimes = np.empty((n_targets, n_epochs), dtype=np.float64)
+    elif lighttimes is not False and lighttimes is not None:
+        lighttimes = _as_Output(lighttimes, (n_targets, n_epochs), 'lighttimes')
+
+    libspice_function = _get_LibSPICE(function)
+    if libspice_function is None:
+        with furnished(metakernel):
+            _evaluate_Public(function, targets, str(observer), str(frame), ets, str(abcorr), out, lighttimes)
+        if lighttimes is None or lighttimes is False:
+            return(out)
+        return(out, lighttimes)
+
+    spkfunc, check_for_spice_error = libspice_function
+    targets = [target.encode('ascii') for target in targets]
+    observer = str(observer).encode('ascii')
+    frame = str(frame).encode('ascii')
+    abcorr = str(abcorr).encode('ascii')
+    lt = ctypes.c_double()
+    lt_ref = ctypes.byref(lt)
+    et_list = ets.tolist()
+
+    with furnished(metakernel):
+        for i, target in enumerate(targets):
+            if n_epochs == 0:
+                break
+            #  A ctypes view of this target's rows, so that CSPICE writes each
+            #  result straight into out
+            rows = (ctypes.c_double * size * n_epochs).from_buffer(out[i])
+            if lighttimes is None or lighttimes is False:
+                for j, et in enumerate(et_list):
+                    spkfunc(target, et, frame, abcorr, observer, rows[j], lt_ref)
+            else:
+                lt_row = lighttimes[i]
+                for j, et in enumerate(et_list):
+                    spkfunc(target, et, frame, abcorr, observer, rows[j], lt_ref)
+                    lt_row[j] = lt.value
+            #  SPICE is in RETURN mode, so after an error every later call in
+            #  the loop returns at once; one check per target is enough
+            del rows
+            check_for_spice_error(None)
+
+    if lighttimes is None or lighttimes is False:
+        return(out)
+    return(out, lighttimes)
+
+def get_States(metakernel, targets, observer, frame, ets, abcorr='NONE', out=None, lighttimes=False):
+    """
+    The states (x, y, z, vx, vy, vz, in km and km/s) of each of targets
+    relative to observer, in frame, at each of ets (TDB seconds past J2000),
+    as an array of shape (n_targets, n_epochs, 6). Targets and observer may
+    be NAIF names or integer IDs. metakernel is furnished for the call and
+    unloaded afterwards; pass None to use the kernels already loaded.
+
+    To reuse a buffer between calls, pass it as out. If lighttimes is True
+    (or an (n_targets, n_epochs) array to fill), the one-way light times
+    are returned too, as (states, lighttimes).
+    """
+    return(_evaluate('spkezr_c', 6, metakernel, targets, observer, frame, ets, abcorr, out, lighttimes))
+
+def get_Positions(metakernel, targets, observer, frame, ets, abcorr='NONE', out=None, lighttimes=False):
+    """
+    As get_States, but only positions (x, y, z, in km), in an array of
+    shape (n_targets, n_epochs, 3)
+    """
+    return(_evaluate('spkpos_c', 3, metakernel, targets, observer, frame, ets, abcorr, out, lighttimes))
+
+def _evaluate_Frames(function, size, metakernel, from_frame, to_frame, ets, out):
+    ets = _as_ETs(ets)
+    n_epochs = len(ets)
+    out = _as_Output(out, (n_epochs, size, size), 'out')
+
+    libspice_function = _get_LibSPICE(function)
+    if libspice_function is None:
+        #  spiceypy's pxform and sxform take one epoch at a time
+        import spiceypy as spice
+        public_function = {'pxform_c': spice.pxform, 'sxform_c': spice.sxform}[function]
+        with furnished(metakernel):
+            for j, et in enumerate(ets.tolist()):
+                out[j] = public_function(str(from_frame), str(to_frame), et)
+        return(out)
+
+    framefunc, check_for_spice_error = libspice_function
+    from_frame = str(from_frame).encode('ascii')
+    to_frame = str(to_frame).encode('ascii')
+
+    with furnished(metakernel):
+        if n_epochs > 0:
+            matrices = (ctypes.c_double * size * size * n_epochs).from_buffer(out)
+            for j, et in enumerate(ets.tolist()):
+                framefunc(from_frame, to_frame, et, matrices[j])
+            del matrices
+            check_for_spice_error(None)
+    return(out)
+
+def get_Rotations(metakernel, from_frame, to_frame, ets, out=None):
+    """
+    The rotation matrices from from_frame to to_frame at each of ets, as
+    pxform, in an array of shape (n_epochs, 3, 3)
+    """
+    return(_evaluate_Frames('pxform_c', 3, metakernel, from_frame, to_frame, ets, out))
+
+def get_StateTransformations(metakernel, from_frame, to_frame, ets, out=None):
+    """
+    The state transformation matrices from from_frame to to_frame at each
+    of ets, as sxform, in an array of shape (n_epochs, 6, 6)
+    """
+    return(_evaluate_Frames('sxform_c', 6, metakernel, from_frame, to_frame, ets, out))
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Sun Oct 18 13:20:51 2026
+
+@author: mrutala
+
+An on-disk cache of ephemeris results, so that analyses which evaluate the
+same trajectories on every run (e.g. Voyager 1 relative to the SSB every 10
+days since launch) only compute them once.
+
+Each result is one .npy file, keyed by the query (target, observer, frame,
+aberration correction and the ET grid itself) and by a fingerprint of the
+kernels the metakernel loads. The fingerprint covers each kernel's path,
+size, mtime and inode, so when a sync replaces or adds a kernel, queries
+against that metakernel simply stop matching the old entries, which age out
+of the cache. Hits are memory-mapped rather than read, and the cache is kept
+under a size limit by evicting the least recently used entries.
+
+Results are read-only: a single target's cached result is returned as a
+view of its memory map, so writing to it would write to the cache. Copy a
+result (np.array(result)) before modifying it.
+'''
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from .ephemeris import get_States, get_Positions
+    from .metakernel_reader import read_Metakernel
+except ImportError:
+    from ephemeris import get_States, get_Positions
+    from metakernel_reader import read_Metakernel
+
+def default_CacheDirectory():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return(Path(cache_home) / 'autometa' / 'ephemeris')
+
+def fingerprint_Kernels(filepaths):
+    """
+    A hash identifying the current version of each of filepaths, in order,
+    from their paths and stat results (not their contents, so it's cheap)
+    """
+    h = hashlib.sha256()
+    for filepath in filepaths:
+        filepath = Path(filepath).resolve()
+        try:
+            stat = filepath.stat()
+            h.update('{}\0{}\0{}\0{}\n'.format(filepath, stat.st_size, stat.st_mtime_ns, stat.st_ino).encode('utf-8'))
+        except OSError:
+            h.update('{}\0missing\n'.format(filepath).encode('utf-8'))
+    return(h.hexdigest())
+
+def fingerprint_Metakernel(metakernel):
+    """
+    A hash of the metakernel at metakernel and every kernel it loads
+    """
+    metakernel = Path(metakernel)
+    return(fingerprint_Kernels([metakernel] + read_Metakernel(metakernel)))
+
+class EphemerisCache:
+    """
+    Cached ephemeris results in cache_dir (by default, default_CacheDirectory()),
+    kept to at most max_bytes on disk
+    """
+    def __init__(self, cache_dir=None, max_bytes=2*1024**3):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_CacheDirectory()
+        self.max_bytes = max_bytes
+
+        #  Running totals of (per-target) results found vs. computed
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, kind, fingerprint, target, observer, frame, abcorr, ets_digest):
+        query = json.dumps([kind, fingerprint, str(target), str(observer), str(frame).upper(),
+                            str(abcorr).upper(), ets_digest])
+        return(hashlib.sha256(query.encode('utf-8')).hexdigest())
+
+    def _entry_path(self, key):
+        return(self.cache_dir / (key + '.npy'))
+
+    def load(self, key):
+        """
+        The cached array for key, memory-mapped, or None
+        """
+        filepath = self._entry_path(key)
+        try:
+            array = np.load(filepath, mmap_mode='r')
+        except (OSError, ValueError):
+            return(None)
+        #  Mark it as recently used
+        try:
+            os.utime(filepath)
+        except OSError:
+            pass
+        return(array)
+
+    def _write(self, key, array):
+        #  Written under a name of its own (other threads or processes may
+        #  be storing the same key) and then renamed into place
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=key + '.', suffix='.tmp', delete=False) as f:
+            try:
+                np.save(f, np.ascontiguousarray(array))
+            except BaseException:
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, self._entry_path(key))
+
+    def store(self, key, array):
+        self._write(key, array)
+        self.evict()
+
+    def evict(self, max_bytes=None):
+        """
+        Delete the least recently used entries until the cache holds at
+        most max_bytes (by default, self.max_bytes)
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = list()
+        for filepath in self.cache_dir.glob('*.npy'):
+            try:
+                stat = filepath.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filepath))
+        total = sum(entry[1] for entry in entries)
+        for mtime, size, filepath in sorted(entries):
+            if total <= max_bytes:
+                break
+            filepath.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        self.evict(max_bytes=0)
+
+    def _query(self, kind, size, metakernel, targets, observer, frame, ets, abcorr):
+        if type(targets) in (str, int):
+            targets = [targets]
+        ets = np.ascontiguousarray(ets, dtype=np.float64).reshape(-1)
+        ets_digest = hashlib.sha256(ets.tobytes()).hexdigest()
+        fingerprint = fingerprint_Metakernel(metakernel)
+
+        keys = [self._key(kind, fingerprint, target, observer, frame, abcorr, ets_digest) for target in targets]
+        entries = list()
+        missing = list()
+        for i, key in enumerate(keys):
+            cached = self.load(key)
+            if cached is not None and cached.shape == (len(ets), size):
+                entries.append(cached)
+                self.hits += 1
+            else:
+                entries.append(None)
+                missing.append(i)
+                self.misses += 1
+
+        if len(missing) > 0:
+            evaluate = get_States if kind == 'states' else get_Positions
+            results = evaluate(metakernel, [targets[i] for i in missing], observer, frame, ets, abcorr=abcorr)
+            for result, i in zip(results, missing):
+                entries[i] = result
+                self._write(keys[i], result)
+            self.evict()
+
+        #  A single target's result is returned without copying it (for a
+        #  hit, straight from its memory map); several have to be stacked
+        if len(entries) == 1:
+            out = entries[0][np.newaxis]
+        else:
+            out = np.stack(entries)
+        out.flags.writeable = False
+        return(out)
+
+    def get_States(self, metakernel, targets, observer, frame, ets, abcorr='NONE'):
+        """
+        As ephemeris.get_States, but answered from the cache where possible
+        (each target is cached separately). The result is read-only.
+        """
+        return(self._query('states', 6, metakernel, targets, observer, frame, ets, abcorr))
+
+    def get_Positions(self, metakernel, targets, observer, frame, ets, abcorr='NONE'):
+        """
+        As ephemeris.get_Positions, but answered from the cache where possible.
+        The result is read-only.
+        """
+        return(self._query('positions', 3, metakernel, targets, observer, frame, ets, abcorr))
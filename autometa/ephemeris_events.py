@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Sun Oct 18 15:12:09 2026
+
+@author: mrutala
+
+Finding geometric events (closest approaches, periapses and apoapses, and
+crossings of a distance threshold) without sampling everything densely.
+
+Each search evaluates the geometry on a coarse grid of ETs, brackets the
+events on it (sign changes of the range rate, or of the distance minus the
+threshold), then refines every bracket at once with a vectorized Illinois
+(regula falsi) root finder, so each iteration is a single batch ephemeris
+call. The range rate comes from the states themselves, so no numerical
+derivatives are needed. The coarse step only has to be short enough that
+no two events of the same kind fall within one step (e.g. less than half an
+orbital period for periapses, or 10 days for planetary flybys).
+
+By default the geometry is evaluated with ephemeris.get_States, with the
+metakernel furnished for the duration of the search. Any function with the
+signature evaluate(targets, observer, frame, ets) returning an (n_targets,
+n_epochs, 6) array can be passed instead, such as the get_States method of
+an SPKEphemeris or an EphemerisPool.
+
+All times are ETs (TDB seconds past J2000), and distances are in km.
+'''
+
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    from .ephemeris import furnished, get_States
+except ImportError:
+    from ephemeris import furnished, get_States
+
+@contextmanager
+def _evaluator(metakernel, evaluate, abcorr):
+    if evaluate is not None:
+        yield evaluate
+        return
+    with furnished(metakernel):
+        yield (lambda targets, observer, frame, ets: get_States(None, targets, observer, frame, ets, abcorr=abcorr))
+
+def _distance_Functions(evaluate, target, observer, frame):
+    #  Functions of an ET array giving the distance and range rate
+    def distance_and_rate(ets):
+        states = evaluate([target], observer, frame, np.asarray(ets, dtype=np.float64))[0]
+        distance = np.sqrt(np.sum(states[:, :3]**2, axis=1))
+        rate = np.sum(states[:, :3] * states[:, 3:], axis=1) / distance
+        return(distance, rate)
+    return(distance_and_rate)
+
+def _coarse_Grid(start, stop, step):
+    ets = np.arange(start, stop, step, dtype=np.float64)
+    if len(ets) == 0 or ets[-1] < stop:
+        ets = np.append(ets, float(stop))
+    return(ets)
+
+def find_Roots(function, a, b, fa, fb, tolerance=1e-3, max_iterations=100):
+    """
+    Roots of function (which takes and returns arrays) in each bracket
+    [a[i], b[i]], where fa and fb (function at a and b) differ in sign, all
+    refined together with the Illinois method, to within tolerance
+    """
+    a, b = np.array(a, dtype=np.float64), np.array(b, dtype=np.float64)
+    fa, fb = np.array(fa, dtype=np.float64), np.array(fb, dtype=np.float64)
+    roots = np.where(fa == 0, a, np.where(fb == 0, b, 0.5 * (a + b)))
+    side = np.zeros(len(a), dtype=np.int8)
+    active = (fa != 0) & (fb != 0) & (b - a > tolerance)
+
+    for iteration in range(max_iterations):
+        index = np.nonzero(active)[0]
+        if len(index) == 0:
+            break
+        ai, bi, fai, fbi = a[index], b[index], fa[index], fb[index]
+        c = (ai * fbi - bi * fai) / (fbi - fai)
+        #  Guard against round-off pushing the guess outside the bracket
+        outside = ~((c > ai) & (c < bi))
+        c[outside] = 0.5 * (ai + bi)[outside]
+        fc = function(c)
+
+        step = np.abs(c - roots[index])
+        roots[index] = c
+        same = np.sign(fc) == np.sign(fai)
+        #  Root in [c, b]: move a; if a moved last time too, halve f(b)
+        moved = index[same]
+        fb[moved[side[moved] == -1]] *= 0.5
+        a[moved], fa[moved], side[moved] = c[same], fc[same], -1
+        #  Root in [a, c]: move b; if b moved last time too, halve f(a)
+        moved = index[~same]
+        fa[moved[side[moved] == 1]] *= 0.5
+        b[moved], fb[moved], side[moved] = c[~same], fc[~same], 1
+
+        finished = (fc == 0) | (b[index] - a[index] < tolerance) | (step < tolerance)
+        active[index[finished]] = False
+    return(roots)
+
+def find_DistanceExtrema(metakernel, target, observer, start, stop, step, kind='minimum', frame='J2000',
+                         abcorr='NONE', tolerance=1e-3, evaluate=None):
+    """
+    The local minima (kind='minimum') or maxima (kind='maximum') of the
+    distance between target and observer between start and stop, found on a
+    coarse grid of step seconds and refined to within tolerance seconds.
+    Returns (ets, distances) arrays. For an orbiter relative to its central
+    body these are the periapses and apoapses; for a flyby, the closest
+    approach.
+    """
+    with _evaluator(metakernel, evaluate, abcorr) as evaluate:
+        distance_and_rate = _distance_Functions(evaluate, target, observer, frame)
+        ets = _coarse_Grid(start, stop, step)
+        distance, rate = distance_and_rate(ets)
+
+        #  Minima where the range rate goes from negative to positive
+        if kind == 'minimum':
+            bracketed = (rate[:-1] < 0) & (rate[1:] >= 0)
+        elif kind == 'maximum':
+            bracketed = (rate[:-1] > 0) & (rate[1:] <= 0)
+        else:
+            raise ValueError("kind must be 'minimum' or 'maximum'")
+        index = np.nonzero(bracketed)[0]
+        if len(index) == 0:
+            return(np.empty(0), np.empty(0))
+
+        event_ets = find_Roots(lambda ets: distance_and_rate(ets)[1],
+                               ets[index], ets[index + 1], rate[index], rate[index + 1], tolerance=tolerance)
+        event_distances, _ = distance_and_rate(event_ets)
+    return(event_ets, event_distances)
+
+def find_ClosestApproaches(metakernel, target, observer, start, stop, step, threshold=None, frame='J2000',
+                           abcorr='NONE', tolerance=1e-3, evaluate=None):
+    """
+    The times and distances of target's closest approaches to observer
+    (see find_DistanceExtrema), keeping only those closer than threshold,
+    if given
+    """
+    ets, distances = find_DistanceExtrema(metakernel, target, observer, start, stop, step, kind='minimum',
+                                          frame=frame, abcorr=abcorr, tolerance=tolerance, evaluate=evaluate)
+    if threshold is not None:
+        keep = distances < threshold
+        ets, distances = ets[keep], distances[keep]
+    return(ets, distances)
+
+def find_Periapses(metakernel, target, center, start, stop, step, **kwargs):
+    """
+    The times and distances of target's periapses about center
+    """
+    return(find_DistanceExtrema(metakernel, target, center, start, stop, step, kind='minimum', **kwargs))
+
+def find_Apoapses(metakernel, target, center, start, stop, step, **kwargs):
+    """
+    The times and distances of target's apoapses about center
+    """
+    return(find_DistanceExtrema(metakernel, target, center, start, stop, step, kind='maximum', **kwargs))
+
+def find_DistanceCrossings(metakernel, target, observer, start, stop, step, threshold, frame='J2000',
+                           abcorr='NONE', tolerance=1e-3, evaluate=None):
+    """
+    The times at which the distance between target and observer crosses
+    threshold, and the direction of each crossing (-1 going inside it, +1
+    going outside), as (ets, directions) arrays
+    """
+    with _evaluator(metakernel, evaluate, abcorr) as evaluate:
+        distance_and_rate = _distance_Functions(evaluate, target, observer, frame)
+        ets = _coarse_Grid(start, stop, step)
+        distance, rate = distance_and_rate(ets)
+
+        #  Add the extrema to the grid, so the distance is monotonic between
+        #  grid points and a brief dip inside threshold (e.g. a fast flyby
+        #  between two coarse samples) can't be missed
+        index = np.nonzero(np.sign(rate[:-1]) * np.sign(rate[1:]) < 0)[0]
+        if len(index) > 0:
+            extrema = find_Roots(lambda ets: distance_and_rate(ets)[1],
+                                 ets[index], ets[index + 1], rate[index], rate[index + 1], tolerance=tolerance)
+            ets = np.unique(np.concatenate([ets, extrema]))
+            distance, rate = distance_and_rate(ets)
+        difference = distance - threshold
+
+        index = np.nonzero(np.sign(difference[:-1]) * np.sign(difference[1:]) < 0)[0]
+        if len(index) == 0:
+            return(np.empty(0), np.empty(0, dtype=np.int8))
+        event_ets = find_Roots(lambda ets: distance_and_rate(ets)[0] - threshold,
+                               ets[index], ets[index + 1], difference[index], difference[index + 1],
+                               tolerance=tolerance)
+    directions = np.where(difference[index] > 0, -1, 1).astype(np.int8)
+    return(event_ets, directions)
+
+def find_DistanceWindows(metakernel, target, observer, start, stop, step, threshold, frame='J2000',
+                         abcorr='NONE', tolerance=1e-3, evaluate=None):
+    """
+    The intervals between start and stop during which target is within
+    threshold of observer, as a list of (start, stop) ETs. This replaces
+    finding encounters by thresholding a dense grid of distances.
+    """
+    with _evaluator(metakernel, evaluate, abcorr) as evaluate:
+        crossing_ets, directions = find_DistanceCrossings(None, target, observer, start, stop, step, threshold,
+                                                          frame=frame, tolerance=tolerance, evaluate=evaluate)
+        inside_at_start = (_distance_Functions(evaluate, target, observer, frame)([start])[0][0] < threshold)
+
+    windows = list()
+    window_start = start if inside_at_start else None
+    for et, direction in zip(crossing_ets, directions):
+        if direction < 0:
+            window_start = et
+        elif window_start is not None:
+            windows.append((window_start, et))
+            window_start = None
+    if window_start is not None:
+        windows.append((window_start, stop))
+    return(windows)
+
+def sample_Trajectory(metakernel, target, observer, frame, start, stop, max_step, min_step=1., tolerance=0.01,
+                      abcorr='NONE', evaluate=None):
+    """
+    The states of target relative to observer between start and stop,
+    sampled adaptively: each step is about tolerance times the time the
+    target takes to move its own distance from observer (so the direction
+    to it changes by roughly tolerance radians per step), but no shorter
+    than min_step or longer than max_step seconds. Near a close approach
+    this gives dense sampling; far away, coarse. Returns (ets, states).
+    """
+    with _evaluator(metakernel, evaluate, abcorr) as evaluate:
+        #  Put the closest approaches on the coarse grid, so that the steps
+        #  around them are set by the closest distance, not the grid's
+        ets = _coarse_Grid(start, stop, max_step)
+        minima, _ = find_DistanceExtrema(None, target, observer, start, stop, max_step, kind='minimum',
+                                         frame=frame, evaluate=evaluate)
+        ets = np.unique(np.concatenate([ets, minima]))
+        states = evaluate([target], observer, frame, ets)[0]
+
+        distance = np.sqrt(np.sum(states[:, :3]**2, axis=1))
+        speed = np.sqrt(np.sum(states[:, 3:]**2, axis=1))
+        local_step = np.clip(tolerance * distance / np.maximum(speed, 1e-12), min_step, max_step)
+        interval_step = np.minimum(local_step[:-1], local_step[1:])
+        widths = np.diff(ets)
+        counts = np.maximum(np.ceil(widths / interval_step).astype(np.int64), 1)
+
+        #  Subdivide every interval at once: interval i contributes
+        #  ets[i] + widths[i] * k / counts[i] for k = 0 ... counts[i]-1
+        interval = np.repeat(np.arange(len(widths)), counts)
+        k = np.arange(len(interval)) - np.repeat(np.cumsum(counts) - counts, counts)
+        fine_ets = np.append(ets[interval] + widths[interval] * k / counts[interval], ets[-1])
+        fine_states = evaluate([target], observer, frame, fine_ets)[0]
+    return(fine_ets, fine_states)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Sun Oct 18 14:05:33 2026
+
+@author: mrutala
+
+Evaluating ephemerides on many cores. CSPICE has one global kernel pool and
+isn't thread-safe, so the only way to use more than one core is to use more
+than one process. An EphemerisPool starts its worker processes once, and
+each worker furnishes the metakernel once, when it starts; queries are then
+split into chunks of epochs, and each worker writes its results straight
+into a shared-memory array, so nothing but a few names and indices is
+pickled between processes.
+'''
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+from multiprocessing import shared_memory
+
+import numpy as np
+
+try:
+    from .ephemeris import get_States, get_Positions
+except ImportError:
+    from ephemeris import get_States, get_Positions
+
+def _init_Worker(metakernel):
+    #  Start from an empty kernel pool (a forked worker inherits the
+    #  parent's), then furnish the metakernel for the life of the worker
+    import spiceypy as spice
+    spice.kclear()
+    spice.furnsh(str(metakernel))
+
+def _evaluate_Chunk(kind, out_name, out_shape, ets_name, n_epochs, i, target, observer, frame, abcorr, start, stop):
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    ets_shm = shared_memory.SharedMemory(name=ets_name)
+    try:
+        out = np.ndarray(out_shape, dtype=np.float64, buffer=out_shm.buf)
+        ets = np.ndarray((n_epochs,), dtype=np.float64, buffer=ets_shm.buf)
+        evaluate = get_States if kind == 'states' else get_Positions
+        evaluate(None, [target], observer, frame, ets[start:stop], abcorr=abcorr, out=out[i:i+1, start:stop])
+        del out, ets
+    finally:
+        out_shm.close()
+        ets_shm.close()
+    return(stop - start)
+
+class EphemerisPool:
+    """
+    processes worker processes (by default, one per core), each with
+    metakernel furnished. Use as a context manager:
+        >>> with EphemerisPool(mk_filepath) as pool:
+        ...     states = pool.get_States(['VOYAGER 1', 'JUPITER BARYCENTER'], 'SUN', 'ECLIPJ2000', ets)
+    """
+    def __init__(self, metakernel, processes=None):
+        self.metakernel = metakernel
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_Worker,
+                                             initargs=(str(metakernel),))
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _query(self, kind, size, targets, observer, frame, ets, abcorr, chunk_size):
+        if type(targets) in (str, int):
+            targets = [targets]
+        targets = [str(target) for target in targets]
+        ets = np.ascontiguousarray(ets, dtype=np.float64).reshape(-1)
+        n_epochs = len(ets)
+        out_shape = (len(targets), n_epochs, size)
+        if n_epochs == 0 or len(targets) == 0:
+            return(np.empty(out_shape))
+
+        #  A few chunks per worker, so that they finish at about the same time
+        if chunk_size is None:
+            n_chunks = max(1, math.ceil(4 * self.processes / len(targets)))
+            chunk_size = max(1024, math.ceil(n_epochs / n_chunks))
+
+        out_shm = shared_memory.SharedMemory(create=True, size=8 * math.prod(out_shape))
+        ets_shm = shared_memory.SharedMemory(create=True, size=8 * n_epochs)
+        try:
+            np.ndarray((n_epochs,), dtype=np.float64, buffer=ets_shm.buf)[:] = ets
+            futures = [self._executor.submit(_evaluate_Chunk, kind, out_shm.name, out_shape, ets_shm.name, n_epochs,
+                                             i, target, str(observer), str(frame), abcorr,
+                                             start, min(start + chunk_size, n_epochs))
+                       for i, target in enumerate(targets)
+                       for start in range(0, n_epochs, chunk_size)]
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in not_done:
+                future.cancel()
+            wait(not_done)
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception() is not None:
+                    raise future.exception()
+            result = np.ndarray(out_shape, dtype=np.float64, buffer=out_shm.buf).copy()
+        finally:
+            out_shm.close()
+            out_shm.unlink()
+            ets_shm.close()
+            ets_shm.unlink()
+        return(result)
+
+    def get_States(self, targets, observer, frame, ets, abcorr='NONE', chunk_size=None):
+        """
+        As ephemeris.get_States, evaluated in chunks of chunk_size epochs
+        across the pool's workers
+        """
+        return(self._query('states', 6, targets, observer, frame, ets, abcorr, chunk_size))
+
+    def get_Positions(self, targets, observer, frame, ets, abcorr='NONE', chunk_size=None):
+        """
+        As ephemeris.get_Positions, evaluated across the pool's workers
+        """
+        return(self._query('positions', 3, targets, observer, frame, ets, abcorr, chunk_size))
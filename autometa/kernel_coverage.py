@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Thu Oct 15 09:52:30 2026
+
+@author: mrutala
+
+Working out which kernels cover which times, so we only fetch and load the
+ones a given analysis needs.
+
+Many missions encode the span of each SPK in its file name, e.g. Juno's
+spk_rec_110805_111026_120302.bsp covers 2011-08-05 to 2011-10-26 (and was
+made on 2012-03-02), while Cassini's 000331R_SCPSE_01066_04004.bsp covers
+2001 day 066 to 2004 day 004. These can be filtered without downloading
+anything.
+
+Once downloaded, the segment summaries of each SPK (see daf_reader) tell us
+exactly what each file covers, which prune_Kernels uses to drop files that
+SPICE would never read from and to put the rest in a sensible load order.
+'''
+
+import datetime as dt
+import re
+from pathlib import Path
+
+try:
+    from .daf_reader import DAFError, SegmentIndex, SEGMENT_INDEX_FILENAME
+except ImportError:
+    from daf_reader import DAFError, SegmentIndex, SEGMENT_INDEX_FILENAME
+
+#  Each naming convention is a regular expression, matched against the
+#  start of the file name, with 'start' and 'stop' groups (and optionally a
+#  'created' group, for the date the file was made), plus the strptime
+#  formats of those groups
+FILENAME_CONVENTIONS = {
+    'juno':      {'pattern': r'spk_rec_(?P<start>\d{6})_(?P<stop>\d{6})_(?P<created>\d{6})',
+                  'format': '%y%m%d', 'created_format': '%y%m%d'},
+    'messenger': {'pattern': r'msgr_(?P<start>\d{6})_(?P<stop>\d{6})_',
+                  'format': '%y%m%d'},
+    'cassini':   {'pattern': r'(?P<created>\d{6})RU?_SCPSE_(?P<start>\d{5})_(?P<stop>\d{5})',
+                  'format': '%y%j', 'created_format': '%y%m%d'},
+    }
+
+def as_Datetime(time):
+    """
+    A naive UTC datetime from a datetime, date, or ISO 8601 string (None
+    passes through). Times with a time zone are converted to UTC, to compare
+    with the (UTC) dates in kernel file names.
+    """
+    if time is None:
+        return(time)
+    if not isinstance(time, dt.datetime):
+        if isinstance(time, dt.date):
+            return(dt.datetime(time.year, time.month, time.day))
+        time = dt.datetime.fromisoformat(str(time))
+    if time.tzinfo is not None:
+        time = time.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return(time)
+
+def _match_Filename(name, convention):
+    if type(convention) == str:
+        convention = FILENAME_CONVENTIONS[convention]
+    return(re.match(convention['pattern'], name), convention)
+
+def parse_FilenameCoverage(name, convention):
+    """
+    The (start, stop) datetimes encoded in name following convention (a
+    key of FILENAME_CONVENTIONS, or a dict like its values), or None if
+    name doesn't follow it. As file names only give dates, stop is the end
+    of the last day.
+    """
+    match, convention = _match_Filename(name, convention)
+    if match is None:
+        return(None)
+    start = dt.datetime.strptime(match.group('start'), convention['format'])
+    stop = dt.datetime.strptime(match.group('stop'), convention['format']) + dt.timedelta(days=1)
+    return(start, stop)
+
+def parse_FilenameCreated(name, convention):
+    """
+    The date the file name was made, if convention encodes it, else None
+    """
+    match, convention = _match_Filename(name, convention)
+    if match is None or 'created' not in match.groupdict():
+        return(None)
+    return(dt.datetime.strptime(match.group('created'), convention['created_format']))
+
+def overlaps_Window(name, convention, start=None, stop=None):
+    """
+    Whether the file name (possibly) covers any of start--stop. Files whose
+    names don't encode a span are always kept, and a missing start or stop
+    leaves the window open at that end.
+    """
+    coverage = parse_FilenameCoverage(name, convention)
+    if coverage is None:
+        return(True)
+    start, stop = as_Datetime(start), as_Datetime(stop)
+    if start is not None and coverage[1] < start:
+        return(False)
+    if stop is not None and coverage[0] > stop:
+        return(False)
+    return(True)
+
+def order_Kernels(filepaths, convention=None):
+    """
+    filepaths sorted into SPICE load order, oldest product first, so that
+    the newest (loaded last) takes priority. A file's age is the creation 
+    date in its name, if convention gives one, and otherwise its mtime (for
+    downloaded kernels, the server's modification time). Ties go by name.
+    """
+    def age(filepath):
+        filepath = Path(filepath)
+        created = None
+        if convention is not None:
+            created = parse_FilenameCreated(filepath.name, convention)
+        if created is None:
+            created = dt.datetime.fromtimestamp(filepath.stat().st_mtime)
+        return(created, filepath.name)
+    return(sorted(filepaths, key=age))
+
+def _add_Interval(intervals, start, stop):
+    #  Merge [start, stop] into a sorted list of disjoint intervals
+    merged = list()
+    for interval in intervals:
+        if interval[1] < start or interval[0] > stop:
+            merged.append(interval)
+        else:
+            start, stop = min(start, interval[0]), max(stop, interval[1])
+    merged.append((start, stop))
+    return(sorted(merged))
+
+def _covers_Interval(intervals, start, stop):
+    return(any(interval[0] <= start and stop <= interval[1] for interval in intervals))
+
+def prune_Kernels(filepaths, targets=None, convention=None):
+    """
+    Drop SPKs in filepaths which are completely shadowed, and return what's
+    left in load order (see order_Kernels), after any non-SPK kernels.
+    
+    SPICE uses the highest-priority segment covering an epoch for a target
+    (later files beat earlier ones), so a file is shadowed if it has
+    segments for the targets of interest, and all of them are covered by
+    higher-priority files. targets is a list of NAIF integer IDs (all 
+    targets, if None), extended with the centers their segments are 
+    relative to, recursively, so the bodies their SPK chains pass through
+    are kept too. SPKs with no segments for any of them are kept, as they
+    can't be superseded. Segment summaries come from the (persistent)
+    segment index in each kernel directory.
+    """
+    filepaths = [Path(f) for f in filepaths]
+    other_filepaths = sorted(f for f in filepaths if f.suffix.lower() != '.bsp')
+    spk_filepaths = order_Kernels([f for f in filepaths if f.suffix.lower() == '.bsp'], convention)
+
+    #  Read segment summaries, one index per directory
+    indexes = dict()
+    segments = dict()
+    for filepath in spk_filepaths:
+        directory = filepath.parent
+        if directory not in indexes:
+            indexes[directory] = SegmentIndex(directory / SEGMENT_INDEX_FILENAME)
+        try:
+            segments[filepath] = indexes[directory].get(filepath)
+        except DAFError:
+            #  If we can't read it, we can't say it's shadowed
+            segments[filepath] = None
+    for index in indexes.values():
+        index.save()
+
+    #  Follow the targets' center chains (e.g. a spacecraft relative to 
+    #  Saturn's barycenter, relative to the solar system barycenter)
+    if targets is not None:
+        targets = set(targets)
+        while True:
+            added = set(segment.center for file_segments in segments.values() if file_segments is not None
+                        for segment in file_segments if segment.target in targets) - targets
+            if len(added) == 0:
+                break
+            targets |= added
+
+    #  Walk from highest to lowest priority, tracking what's already covered
+    covered = dict()
+    kept = list()
+    for filepath in reversed(spk_filepaths):
+        if segments[filepath] is None:
+            kept.append(filepath)
+            continue
+        relevant = [segment for segment in segments[filepath]
+                    if targets is None or segment.target in targets]
+        shadowed = len(relevant) > 0 and all(
+            _covers_Interval(covered.get(segment.target, []), segment.start_et, segment.stop_et)
+            for segment in relevant)
+        if not shadowed:
+            kept.append(filepath)
+            for segment in relevant:
+                covered[segment.target] = _add_Interval(covered.get(segment.target, []),
+                                                        segment.start_et, segment.stop_et)
+    kept.reverse()
+    return(other_filepaths + kept)
@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Mon Oct 12 09:41:52 2026
+
+@author: mrutala
+
+A small concurrent download engine for SPICE kernels. Files are fetched by a
+bounded pool of worker threads, keep-alive HTTP(S) connections are reused
+for every request to the same host, and the number of simultaneous
+connections to any one host is capped so we stay polite to NAIF.
+
+Files which already exist locally are only re-downloaded if the server says
+they have changed (via conditional If-Modified-Since/If-None-Match requests),
+and updated files replace the old ones atomically. Transfers go through a
+.part file, which is resumed with a Range request if the transfer fails.
+Each file is hashed as it streams to disk, checked against the checksum in
+its label (if it has one), and the hashes are recorded in the manifest.
+
+Given a KernelStore, downloaded files are kept in (and linked from) that
+shared, content-addressed store, and files another project already fetched
+are linked in rather than downloaded again, once NAIF confirms they haven't
+changed. If the caller passes the file's entry from the directory listing,
+files whose listed size and time are as they were listed when we downloaded
+them are skipped without any request at all. URLs in a local mirror or archive are linked or
+extracted instead (see kernel_sources).
+
+Each file's outcome, bytes and timings, and every retry, are emitted as
+events for any sinks listening (see sync_events).
+'''
+
+import email.utils
+import http.client
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    from .kernel_manifest import (KernelManifest, KernelChecksumError, new_KernelHashes,
+                                  hash_File, parse_PublishedChecksum)
+    from .kernel_store import as_KernelStore
+    from .naif_listing import listed_Fields, listing_Matches
+    from .kernel_sources import find_LocalSource
+    from .sync_events import emit_Event, has_EventSinks
+except ImportError:
+    from kernel_manifest import (KernelManifest, KernelChecksumError, new_KernelHashes,
+                                 hash_File, parse_PublishedChecksum)
+    from kernel_store import as_KernelStore
+    from naif_listing import listed_Fields, listing_Matches
+    from kernel_sources import find_LocalSource
+    from sync_events import emit_Event, has_EventSinks
+
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+#  Appended to the names of incomplete downloads
+PARTIAL_SUFFIX = '.part'
+
+#  Files which may publish another file's checksum (see naif_listing.find_Label)
+_LABEL_SUFFIXES = ('.lbl', '.xml', '.md5')
+
+def _parse_ContentRange(content_range):
+    #  'bytes 1000-1999/2000' -> (1000, 2000); the total may be unknown ('*')
+    try:
+        unit, byte_range = content_range.split()
+        byte_range, total = byte_range.split('/')
+        start = int(byte_range.split('-')[0])
+        total = None if total == '*' else int(total)
+    except (AttributeError, ValueError):
+        raise http.client.HTTPException('Malformed Content-Range: {}'.format(content_range))
+    return(start, total)
+
+class _HostPool:
+    """
+    Idle keep-alive connections to a single scheme://host:port, plus a
+    semaphore limiting how many of them may be in use at once
+    """
+    def __init__(self, scheme, netloc, max_connections, timeout):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self.semaphore = threading.BoundedSemaphore(max_connections)
+        self.lock = threading.Lock()
+        self.idle = list()
+        self.opened = 0
+
+    def acquire(self):
+        #  Block until this host has a free slot, then reuse an idle
+        #  connection if there is one
+        self.semaphore.acquire()
+        with self.lock:
+            if len(self.idle) > 0:
+                return(self.idle.pop(), True)
+            self.opened += 1
+        if self.scheme == 'https':
+            conn = http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        elif self.scheme == 'http':
+            conn = http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+        else:
+            self.semaphore.release()
+            raise ValueError('Unsupported URL scheme: ' + self.scheme)
+        return(conn, False)
+
+    def release(self, conn, reusable=True):
+        if reusable:
+            with self.lock:
+                self.idle.append(conn)
+        else:
+            conn.close()
+        self.semaphore.release()
+
+    def close(self):
+        with self.lock:
+            for conn in self.idle:
+                conn.close()
+            self.idle = list()
+
+class KernelDownloader:
+    """
+    Concurrent, connection-pooled downloader
+
+    A single KernelDownloader should be shared by everything that talks to
+    the same server during a sync, so that connections and per-host limits
+    are shared too. Use it as a context manager, or call close() when done.
+    """
+    def __init__(self, max_workers=8, max_per_host=4, timeout=60.,
+                 chunk_size=1024*1024, max_redirects=5, max_retries=3, retry_backoff=1.,
+                 show_progress=True, store=None):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.max_redirects = max_redirects
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.show_progress = show_progress
+        self.store = as_KernelStore(store)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='autometa-download')
+        self._pools = dict()
+        self._pools_lock = threading.Lock()
+        self._manifests = dict()
+        self._manifests_lock = threading.Lock()
+        self._inflight = dict()
+        self._inflight_urls = dict()
+        self._inflight_lock = threading.Lock()
+        self._checksums = dict()
+        self._checksum_locks = dict()
+        self._checksums_lock = threading.Lock()
+        
+        #  Running totals of files transferred and files found up-to-date
+        self.fetched_count = 0
+        self.skipped_count = 0
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.save_manifests()
+        with self._pools_lock:
+            for pool in self._pools.values():
+                pool.close()
+
+    def _get_pool(self, scheme, netloc):
+        key = (scheme, netloc)
+        with self._pools_lock:
+            if key not in self._pools:
+                self._pools[key] = _HostPool(scheme, netloc, self.max_per_host, self.timeout)
+            return(self._pools[key])
+
+    def _send(self, pool, method, path, headers):
+        #  A reused keep-alive connection may have been dropped by the server
+        #  while idle; in that case retry once on a fresh connection
+        for attempt in range(2):
+            conn, reused = pool.acquire()
+            try:
+                conn.request(method, path, headers=headers)
+                return(conn, conn.getresponse())
+            except (http.client.HTTPException, OSError):
+                pool.release(conn, reusable=False)
+                if not reused or attempt > 0:
+                    raise
+
+    def get_manifest(self, directory):
+        """
+        The (shared) KernelManifest for directory
+        """
+        directory = Path(directory)
+        with self._manifests_lock:
+            if directory not in self._manifests:
+                self._manifests[directory] = KernelManifest(directory)
+            return(self._manifests[directory])
+
+    def save_manifests(self):
+        with self._manifests_lock:
+            manifests = list(self._manifests.values())
+        for manifest in manifests:
+            manifest.save()
+
+    @contextmanager
+    def open(self, url, method='GET', headers=None, accept_status=()):
+        """
+        Open url on a pooled connection, following redirects, and yield the
+        http.client response. HTTP errors are raised as urllib's HTTPError,
+        unless the status code is listed in accept_status.
+        """
+        headers = dict(headers or {})
+        headers.setdefault('User-Agent', 'AutoMeta')
+
+        for _ in range(self.max_redirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            pool = self._get_pool(parts.scheme, parts.netloc)
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+
+            conn, response = self._send(pool, method, path, headers)
+
+            #  Everything but the body we hand back is read here, so the
+            #  connection can go straight back into the pool
+            if response.status in _REDIRECT_CODES or (response.status >= 400 and response.status not in accept_status):
+                response.read()
+                pool.release(conn, reusable=not response.will_close)
+                if response.status in _REDIRECT_CODES:
+                    url = urllib.parse.urljoin(url, response.getheader('Location'))
+                    continue
+                raise urllib.error.HTTPError(url, response.status, response.reason,
+                                             response.headers, None)
+
+            reusable = False
+            try:
+                yield response
+                reusable = response.isclosed() and not response.will_close
+            finally:
+                pool.release(conn, reusable=reusable)
+            return
+
+        raise urllib.error.URLError('Too many redirects fetching ' + url)
+
+    def fetch_text(self, url, encoding='utf-8'):
+        """
+        Return the body of url decoded as text (e.g. a directory listing)
+        """
+        with self.open(url) as response:
+            body = response.read()
+        return(body.decode(encoding))
+
+    def _conditional_headers(self, filepath, manifest):
+        #  Ask the server to skip the transfer if our copy is current. A 
+        #  stored ETag is only trusted if the local file is exactly as we
+        #  left it; otherwise fall back to comparing modification times
+        headers = dict()
+        try:
+            stat = filepath.stat()
+        except OSError:
+            return(headers)
+        entry = manifest.get(filepath.name)
+        if entry is not None and entry.get('size') != stat.st_size:
+            return(headers)
+        headers['If-Modified-Since'] = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        if manifest.matches(filepath.name, stat) and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        return(headers)
+
+    def _stored_headers(self, stored):
+        #  Conditional headers for the version of a file held in the store
+        headers = dict()
+        if stored is not None:
+            if stored.get('etag'):
+                headers['If-None-Match'] = stored['etag']
+            if stored.get('last_modified'):
+                headers['If-Modified-Since'] = stored['last_modified']
+        return(headers)
+
+    def _link_Stored(self, stored, filepath, manifest, listed=None):
+        self.store.link(stored['sha256'], filepath)
+        stat = filepath.stat()
+        manifest.update(filepath.name, size=stat.st_size, mtime=stat.st_mtime, url=stored['url'],
+                        etag=stored.get('etag'), last_modified=stored.get('last_modified'),
+                        checksum_verified=stored.get('checksum_verified', False),
+                        md5=stored.get('md5'), sha256=stored['sha256'], 
+                        **(listed_Fields(listed) or {'listed': stored.get('listed')}))
+
+    def get_PublishedChecksum(self, label_url):
+        """
+        The (shared) MD5 published in the label or checksum file at
+        label_url, or None if it has none; each is only fetched once. If the
+        label can't be fetched this time (a network error, or a 5xx), this
+        warns and returns None, leaving the file it describes unverified,
+        and the label is tried again for the next file that needs it.
+        """
+        #  If the label itself is being synced, it'll be remembered (see
+        #  _remember_Label) once it arrives. Only a download that's already
+        #  running is waited for, so workers never wait on queued work
+        with self._inflight_lock:
+            future = self._inflight_urls.get(label_url)
+        if future is not None and (future.running() or future.done()):
+            try:
+                future.result()
+            except Exception:
+                pass
+        with self._checksums_lock:
+            lock = self._checksum_locks.setdefault(label_url, threading.Lock())
+        with lock:
+            if label_url not in self._checksums:
+                try:
+                    published_md5 = parse_PublishedChecksum(self.fetch_text(label_url, encoding='latin-1'))
+                except (OSError, http.client.HTTPException) as error:
+                    if not (isinstance(error, urllib.error.HTTPError) and error.code < 500):
+                        #  Not worth failing a file that has already arrived
+                        #  intact for, and retrying that would download the
+                        #  whole file again
+                        warnings.warn('Could not fetch {} ({!r}), so the file it describes is unverified'
+                                      .format(label_url, error))
+                        return(None)
+                    #  No label
+                    published_md5 = None
+                self._checksums[label_url] = published_md5
+            return(self._checksums[label_url])
+
+    def _remember_Label(self, url, filepath):
+        #  A label we've just synced needn't be fetched again to check the
+        #  file it describes
+        with self._checksums_lock:
+            lock = self._checksum_locks.setdefault(url, threading.Lock())
+        with lock:
+            if url not in self._checksums:
+                self._checksums[url] = parse_PublishedChecksum(filepath.read_text(encoding='latin-1'))
+
+    def _check_PublishedChecksum(self, label_url, md5):
+        published_md5 = self.get_PublishedChecksum(label_url)
+        if published_md5 is not None and published_md5 != md5:
+            raise KernelChecksumError('MD5 {} does not match {} published in {}'.format(md5, published_md5, label_url))
+        return(published_md5)
+
+    def _listed_Current(self, filepath, manifest, listed):
+        #  True if the listing entry is as it was listed when we downloaded
+        #  the file, which is also untouched since
+        try:
+            stat = filepath.stat()
+        except OSError:
+            return(False)
+        entry = manifest.get(filepath.name)
+        return(manifest.matches(filepath.name, stat) and listing_Matches(listed, entry.get('listed')))
+
+    def _record_Outcome(self, report, outcome, reason):
+        #  Count the file as fetched or skipped, and note why in report
+        with self._manifests_lock:
+            if outcome == 'fetched':
+                self.fetched_count += 1
+            else:
+                self.skipped_count += 1
+        report.update(outcome=outcome, reason=reason)
+
+    def _transfer(self, url, filepath, manifest, force_update=False, label_url=None, listed=None, report=None):
+        #  One attempt at fetching url to filepath. Bytes are streamed into a
+        #  .part file beside the destination, which is only renamed into place
+        #  once complete. If a .part is left over from an earlier attempt, and
+        #  we know which version of the file it holds, it is resumed with a 
+        #  Range request; If-Range makes the server send the whole file
+        #  instead if that version has since changed. What happened (see
+        #  sync_events) is noted in report
+        if report is None:
+            report = dict()
+        part_filepath = filepath.with_name(filepath.name + PARTIAL_SUFFIX)
+        part_entry = manifest.get(part_filepath.name) or dict()
+        validator = part_entry.get('etag') or part_entry.get('last_modified')
+
+        offset = 0
+        stored = None
+        if part_filepath.exists() and validator is not None:
+            offset = part_filepath.stat().st_size
+            headers = {'Range': 'bytes={}-'.format(offset), 'If-Range': validator}
+        elif not force_update:
+            #  If the listing shows the version we already have (or have in
+            #  the store), there's no need to ask the server
+            if listed is not None and self._listed_Current(filepath, manifest, listed):
+                self._record_Outcome(report, 'skipped', 'listing')
+                return(filepath)
+            headers = self._conditional_headers(filepath, manifest)
+            if len(headers) == 0 and self.store is not None:
+                #  No usable local copy, but the shared store may have one
+                stored = self.store.lookup(url)
+                if stored is not None and listing_Matches(listed, stored.get('listed')):
+                    self._link_Stored(stored, filepath, manifest, listed)
+                    self._record_Outcome(report, 'skipped', 'store')
+                    return(filepath)
+                headers = self._stored_headers(stored)
+        else:
+            headers = dict()
+
+        request_start = time.perf_counter()
+        with self.open(url, headers=headers, accept_status=(304, 416)) as response:
+            report['latency'] = time.perf_counter() - request_start
+            if response.status == 304:
+                response.read()
+                if stored is not None:
+                    self._link_Stored(stored, filepath, manifest, listed)
+                    self._record_Outcome(report, 'skipped', 'store')
+                else:
+                    #  Our copy is current, so its listing entry is too
+                    if manifest.matches(filepath.name):
+                        manifest.update(filepath.name, **listed_Fields(listed))
+                    self._record_Outcome(report, 'skipped', 'not_modified')
+                return(filepath)
+
+            if response.status == 416:
+                #  Our partial doesn't fit the file on the server at all
+                response.read()
+                restart = True
+            else:
+                restart = False
+                etag = response.getheader('ETag')
+                last_modified = response.getheader('Last-Modified')
+
+                if response.status == 206:
+                    start, expected_size = _parse_ContentRange(response.getheader('Content-Range'))
+                    if start != offset:
+                        raise http.client.HTTPException('Unexpected Content-Range for ' + url)
+                    mode = 'ab'
+                else:
+                    offset = 0
+                    mode = 'wb'
+                    content_length = response.getheader('Content-Length')
+                    expected_size = None if content_length is None else int(content_length)
+
+                #  Hash while writing; only the bytes already in a resumed
+                #  .part need to be read back
+                hashes = new_KernelHashes()
+                if mode == 'ab':
+                    hash_File(part_filepath, hashes, self.chunk_size)
+
+                #  Remember which version the .part holds before writing to it
+                manifest.update(part_filepath.name, etag=etag, last_modified=last_modified)
+                with open(part_filepath, mode) as f:
+                    while True:
+                        chunk = response.read(self.chunk_size)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        for h in hashes.values():
+                            h.update(chunk)
+                        report['bytes'] = report.get('bytes', 0) + len(chunk)
+                    size = f.tell()
+                if expected_size is not None and size != expected_size:
+                    raise http.client.IncompleteRead(b'', expected_size - size)
+
+        if restart:
+            part_filepath.unlink(missing_ok=True)
+            manifest.remove(part_filepath.name)
+            return(self._transfer(url, filepath, manifest, force_update=force_update, label_url=label_url,
+                                  listed=listed, report=report))
+
+        digests = {algorithm: h.hexdigest() for algorithm, h in hashes.items()}
+        published_md5 = None
+        if label_url is not None:
+            try:
+                published_md5 = self._check_PublishedChecksum(label_url, digests['md5'])
+            except KernelChecksumError:
+                #  Start from scratch next time
+                part_filepath.unlink(missing_ok=True)
+                manifest.remove(part_filepath.name)
+                raise
+
+        #  Like wget --timestamping, give the file the server's mtime
+        if last_modified is not None:
+            mtime = email.utils.parsedate_to_datetime(last_modified).timestamp()
+            os.utime(part_filepath, (mtime, mtime))
+        os.replace(part_filepath, filepath)
+        manifest.remove(part_filepath.name)
+
+        if self.store is not None:
+            self.store.add(filepath, digests['sha256'])
+            self.store.record(url, size=size, etag=etag, last_modified=last_modified,
+                              checksum_verified=published_md5 is not None, **listed_Fields(listed), **digests)
+
+        stat = filepath.stat()
+        manifest.update(filepath.name, size=stat.st_size, mtime=stat.st_mtime, url=url,
+                        etag=etag, last_modified=last_modified, listed=listed_Fields(listed).get('listed'),
+                        checksum_verified=published_md5 is not None, **digests)
+        self._record_Outcome(report, 'fetched', 'resume' if mode == 'ab' else 'download')
+        return(filepath)
+
+    def _fetch_Local(self, source, location, url, filepath, manifest, force_update=False, report=None):
+        #  Link or extract a file from a local mirror or archive, which we
+        #  trust, so it isn't hashed or stored
+        placed = source.fetch(location, filepath, force_update=force_update)
+        stat = filepath.stat()
+        if placed or not manifest.matches(filepath.name, stat):
+            manifest.remove(filepath.name)
+            manifest.update(filepath.name, size=stat.st_size, mtime=stat.st_mtime, url=url)
+        if report is None:
+            report = dict()
+        if placed:
+            report['bytes'] = stat.st_size
+        self._record_Outcome(report, 'fetched' if placed else 'skipped', 'local')
+        return(filepath)
+
+    def _download(self, url, filepath, force_update=False, label_url=None, listed=None):
+        filepath = Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        manifest = self.get_manifest(filepath.parent)
+
+        start = time.perf_counter()
+        report = {'attempts': 1}
+        try:
+            local = find_LocalSource(url)
+            if local is not None:
+                self._fetch_Local(local[0], local[1], url, filepath, manifest, force_update=force_update,
+                                  report=report)
+            else:
+                self._retry_Transfer(url, filepath, manifest, force_update, label_url, listed, report)
+                if url.lower().endswith(_LABEL_SUFFIXES):
+                    self._remember_Label(url, filepath)
+        except Exception as error:
+            report.update(outcome='failed', reason=repr(error))
+            raise
+        finally:
+            if has_EventSinks():
+                seconds = time.perf_counter() - start
+                throughput = None
+                if report.get('outcome') == 'fetched' and report.get('bytes') and seconds > 0:
+                    throughput = report['bytes'] / seconds
+                emit_Event('file', url=url, filepath=str(filepath), outcome=report.get('outcome'),
+                           reason=report.get('reason'), bytes=report.get('bytes', 0), seconds=seconds,
+                           latency=report.get('latency'), throughput=throughput, attempts=report['attempts'])
+        return(filepath)
+
+    def _retry_Transfer(self, url, filepath, manifest, force_update, label_url, listed, report):
+        #  Network hiccups and corrupted transfers are retried (resuming from
+        #  the .part file, if there is one) with exponential backoff; HTTP 
+        #  errors other than 5xx are final
+        for attempt in range(self.max_retries + 1):
+            report['attempts'] = attempt + 1
+            try:
+                return(self._transfer(url, filepath, manifest, force_update=force_update, 
+                                      label_url=label_url, listed=listed, report=report))
+            except (OSError, http.client.HTTPException, KernelChecksumError) as error:
+                if isinstance(error, urllib.error.HTTPError) and error.code < 500:
+                    raise
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * 2**attempt
+                emit_Event('retry', url=url, attempt=attempt + 1, error=repr(error), delay=delay)
+                time.sleep(delay)
+
+    def download(self, url, filepath, force_update=False, label_url=None, listed=None):
+        """
+        Queue url to be saved to filepath; returns a Future of the filepath. 
+        Unless force_update, an existing file is only replaced if the server
+        has a newer version. If label_url is given, the published checksum
+        in that label (or checksum file) is checked once the file arrives.
+        If listed (the file's ListingEntry) is given, and shows the version
+        we already have, the server isn't asked at all.
+        """
+        #  If several searches want the same file at once, they share one
+        #  transfer rather than racing to write it
+        key = Path(filepath).absolute()
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return(future)
+            future = self._executor.submit(self._download, url, filepath, force_update, label_url, listed)
+            self._inflight[key] = future
+            self._inflight_urls[url] = future
+        #  Outside the lock: if the future is already done, this runs now
+        future.add_done_callback(lambda future: self._forget_Inflight(key, url, future))
+        return(future)
+
+    def _forget_Inflight(self, key, url, future):
+        with self._inflight_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if self._inflight_urls.get(url) is future:
+                del self._inflight_urls[url]
+
+    def wait(self, futures, desc='Downloading'):
+        """
+        Block until all futures finish, with a progress bar. Every download
+        is allowed to finish before the first failure (if any) is raised.
+        """
+        results = list()
+        errors = list()
+        completed = as_completed(futures)
+        if self.show_progress and len(futures) > 0:
+            import tqdm
+            completed = tqdm.tqdm(completed, total=len(futures), desc=desc)
+        try:
+            for future in completed:
+                try:
+                    results.append(future.result())
+                except Exception as error:
+                    errors.append(error)
+        finally:
+            self.save_manifests()
+        if len(errors) > 0:
+            raise errors[0]
+        return(results)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Tue Oct 13 10:22:06 2026
+
+@author: mrutala
+
+A small per-directory record of what we know about each downloaded kernel
+(size, modification time, and the server's ETag and Last-Modified headers),
+so that later syncs can ask the server for only what has changed.
+
+The manifest also holds the MD5 and SHA-256 of each kernel, computed while
+it was downloaded. Once recorded, these are trusted for as long as the file
+keeps the size and mtime it had when we wrote it, so checking a kernel
+directory doesn't mean re-reading gigabytes of SPKs.
+'''
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+MANIFEST_FILENAME = '.autometa_manifest.json'
+
+HASH_ALGORITHMS = ('md5', 'sha256')
+
+class KernelChecksumError(Exception):
+    """
+    A kernel's contents don't match its published checksum
+    """
+    pass
+
+def new_KernelHashes():
+    """
+    Fresh hashlib objects for each of HASH_ALGORITHMS, to update as bytes
+    arrive
+    """
+    return({algorithm: hashlib.new(algorithm) for algorithm in HASH_ALGORITHMS})
+
+def hash_File(filepath, hashes=None, chunk_size=1024*1024):
+    """
+    Feed the contents of filepath into hashes (by default, fresh ones) and
+    return them
+    """
+    if hashes is None:
+        hashes = new_KernelHashes()
+    with open(filepath, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            for h in hashes.values():
+                h.update(chunk)
+    return(hashes)
+
+def parse_PublishedChecksum(text):
+    """
+    The MD5 checksum in a PDS3 label (MD5_CHECKSUM = "..."), a PDS4 label
+    (<md5_checksum>...</md5_checksum>) or an md5sum-style file, or None if
+    there isn't one
+    """
+    match = re.search(r'md5_checksum\W*([0-9a-fA-F]{32})\b', text, flags=re.IGNORECASE)
+    if match is None:
+        match = re.match(r'\s*([0-9a-fA-F]{32})\b', text)
+    if match is None:
+        return(None)
+    return(match.group(1).lower())
+
+class KernelManifest:
+    """
+    The manifest for a single kernel directory, stored as JSON alongside the
+    kernels themselves. Entries are keyed by file name. Safe to update from
+    several download threads at once; nothing is written until save().
+    """
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.filepath = self.directory / MANIFEST_FILENAME
+        self._lock = threading.Lock()
+        self._changed = False
+        self.entries = dict()
+        if self.filepath.exists():
+            try:
+                with open(self.filepath) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                #  A damaged manifest only costs us a full re-check
+                self.entries = dict()
+
+    def get(self, name):
+        with self._lock:
+            entry = self.entries.get(name)
+            return(dict(entry) if entry is not None else None)
+
+    def update(self, name, **fields):
+        with self._lock:
+            self.entries.setdefault(name, dict()).update(fields)
+            self._changed = True
+
+    def remove(self, name):
+        with self._lock:
+            if self.entries.pop(name, None) is not None:
+                self._changed = True
+
+    def matches(self, name, stat=None):
+        """
+        True if the local file name still has the size and mtime recorded in
+        the manifest, i.e. it hasn't been touched since we downloaded it
+        """
+        entry = self.get(name)
+        if entry is None:
+            return(False)
+        if stat is None:
+            try:
+                stat = (self.directory / name).stat()
+            except OSError:
+                return(False)
+        return(entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime)
+
+    def verify(self, name, rehash=False):
+        """
+        Check the local file name against its recorded SHA-256. The recorded
+        hash is trusted if the file still has its recorded size and mtime,
+        unless rehash; otherwise the file is re-read (and, if it has no 
+        recorded hash yet, the new one is recorded). Returns True/False.
+        """
+        filepath = self.directory / name
+        try:
+            stat = filepath.stat()
+        except OSError:
+            return(False)
+        entry = self.get(name) or dict()
+        if not rehash and self.matches(name, stat) and entry.get('sha256') is not None:
+            return(True)
+
+        hashes = hash_File(filepath)
+        digests = {algorithm: h.hexdigest() for algorithm, h in hashes.items()}
+        if entry.get('sha256') is None:
+            self.update(name, size=stat.st_size, mtime=stat.st_mtime, **digests)
+            return(True)
+        if digests['sha256'] == entry['sha256']:
+            #  Unchanged contents, just touched; trust it again from now on
+            self.update(name, size=stat.st_size, mtime=stat.st_mtime)
+            return(True)
+        return(False)
+
+    def save(self):
+        with self._lock:
+            if not self._changed:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_filepath = self.filepath.with_name(self.filepath.name + '.tmp')
+            with open(tmp_filepath, 'w') as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(tmp_filepath, self.filepath)
+            self._changed = False
+
+def verify_Kernels(directory, namepattern='*', rehash=False):
+    """
+    Check every kernel in directory matching namepattern against the 
+    manifest (see KernelManifest.verify) and return the paths of any which
+    fail
+    """
+    manifest = KernelManifest(directory)
+    failed = list()
+    for filepath in sorted(Path(directory).glob(namepattern)):
+        if filepath.name.startswith('.') or filepath.suffix == '.part' or not filepath.is_file():
+            continue
+        if not manifest.verify(filepath.name, rehash=rehash):
+            failed.append(filepath)
+    manifest.save()
+    return(failed)
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Mon Oct 19 13:26:51 2026
+
+@author: mrutala
+
+A resident process that keeps metakernels furnished and answers geometry
+queries over a local UNIX socket, so short jobs don't each pay for furnsh
+(which, for Cassini- or Juno-sized kernel sets, can take longer than the
+job itself) and kclear.
+
+Start a server with:
+    $ python kernel_server.py SPICE/juno/metakernel_juno.txt [more metakernels]
+and query it with a KernelClient, whose get_States, get_Positions,
+get_Rotations and get_StateTransformations mirror those in ephemeris.py
+(without the metakernel argument):
+    >>> with KernelClient() as client:
+    ...     states = client.get_States(['JUNO'], 'JUPITER', 'J2000', ets)
+
+Every metakernel is furnished into the server's single kernel pool, in the
+order given. The server watches the metakernels and the kernels they load,
+and reloads everything once a change (e.g. from a sync) has settled, so
+results always come from the current kernel set.
+
+Each message is an 8-byte little-endian length, a JSON header of that
+length, and then the raw bytes of each array the header describes (dtype,
+shape and nbytes), so ETs and results cross the socket without being pickled
+or converted to text. Only float64 arrays are accepted, and the server only
+accepts 1-D arrays (of ETs) of up to max_request_bytes, so a malformed or
+hostile header can't make it allocate arbitrary arrays.
+'''
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from .ephemeris import get_States, get_Positions, get_Rotations, get_StateTransformations
+    from .ephemeris_cache import fingerprint_Kernels
+    from .metakernel_reader import read_Metakernel
+except ImportError:
+    from ephemeris import get_States, get_Positions, get_Rotations, get_StateTransformations
+    from ephemeris_cache import fingerprint_Kernels
+    from metakernel_reader import read_Metakernel
+
+_LENGTH = struct.Struct('<Q')
+_MAX_HEADER_BYTES = 1024**2
+_DTYPE = np.dtype(np.float64)
+
+class KernelServerError(Exception):
+    """
+    A query the kernel server could not answer (e.g. a SPICE error)
+    """
+    pass
+
+class KernelMessageError(KernelServerError):
+    """
+    A message that doesn't follow the protocol (e.g. an array that isn't
+    float64, or whose shape doesn't match its byte length)
+    """
+    pass
+
+def default_SocketPath():
+    """
+    $XDG_RUNTIME_DIR/autometa/kernels.sock, or a per-user directory in the
+    system's temporary directory if XDG_RUNTIME_DIR isn't set
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return(Path(runtime_dir) / 'autometa' / 'kernels.sock')
+    return(Path(tempfile.gettempdir()) / 'autometa-{}'.format(os.getuid()) / 'kernels.sock')
+
+def _recv_Into(sock, buffer):
+    #  Fill buffer (a writable bytes-like object) from sock; False if the
+    #  connection closes before anything arrives
+    view = memoryview(buffer).cast('B')
+    received = 0
+    while received < len(view):
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            if received == 0:
+                return(False)
+            raise ConnectionError('Connection closed part way through a message')
+        received += n
+    return(True)
+
+def send_Message(sock, header, arrays=()):
+    """
+    Send header (a JSON-able dict) and arrays over sock
+    """
+    arrays = [np.ascontiguousarray(array) for array in arrays]
+    header = dict(header, arrays=[{'dtype': array.dtype.str, 'shape': array.shape, 'nbytes': array.nbytes}
+                                  for array in arrays])
+    encoded = json.dumps(header).encode('utf-8')
+    sock.sendall(_LENGTH.pack(len(encoded)) + encoded)
+    for array in arrays:
+        if array.nbytes > 0:
+            sock.sendall(memoryview(array).cast('B'))
+
+def _check_ArraySpecs(specs, ndim=None, max_bytes=None):
+    #  The shape of each array described by specs (from a message header),
+    #  after checking they're float64 and their shapes match their nbytes
+    if not isinstance(specs, list):
+        raise KernelMessageError('Expected a list of arrays, not {!r}'.format(specs))
+    shapes = list()
+    total = 0
+    for spec in specs:
+        try:
+            dtype, shape, nbytes = spec['dtype'], spec['shape'], spec['nbytes']
+        except (KeyError, TypeError):
+            raise KernelMessageError('Malformed array description: {!r}'.format(spec)) from None
+        if dtype != _DTYPE.str:
+            raise KernelMessageError('Unsupported dtype {!r} (only {!r} is accepted)'.format(dtype, _DTYPE.str))
+        if (not isinstance(shape, list) or (ndim is not None and len(shape) != ndim)
+                or not all(type(n) is int and n >= 0 for n in shape)):
+            raise KernelMessageError('Unsupported shape {!r}'.format(shape))
+        if type(nbytes) is not int or nbytes != int(np.prod(shape, dtype=object)) * _DTYPE.itemsize:
+            raise KernelMessageError('Shape {!r} doesn\'t match nbytes {!r}'.format(shape, nbytes))
+        total += nbytes
+        if max_bytes is not None and total > max_bytes:
+            raise KernelMessageError('Arrays larger than the {} byte limit'.format(max_bytes))
+        shapes.append(tuple(shape))
+    return(shapes)
+
+def recv_Message(sock, outs=None, ndim=None, max_bytes=None):
+    """
+    Receive a (header, arrays) message from sock, or None if the connection
+    has closed. Arrays are received straight into the matching arrays of
+    outs (where given, and of the right shape) rather than new ones.
+
+    Only float64 arrays whose shapes match their nbytes are accepted, and
+    with ndim and/or max_bytes, only arrays with ndim dimensions and at most
+    max_bytes in all; anything else raises KernelMessageError before any
+    array is allocated.
+    """
+    length = bytearray(_LENGTH.size)
+    if not _recv_Into(sock, length):
+        return(None)
+    length = _LENGTH.unpack(length)[0]
+    if length > _MAX_HEADER_BYTES:
+        raise KernelMessageError('Header of {} bytes is over the {} byte limit'.format(length, _MAX_HEADER_BYTES))
+    encoded = bytearray(length)
+    if not _recv_Into(sock, encoded):
+        raise ConnectionError('Connection closed part way through a message')
+    try:
+        header = json.loads(encoded.decode('utf-8'))
+    except ValueError as error:
+        raise KernelMessageError('Malformed header: {}'.format(error)) from None
+    if not isinstance(header, dict):
+        raise KernelMessageError('Expected a header object, not {!r}'.format(header))
+    shapes = _check_ArraySpecs(header.pop('arrays', []), ndim=ndim, max_bytes=max_bytes)
+
+    arrays = list()
+    for i, shape in enumerate(shapes):
+        out = outs[i] if outs is not None and i < len(outs) else None
+        if (out is None or out.shape != shape or out.dtype != _DTYPE or not out.flags['C_CONTIGUOUS']
+                or not out.flags['WRITEABLE']):
+            out = np.empty(shape, dtype=_DTYPE)
+        if out.nbytes > 0:
+            _recv_Into(sock, out)
+        arrays.append(out)
+    return(header, arrays)
+
+class _KernelRequestHandler(socketserver.BaseRequestHandler):
+    #  Answers queries on one connection until the client hangs up
+    def handle(self):
+        while True:
+            try:
+                message = recv_Message(self.request, ndim=1, max_bytes=self.server.kernel_server.max_request_bytes)
+            except KernelMessageError as error:
+                #  The rest of the stream can't be trusted, so say why and
+                #  hang up
+                send_Message(self.request, {'status': 'error', 'error': type(error).__name__, 'message': str(error)})
+                return
+            if message is None:
+                return
+            header, arrays = message
+            try:
+                reply, results = self.server.kernel_server.answer(header, arrays)
+            except Exception as error:
+                reply = {'status': 'error', 'error': type(error).__name__, 'message': str(error)}
+                results = []
+            send_Message(self.request, reply, results)
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class KernelServer:
+    """
+    Serve queries against metakernels (a metakernel path or a list of them)
+    on the UNIX socket at socket_path (by default, default_SocketPath()).
+    Every poll_interval seconds the kernels are checked for changes, and
+    reloaded once they have stayed the same for a whole interval. Queries
+    may send at most max_request_bytes of ETs.
+
+    The server owns its process's kernel pool: loading clears it first.
+    """
+    def __init__(self, metakernels, socket_path=None, poll_interval=5., max_request_bytes=1024**3):
+        if isinstance(metakernels, (str, Path)):
+            metakernels = [metakernels]
+        self.metakernels = [Path(metakernel).resolve() for metakernel in metakernels]
+        self.socket_path = Path(socket_path) if socket_path is not None else default_SocketPath()
+        self.poll_interval = poll_interval
+        self.max_request_bytes = max_request_bytes
+
+        #  CSPICE isn't thread-safe, so queries (and reloads) take turns
+        self._spice_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server = None
+        self._threads = list()
+
+        self.fingerprint = None
+        self.load_count = 0
+        self.loaded_at = None
+        self.load_error = None
+        self.query_count = 0
+
+    def _kernel_Filepaths(self):
+        filepaths = list()
+        for metakernel in self.metakernels:
+            filepaths.append(metakernel)
+            try:
+                filepaths.extend(read_Metakernel(metakernel))
+            except OSError:
+                pass
+        return(filepaths)
+
+    def load(self):
+        """
+        Clear the kernel pool and furnish every metakernel again
+        """
+        import spiceypy as spice
+        with self._spice_lock:
+            #  Fingerprint first: if anything changes while we load, the
+            #  next poll will see it and load again
+            fingerprint = fingerprint_Kernels(self._kernel_Filepaths())
+            spice.kclear()
+            try:
+                for metakernel in self.metakernels:
+                    spice.furnsh(str(metakernel))
+            except Exception as error:
+                #  Keep serving (errors) and try again at the next change
+                spice.kclear()
+                self.load_error = '{}: {}'.format(type(error).__name__, error)
+            else:
+                self.load_error = None
+            self.fingerprint = fingerprint
+            self.load_count += 1
+            self.loaded_at = time.time()
+
+    def _watch_Kernels(self):
+        #  Reload once the kernels differ from what's loaded, and haven't
+        #  changed since the last poll, so a sync in progress isn't loaded
+        #  half-finished
+        previous = self.fingerprint
+        while not self._stop.wait(self.poll_interval):
+            current = fingerprint_Kernels(self._kernel_Filepaths())
+            if current != self.fingerprint and current == previous:
+                self.load()
+            previous = current
+
+    def answer(self, header, arrays):
+        """
+        The (reply header, result arrays) for a query
+        """
+        import spiceypy as spice
+        query = header.get('query')
+        if query == 'info':
+            with self._spice_lock:
+                n_kernels = spice.ktotal('ALL')
+            return({'status': 'ok', 'metakernels': [str(metakernel) for metakernel in self.metakernels],
+                    'fingerprint': self.fingerprint, 'load_count': self.load_count,
+                    'loaded_at': self.loaded_at, 'load_error': self.load_error,
+                    'kernel_count': n_kernels, 'query_count': self.query_count}, [])
+        if query == 'reload':
+            self.load()
+            return({'status': 'ok', 'load_error': self.load_error}, [])
+
+        if self.load_error is not None:
+            raise KernelServerError('Kernels failed to load: ' + self.load_error)
+        ets = arrays[0]
+        with self._spice_lock:
+            self.query_count += 1
+            if query in ('states', 'positions'):
+                evaluate = get_States if query == 'states' else get_Positions
+                result = evaluate(None, header['targets'], header['observer'], header['frame'], ets,
+                                  abcorr=header.get('abcorr', 'NONE'))
+            elif query in ('rotations', 'transformations'):
+                evaluate = get_Rotations if query == 'rotations' else get_StateTransformations
+                result = evaluate(None, header['from_frame'], header['to_frame'], ets)
+            else:
+                raise KernelServerError('Unknown query: {}'.format(query))
+        return({'status': 'ok'}, [result])
+
+    def _bind(self):
+        self.socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            #  A socket left behind by a server that died can be replaced;
+            #  one that still answers can't
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(str(self.socket_path))
+            except OSError:
+                self.socket_path.unlink()
+            else:
+                raise OSError('A kernel server is already listening on {}'.format(self.socket_path))
+            finally:
+                probe.close()
+        self._server = _UnixServer(str(self.socket_path), _KernelRequestHandler)
+        self._server.kernel_server = self
+
+    def start(self):
+        """
+        Load the kernels and serve from background threads
+        """
+        self.load()
+        self._bind()
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._server.serve_forever, daemon=True),
+                         threading.Thread(target=self._watch_Kernels, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return(self)
+
+    def serve_forever(self):
+        """
+        Serve until interrupted (e.g. with Ctrl-C)
+        """
+        self.start()
+        try:
+            while not self._stop.wait(3600.):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = list()
+        self.socket_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return(self.start())
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+class KernelClient:
+    """
+    A connection to the KernelServer at socket_path (by default,
+    default_SocketPath()). Its get_States method can be passed as evaluate
+    to the searches in ephemeris_events.py.
+    """
+    def __init__(self, socket_path=None, timeout=None):
+        self.socket_path = Path(socket_path) if socket_path is not None else default_SocketPath()
+        self.timeout = timeout
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(str(self.socket_path))
+            self._sock = sock
+        return(self._sock)
+
+    def _request(self, header, arrays=(), outs=None):
+        with self._lock:
+            sock = self._connect()
+            try:
+                send_Message(sock, header, arrays)
+                message = recv_Message(sock, outs=outs)
+            except OSError:
+                #  Start afresh on the next request
+                self.close()
+                raise
+        if message is None:
+            self.close()
+            raise ConnectionError('The kernel server closed the connection')
+        reply, results = message
+        if reply.get('status') != 'ok':
+            raise KernelServerError('{}: {}'.format(reply.get('error'), reply.get('message')))
+        return(reply, results)
+
+    def _query(self, header, ets, out):
+        ets = np.ascontiguousarray(ets, dtype=np.float64).reshape(-1)
+        reply, results = self._request(header, [ets], outs=None if out is None else [out])
+        if out is not None and results[0] is not out:
+            out[...] = results[0]
+            return(out)
+        return(results[0])
+
+    def get_States(self, targets, observer, frame, ets, abcorr='NONE', out=None):
+        """
+        As ephemeris.get_States, with the server's kernels
+        """
+        if type(targets) in (str, int):
+            targets = [targets]
+        header = {'query': 'states', 'targets': [str(target) for target in targets], 'observer': str(observer),
+                  'frame': str(frame), 'abcorr': str(abcorr)}
+        return(self._query(header, ets, out))
+
+    def get_Positions(self, targets, observer, frame, ets, abcorr='NONE', out=None):
+        """
+        As ephemeris.get_Positions, with the server's kernels
+        """
+        if type(targets) in (str, int):
+            targets = [targets]
+        header = {'query': 'positions', 'targets': [str(target) for target in targets], 'observer': str(observer),
+                  'frame': str(frame), 'abcorr': str(abcorr)}
+        return(self._query(header, ets, out))
+
+    def get_Rotations(self, from_frame, to_frame, ets, out=None):
+        """
+        As ephemeris.get_Rotations, with the server's kernels
+        """
+        return(self._query({'query': 'rotations', 'from_frame': str(from_frame), 'to_frame': str(to_frame)},
+                           ets, out))
+
+    def get_StateTransformations(self, from_frame, to_frame, ets, out=None):
+        """
+        As ephemeris.get_StateTransformations, with the server's kernels
+        """
+        return(self._query({'query': 'transformations', 'from_frame': str(from_frame), 'to_frame': str(to_frame)},
+                           ets, out))
+
+    def get_Info(self):
+        """
+        What the server has loaded, and when, as a dict
+        """
+        reply, _ = self._request({'query': 'info'})
+        reply.pop('status')
+        return(reply)
+
+    def reload(self):
+        """
+        Have the server reload its kernels now, rather than at its next poll
+        """
+        self._request({'query': 'reload'})
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+if __name__ == "__main__":
+    import argparse
+    import signal
+    parser = argparse.ArgumentParser(description='Keep metakernels furnished and answer queries over a UNIX socket')
+    parser.add_argument('metakernels', nargs='+', help='metakernels to furnish, in load order')
+    parser.add_argument('--socket', default=None, help='socket path (default: {})'.format(default_SocketPath()))
+    parser.add_argument('--poll', type=float, default=5., help='seconds between checks for changed kernels')
+    args = parser.parse_args()
+
+    server = KernelServer(args.metakernels, socket_path=args.socket, poll_interval=args.poll)
+    #  Shut down cleanly (removing the socket) when asked to by e.g. systemd
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, interrupt)
+    print('Serving {} on {}'.format(', '.join(args.metakernels), server.socket_path))
+    server.serve_forever()
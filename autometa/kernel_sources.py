@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Tue Oct 20 09:37:14 2026
+
+@author: mrutala
+
+Kernel sources other than NAIF's web server, for machines without internet
+access. Wherever a base URL is taken (make_Metakernel, make_Metakernels,
+get_SpacecraftKernels, get_GenericKernels), it may also be:
+    - a local directory laid out like https://naif.jpl.nasa.gov/pub/naif/
+      (e.g. a mirror on a shared filesystem), as a path or a file:// URL, or
+    - a tar archive of such a tree (compressed or not), followed by the
+      directory within it that corresponds to pub/naif/, e.g.
+      '/data/naif_mirror.tar/' or 'file:///data/spice.tar.gz/pub/naif/'.
+Directory listings then come straight from the filesystem or the archive's
+index, and the same name patterns, time windows and metakernel writing
+apply as for downloads.
+
+Files from a mirror are hardlinked into the SPICE tree (or reflinked, where
+the filesystem allows it, or symlinked if neither works), so populating a
+tree takes no copying; files from an archive are extracted as they stream
+out of it. A file already linked, or with the same size and modification
+time as the source, is left alone. The source is trusted, so files aren't
+hashed or checked against labels, and aren't added to a KernelStore.
+
+Uncompressed archives are read in place; compressed ones are decompressed
+once to index them, then again up to each member extracted, so they're
+best extracted from in archive order.
+'''
+
+import errno
+import os
+import tarfile
+import threading
+import urllib.parse
+import urllib.request
+import uuid
+from pathlib import Path, PurePosixPath
+
+try:
+    from .naif_listing import ListingEntry
+except ImportError:
+    from naif_listing import ListingEntry
+
+#  Linux's ioctl to share (reflink) a file's blocks, on btrfs, XFS, etc.
+_FICLONE = 0x40049409
+
+_archives = dict()
+_archives_lock = threading.Lock()
+
+def _local_Path(url):
+    #  The local path url refers to, or None for a remote URL
+    parts = urllib.parse.urlsplit(str(url))
+    if parts.scheme in ('http', 'https', 'ftp'):
+        return(None)
+    if parts.scheme == 'file':
+        return(Path(urllib.request.url2pathname(parts.path)))
+    #  Plain paths, including Windows ones with a drive letter
+    return(Path(str(url)))
+
+def find_LocalSource(url):
+    """
+    (source, location) for a local url, where source is MIRROR or an
+    ArchiveSource, and location the path or member name within it; or None
+    if url is remote
+    """
+    path = _local_Path(url)
+    if path is None:
+        return(None)
+
+    #  Walk up to the part of the path that exists: a directory (in a
+    #  mirror) or an archive file, with the rest a path inside it
+    existing, inside = path, list()
+    while not existing.exists():
+        if existing.parent == existing:
+            raise FileNotFoundError('No such kernel source: {}'.format(url))
+        inside.insert(0, existing.name)
+        existing = existing.parent
+    if len(inside) == 0 and not (existing.is_file() and str(url).endswith('/')):
+        #  A directory or file in a mirror (an archive is only taken as a
+        #  directory, i.e. with a trailing /)
+        return(MIRROR, path)
+    if existing.is_dir():
+        raise FileNotFoundError('No such kernel source: {}'.format(url))
+    if not tarfile.is_tarfile(existing):
+        raise FileNotFoundError('{} is not a directory or tar archive'.format(existing))
+    return(get_ArchiveSource(existing), '/'.join(inside))
+
+def link_File(source, destination):
+    """
+    Make destination a hardlink to source, or a reflink if hardlinks aren't
+    possible, or else a symlink, replacing it atomically
+    """
+    source, destination = Path(source), Path(destination)
+    #  Made under a name no other thread or process will use
+    tmp_filepath = destination.with_name('.{}.{}.link'.format(destination.name, uuid.uuid4().hex))
+    try:
+        os.link(source, tmp_filepath)
+    except OSError as error:
+        if error.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        try:
+            import fcntl
+            with open(source, 'rb') as src, open(tmp_filepath, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            stat = source.stat()
+            os.utime(tmp_filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        except (ImportError, OSError):
+            tmp_filepath.unlink(missing_ok=True)
+            os.symlink(source.resolve(), tmp_filepath)
+    os.replace(tmp_filepath, destination)
+    #  Renaming onto another link to the same file does nothing, leaving
+    #  the temporary link behind
+    tmp_filepath.unlink(missing_ok=True)
+    return(destination)
+
+def _is_Current(filepath, size, mtime):
+    #  True if filepath already has this size and modification time
+    try:
+        stat = filepath.stat()
+    except OSError:
+        return(False)
+    return(stat.st_size == size and int(stat.st_mtime) == int(mtime))
+
+class MirrorSource:
+    """
+    Kernels in a local directory tree
+    """
+    def list_Directory(self, path):
+        """
+        The ListingEntries of the files in the directory at path
+        """
+        entries = list()
+        with os.scandir(path) as scan:
+            for entry in scan:
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries.append(ListingEntry(entry.name, stat.st_size, stat.st_mtime))
+        return(sorted(entries))
+
+    def fetch(self, path, filepath, force_update=False):
+        """
+        Link the file at path to filepath, unless it's already there; True if
+        filepath was (re)placed
+        """
+        path, filepath = Path(path), Path(filepath)
+        if not force_update:
+            if filepath.exists() and os.path.samefile(path, filepath):
+                return(False)
+            stat = path.stat()
+            if _is_Current(filepath, stat.st_size, stat.st_mtime):
+                return(False)
+        link_File(path, filepath)
+        return(True)
+
+#  Mirrors hold no state, so one will do
+MIRROR = MirrorSource()
+
+class ArchiveSource:
+    """
+    Kernels in a tar archive at filepath, indexed when opened. Members are
+    extracted one at a time through a single handle on the archive.
+    """
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        self._lock = threading.Lock()
+        self._tar = tarfile.open(self.filepath, 'r:*')
+        self.members = dict()
+        self.directories = dict()
+        for member in self._tar:
+            if not member.isfile():
+                continue
+            name = str(PurePosixPath('/', member.name))[1:]
+            self.members[name] = member
+            directory, _, filename = name.rpartition('/')
+            self.directories.setdefault(directory, list()).append(
+                ListingEntry(filename, member.size, float(member.mtime)))
+
+    def close(self):
+        self._tar.close()
+
+    def list_Directory(self, directory):
+        """
+        The ListingEntries of the files in directory within the archive
+        """
+        directory = directory.strip('/')
+        if directory not in self.directories:
+            raise FileNotFoundError('No directory {} in {}'.format(directory, self.filepath))
+        return(list(self.directories[directory]))
+
+    def fetch(self, name, filepath, force_update=False):
+        """
+        Extract member name to filepath, unless it's already there; True if
+        filepath was (re)placed
+        """
+        filepath = Path(filepath)
+        member = self.members.get(name.strip('/'))
+        if member is None:
+            raise FileNotFoundError('No file {} in {}'.format(name, self.filepath))
+        if not force_update and _is_Current(filepath, member.size, member.mtime):
+            return(False)
+
+        tmp_filepath = filepath.with_name('.{}.{}.tmp'.format(filepath.name, uuid.uuid4().hex))
+        with self._lock:
+            source = self._tar.extractfile(member)
+            with open(tmp_filepath, 'wb') as f:
+                while True:
+                    chunk = source.read(1024*1024)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+        os.utime(tmp_filepath, (member.mtime, member.mtime))
+        os.replace(tmp_filepath, filepath)
+        return(True)
+
+def get_ArchiveSource(filepath):
+    """
+    The (shared) ArchiveSource for the archive at filepath, so each archive
+    is only indexed once per process
+    """
+    filepath = Path(filepath).resolve()
+    with _archives_lock:
+        if filepath not in _archives:
+            _archives[filepath] = ArchiveSource(filepath)
+        return(_archives[filepath])
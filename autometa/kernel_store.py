@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Fri Oct 16 10:14:58 2026
+
+@author: mrutala
+
+A content-addressed store of kernels shared by every project on a machine.
+Each kernel is kept once, named by its SHA-256, and each project's SPICE/
+tree holds hardlinks to it (or symlinks, if the store is on a different
+filesystem). The store also remembers which URL each object came from, and
+that URL's ETag/Last-Modified, so a new project only has to ask NAIF whether
+the files have changed before linking them in.
+
+By default the store lives in $XDG_CACHE_HOME/autometa/kernels (usually
+~/.cache/autometa/kernels).
+'''
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import stat
+import uuid
+from pathlib import Path
+
+def default_StoreDirectory():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return(Path(cache_home) / 'autometa' / 'kernels')
+
+class KernelStore:
+    """
+    The shared store at root (by default, default_StoreDirectory()).
+    Objects are read-only files at objects/<sha256[:2]>/<sha256>; the URL
+    records are small JSON files in urls/, one per URL, so that processes
+    sharing the store don't have to rewrite one big index.
+    """
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else default_StoreDirectory()
+        self.objects_dir = self.root / 'objects'
+        self.urls_dir = self.root / 'urls'
+
+    def object_path(self, sha256):
+        return(self.objects_dir / sha256[:2] / sha256)
+
+    def has(self, sha256):
+        return(sha256 is not None and self.object_path(sha256).exists())
+
+    def _url_path(self, url):
+        return(self.urls_dir / (hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json'))
+
+    def lookup(self, url):
+        """
+        What we last recorded about url (sha256, md5, size, etag,
+        last_modified), if its object is still in the store, else None
+        """
+        try:
+            with open(self._url_path(url)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return(None)
+        if record.get('url') != url or not self.has(record.get('sha256')):
+            return(None)
+        return(record)
+
+    def record(self, url, **fields):
+        self.urls_dir.mkdir(parents=True, exist_ok=True)
+        #  Under a name of its own, readable by everyone sharing the store
+        filepath = self._url_path(url)
+        tmp_filepath = filepath.with_name('{}.{}.tmp'.format(filepath.name, uuid.uuid4().hex))
+        with open(tmp_filepath, 'w') as f:
+            json.dump(dict(url=url, **fields), f)
+        os.replace(tmp_filepath, filepath)
+
+    def _place(self, source, destination):
+        #  Atomically make destination a hardlink to source, or a symlink if
+        #  they're on different filesystems (or hardlinks aren't allowed).
+        #  The link is made under a name no other thread or process will use
+        tmp_filepath = destination.with_name('.{}.{}.link'.format(destination.name, uuid.uuid4().hex))
+        try:
+            os.link(source, tmp_filepath)
+        except OSError as error:
+            if error.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            os.symlink(source, tmp_filepath)
+        os.replace(tmp_filepath, destination)
+        #  Renaming onto another link to the same file does nothing, leaving
+        #  the temporary link behind
+        tmp_filepath.unlink(missing_ok=True)
+
+    def add(self, filepath, sha256):
+        """
+        Put the file at filepath (whose SHA-256 is sha256) into the store,
+        and make filepath a link to the stored object. If the store already
+        has it, the file is simply replaced by a link, freeing its space.
+        """
+        filepath = Path(filepath)
+        object_path = self.object_path(sha256)
+        if object_path.exists():
+            if not os.path.samefile(object_path, filepath):
+                self._place(object_path, filepath)
+            return(object_path)
+
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_filepath = object_path.with_name('{}.{}.tmp'.format(sha256, uuid.uuid4().hex))
+        try:
+            os.link(filepath, tmp_filepath)
+        except OSError as error:
+            if error.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            shutil.copy2(filepath, tmp_filepath)
+        #  Stored objects are shared, so they mustn't be edited in place
+        os.chmod(tmp_filepath, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        try:
+            #  Unlike os.replace, os.link won't replace an object another
+            #  thread or process has just stored (and linked files to)
+            os.link(tmp_filepath, object_path)
+        except FileExistsError:
+            pass
+        except OSError as error:
+            if error.errno not in (errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            os.replace(tmp_filepath, object_path)
+        tmp_filepath.unlink(missing_ok=True)
+        if not os.path.samefile(object_path, filepath):
+            self._place(object_path, filepath)
+        return(object_path)
+
+    def link(self, sha256, destination):
+        """
+        Make destination a link to the stored object sha256
+        """
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        self._place(self.object_path(sha256), destination)
+        return(destination)
+
+    def adopt_Directory(self, directory):
+        """
+        Move every kernel in an existing kernel directory (and below) into
+        the store, leaving links behind; files already in the store just
+        become links to it. Hashes recorded in each directory's manifest
+        are reused rather than re-reading the files where possible.
+        """
+        try:
+            from .kernel_manifest import KernelManifest
+        except ImportError:
+            from kernel_manifest import KernelManifest
+
+        adopted = list()
+        for dirpath, dirnames, filenames in os.walk(directory):
+            manifest = KernelManifest(dirpath)
+            for filename in sorted(filenames):
+                if filename.startswith('.') or filename.endswith('.part'):
+                    continue
+                if not manifest.verify(filename):
+                    continue
+                entry = manifest.get(filename)
+                self.add(Path(dirpath) / filename, entry['sha256'])
+                if entry.get('url') is not None:
+                    self.record(entry['url'], sha256=entry['sha256'], md5=entry.get('md5'),
+                                size=entry['size'], etag=entry.get('etag'),
+                                last_modified=entry.get('last_modified'))
+                adopted.append(Path(dirpath) / filename)
+            manifest.save()
+        return(adopted)
+
+def as_KernelStore(store):
+    """
+    A KernelStore from store, which may be None/False (no store), True (the
+    default store), a directory, or a KernelStore
+    """
+    if store is None or store is False:
+        return(None)
+    if store is True:
+        return(KernelStore())
+    if isinstance(store, KernelStore):
+        return(store)
+    return(KernelStore(store))
@@ -8,10 +8,35 @@ Created on Wed Jun 14 15:17:29 2023
 
 import subprocess
 import os
-import glob
-import pandas as pd
 from pathlib import Path
 
+try:
+    from .kernel_download import KernelDownloader, PARTIAL_SUFFIX
+    from .naif_listing import get_DirectoryListing, match_DirectoryListing, find_Label
+    from .kernel_coverage import overlaps_Window, prune_Kernels
+    from .mission_catalog import get_Mission, get_GenericSources
+    from .sync_events import span_Phase
+except ImportError:
+    from kernel_download import KernelDownloader, PARTIAL_SUFFIX
+    from naif_listing import get_DirectoryListing, match_DirectoryListing, find_Label
+    from kernel_coverage import overlaps_Window, prune_Kernels
+    from mission_catalog import get_Mission, get_GenericSources
+    from sync_events import span_Phase
+
+def as_BaseURL(baseurl):
+    """
+    baseurl (a URL, path or Path) as a string ending in '/', so the catalog's
+    relative URLs can be appended to it
+    """
+    baseurl = str(baseurl)
+    if not baseurl.endswith('/'):
+        baseurl += '/'
+    return(baseurl)
+
+#  Where kernels come from: NAIF, unless AUTOMETA_BASEURL points at a local
+#  mirror or archive (see kernel_sources)
+NAIF_BASEURL = as_BaseURL(os.environ.get('AUTOMETA_BASEURL', 'https://naif.jpl.nasa.gov/pub/naif/'))
+
 def make_SPICEDirectories(spacecraft, basedir=''):
     
     #  Shape the spacecraft string and create a Path from the basedir
@@ -33,90 +58,91 @@ def make_SPICEDirectories(spacecraft, basedir=''):
     metakernel_filepath = SPICEdir / spacecraft / mk_name
     
     #  Check that the directories exist
-    for key, path in path_dict.items():
-        if not os.path.exists(path):
-            os.makedirs(path)
+    with span_Phase('make_directories', spacecraft=spacecraft) as span:
+        span['created'] = 0
+        for key, path in path_dict.items():
+            if not os.path.exists(path):
+                os.makedirs(path)
+                span['created'] += 1
     
     return(path_dict, metakernel_filepath)
 
-def get_SpacecraftKernels(spacecraft, spacecraft_kernel_dir, force_update=False, wget=False):
+def glob_Kernels(savedir, namepattern, select=None):
     """
-    
+    The kernels in savedir matching namepattern, leaving out incomplete 
+    downloads and hidden (bookkeeping) files, and, if given, any for which
+    select(filename) is False
     """
-    #  Shape the spacecraft string 
-    spacecraft = spacecraft.lower().strip().replace(' ','')
-    
-    baseurl = 'https://naif.jpl.nasa.gov/pub/naif/'
-    
-    path_info = pd.DataFrame(columns=['fk', 'spk'], 
-                             index=['url', 'savedir', 'namepattern'])
-    match spacecraft:
+    return([f for f in savedir.glob(namepattern) 
+            if not f.name.endswith(PARTIAL_SUFFIX) and not f.name.startswith('.')
+            and (select is None or select(f.name))])
 
-        case 'pioneer10':
-            path_info.loc['url', 'spk'] = [baseurl + 'PIONEER10/kernels/spk/']
-            path_info.loc['namepattern', 'spk'] = ['*.bsp']
-            
-        case 'pioneer11':
-            path_info.loc['url', 'spk'] = [baseurl + 'PIONEER11/kernels/spk/']
-            path_info.loc['namepattern', 'spk'] = ['*.bsp']
-            
-        case 'voyager1':
-            path_info.loc['url', 'spk'] = [baseurl + 'VOYAGER/kernels/spk/']
-            path_info.loc['namepattern', 'spk'] = ['Voyager_1.a54206u_V0.2_merged.bsp']
-            
-        case 'voyager2':
-            path_info.loc['url', 'spk'] = [baseurl + 'VOYAGER/kernels/spk/']
-            path_info.loc['namepattern', 'spk'] = ['Voyager_2.m05016u.merged.bsp']
-            
-        case 'cassini':
-            path_info.loc['url', 'spk'] = [baseurl + 'CASSINI/kernels/spk/']
-            path_info.loc['namepattern', 'spk'] = ['??????R_SCPSE_?????_?????.bsp', '??????RU_SCPSE_?????_?????.bsp']
-            
-            path_info.loc['url', 'fk'] = [baseurl + 'CASSINI/kernels/fk/']
-            path_info.loc['namepattern', 'fk'] = ['cas_dyn_v??.*']
-            
-            
-        case 'juno':
-            #path_info['spk']['url'] = [baseurl + 'pds/data/jno-j_e_ss-spice-6-v1.0/jnosp_1000/data/spk/']
-            path_info.loc['url', 'spk'] = [baseurl + 'JUNO/kernels/spk/']
-            #path_info['spk']['namepattern'] = ['*juno_rec_??????_??????_??????*.bsp']
-            path_info.loc['namepattern', 'spk'] = ['spk_rec_??????_??????_??????.bsp*']
-            
-            #path_info['fk']['url'] = [baseurl + 'pds/data/jno-j_e_ss-spice-6-v1.0/jnosp_1000/data/fk/']
-            path_info.loc['url', 'fk'] = [baseurl + 'JUNO/kernels/fk/']
-            path_info.loc['namepattern', 'fk'] = ['juno_v??.*']
-            
-        case 'messenger':
-            path_info.loc['url', 'spk'] = [baseurl + 'pds/data/mess-e_v_h-spice-6-v1.0/messsp_1000/data/spk/']
-            path_info.loc['namepattern', 'spk'] = ['msgr_??????_??????_recon_gsfc_1.bsp']  #  Excludes cruise phase
-            
-        case _:
-            return(None)
-    
-    path_info.loc['savedir', 'fk'] = [spacecraft_kernel_dir / 'fk']
-    path_info.loc['savedir', 'spk'] = [spacecraft_kernel_dir / 'spk']
-    
-    #  Loop over each column, getting the file
-    #  This is a horrible, horrible loop
-    retrieved_files = list()
-    for columnname, column in path_info.items():
-        if not pd.isna(column).any():
-            for url in column['url']:
-                for savedir in column['savedir']:
-                    for namepattern in column['namepattern']:
-                        
-                        if wget:
-                            #  Get the file with wget
-                            run_wgetForSPICE(url, savedir, namepattern, force_update=force_update)
-                        else:
-                            # Try urrlib
-                            run_urllibForSPICE(url, savedir, namepattern, force_update=force_update)
-                    
-                        #  Look for the files
-                        retrieved_files.extend(list(savedir.glob(namepattern)))
+def get_SpacecraftKernels(spacecraft, spacecraft_kernel_dir, force_update=False, wget=False,
+                          baseurl=NAIF_BASEURL, downloader=None, listing_cache=None,
+                          start=None, stop=None):
+    """
+    Download the kernels for spacecraft into spacecraft_kernel_dir and return
+    their filepaths. Unless wget is used, all files are fetched concurrently
+    through downloader (a KernelDownloader, created here if not given), and
+    directory listings are reused from listing_cache (a ListingCache; by 
+    default, one shared by the whole process).
+    
+    If start and/or stop (datetimes, dates or ISO strings; UTC unless they
+    give a time zone) are given, then for missions which encode each kernel's span in its file name (see 
+    kernel_coverage.FILENAME_CONVENTIONS), only kernels overlapping that
+    window are downloaded and returned.
+    
+    The supported spacecraft, and where their kernels are, are listed in
+    the mission catalog (see mission_catalog); returns None for any other.
+    """
+    mission = get_Mission(spacecraft)
+    if mission is None:
+        return(None)
+    
+    #  Only keep files which (might) cover the requested window
+    select = None
+    if (start is not None or stop is not None) and mission.filename_convention is not None:
+        convention = mission.filename_convention
+        select = lambda filename: overlaps_Window(filename, convention, start, stop)
+    
+    #  Each kind of kernel goes in its own subdirectory
+    baseurl = as_BaseURL(baseurl)
+    searches = [(baseurl + source.url, spacecraft_kernel_dir / source.type, namepattern)
+                for source in mission.sources for namepattern in source.namepatterns]
+    
+    with span_Phase('sync', kind='spacecraft', spacecraft=mission.name) as span:
+        #  Only make a downloader if we need one and weren't handed one
+        own_downloader = (downloader is None) and (not wget)
+        if own_downloader:
+            downloader = KernelDownloader()
+    
+        futures = list()
+        try:
+            for url, savedir, namepattern in searches:
+                if wget:
+                    #  Get the file with wget
+                    run_wgetForSPICE(url, savedir, namepattern, force_update=force_update)
+                else:
+                    # Try urrlib; this only queues the downloads
+                    futures.extend(run_urllibForSPICE(url, savedir, namepattern, force_update=force_update,
+                                                      downloader=downloader, listing_cache=listing_cache,
+                                                      select=select))
+        
+            if not wget:
+                downloader.wait(futures, desc='Downloading to {}'.format(spacecraft_kernel_dir))
+        finally:
+            if own_downloader:
+                downloader.close()
+    
+        #  Look for the files
+        retrieved_files = list()
+        for url, savedir, namepattern in searches:
+            retrieved_files.extend(glob_Kernels(savedir, namepattern, select=select))
+        span.update(queued=len(futures), files=len(retrieved_files))
     return(retrieved_files)
 
-def get_GenericKernels(generic_kernel_dir, basedir='', force_update=False, wget=False):
+def get_GenericKernels(generic_kernel_dir, basedir='', force_update=False, wget=False,
+                       baseurl=NAIF_BASEURL, downloader=None, listing_cache=None):
     """
     The generic kernels retrieved by this program are sufficient for playing
     around with SPICE, but are by no means exhaustive of those one would need
@@ -126,70 +152,47 @@ def get_GenericKernels(generic_kernel_dir, basedir='', force_update=False, wget=
     trade-offs (filesize vs duration, loading of necessary vs unnecessary 
     planetary ephemerides, etc.) to consider.
     """
-    import platform
-    
-    #  Check OS, which changes some file suffixes
-    current_os = platform.system()
-    
     if type(generic_kernel_dir) == str:
         generic_kernel_dir = Path(generic_kernel_dir)
     
-    #  Base SPICE kernel URL
-    baseurl = 'https://naif.jpl.nasa.gov/pub/naif/'
-    
-    path_info = pd.DataFrame(columns=['dsk', 'fk', 'lsk', 'pck', 'spk', ], 
-                             index=['url', 'namepattern'])
-    
-    #  DSK INFO
-    #  FK INFO
-    #  LSK INFO
-    suffix = '.tls'
-    if 'Windows' in current_os: suffix += '.pc'
-    path_info.loc['url', 'lsk']         = [baseurl + 'generic_kernels/lsk/']
-    #path_info['lsk']['savedir']     = [generic_kernel_dir / 'lsk']
-    path_info.loc['namepattern', 'lsk'] = ['naif????' + suffix,
-                                       'latest_leapseconds' + suffix]
-    
-    #  PCK INFO
-    suffix = '.tpc'
-    path_info.loc['url', 'pck']        = [baseurl + 'generic_kernels/pck/']
-    #path_info['pck']['savedir']     = [generic_kernel_dir / 'pck']
-    path_info.loc['namepattern', 'pck'] = ['pck00011' + suffix]
-    
-    #  SPK INFO
-    suffix = '.bsp'
-    path_info.loc['url', 'spk']         = [baseurl + 'generic_kernels/spk/planets/',
-                                       baseurl + 'generic_kernels/spk/satellites/']
-    #path_info['spk']['savedir']     = [generic_kernel_dir / 'spk' / 'planets',
-    #                                   generic_kernel_dir / 'spk' / 'satellites']
-    path_info.loc['namepattern', 'spk'] = ['de440s' + suffix,
-                                       'jup365' + suffix,
-                                       'sat441' + suffix]
-    
-    #  Loop over each column, getting the file
-    #  This is a horrible, horrible loop
-    retrieved_files = list()
-    for columnname, column in path_info.items():
-        if not pd.isna(column).any():
-            for url in column['url']:
-                for namepattern in column['namepattern']:
-                    #
-                    savedir_parts = Path(url.replace(baseurl, '')).parts[1:]
-                    savedir = generic_kernel_dir
-                    for part in savedir_parts: savedir = savedir / part
-                    # print(savedir)
-                    
-                    if wget:
-                        #  Get the file with wget
-                        run_wgetForSPICE(url, savedir, namepattern, force_update=force_update)
-                    else:
-                        # Try urrlib
-                        run_urllibForSPICE(url, savedir, namepattern, force_update=force_update)
-                    
-                    #  Look for the files
-                    retrieved_files.extend(list(savedir.glob(namepattern)))
-    #  Return filepaths of downloaded files
+    #  Mirror NAIF's layout below generic_kernels/, e.g. spk/planets/
+    baseurl = as_BaseURL(baseurl)
+    searches = list()
+    for source in get_GenericSources():
+        savedir = generic_kernel_dir.joinpath(*Path(source.url).parts[1:])
+        for namepattern in source.namepatterns:
+            searches.append((baseurl + source.url, savedir, namepattern))
+    
+    with span_Phase('sync', kind='generic') as span:
+        #  Only make a downloader if we need one and weren't handed one
+        own_downloader = (downloader is None) and (not wget)
+        if own_downloader:
+            downloader = KernelDownloader()
+    
+        futures = list()
+        try:
+            for url, savedir, namepattern in searches:
+                if wget:
+                    #  Get the file with wget
+                    run_wgetForSPICE(url, savedir, namepattern, force_update=force_update)
+                else:
+                    # Try urrlib; this only queues the downloads
+                    futures.extend(run_urllibForSPICE(url, savedir, namepattern, force_update=force_update,
+                                                      downloader=downloader, listing_cache=listing_cache))
+        
+            if not wget:
+                downloader.wait(futures, desc='Downloading to {}'.format(generic_kernel_dir))
+        finally:
+            if own_downloader:
+                downloader.close()
+    
+        #  Look for the files
+        retrieved_files = list()
+        for url, savedir, namepattern in searches:
+            retrieved_files.extend(glob_Kernels(savedir, namepattern))
+        span.update(queued=len(futures), files=len(retrieved_files))
     
+    #  Return filepaths of downloaded files
     return(retrieved_files)
 
 def run_wgetForSPICE(url, savedir, namepattern, show_progress=True, force_update=False):
@@ -225,48 +228,222 @@ def run_wgetForSPICE(url, savedir, namepattern, show_progress=True, force_update
     
     subprocess.run(commandline, check=True)
 
-def run_urllibForSPICE(url, savedir, namepattern, show_progress=True, force_update=False):
-    import urllib.request
-    import re
-    from fnmatch import fnmatch
-    import tqdm
-    
-    # #  In case savedir is being handled as a pathlib Path, which subprocess
-    # #  doesn't like
-    # savedir = str(savedir)
-    
-    # html_url = url
-    with urllib.request.urlopen(url) as response:
-        html_body = response.read().decode('utf-8')
-    
-    # Three-part filtering, for interpretability
-    # First, filter the html for all hrefs (links)
-    href_pattern = r'href=["\']([^"\']*)["\']'
-    href_list = re.findall(href_pattern, html_body)
-    
-    # Second, remove weblinks (we only want files
-    file_list = [l for l in href_list if not l.startswith('http')]
-
-    # Third, match the remaining files to our namepattern
-    matching_file_list = [l for l in file_list if fnmatch(l, namepattern)]
-        
-    # Now download
-    for f in tqdm.tqdm(matching_file_list, desc='Downloading to {}'.format(savedir)):
-        if not savedir.is_dir():
-            savedir.mkdir(parents=True)
-        filepath = savedir / f
-        urllib.request.urlretrieve(url+f, filepath)
-    
-    return
-    
-def make_Metakernel(spacecraft, basedir = '', force_update=False):
-    
-    #  Get paths to store SPICE kernels, including the metakernel
-    path_dict, mk_filepath = make_SPICEDirectories(spacecraft, basedir)
+def run_urllibForSPICE(url, savedir, namepattern, show_progress=True, force_update=False, downloader=None,
+                       listing_cache=None, select=None):
+    """
+    Download every file in the directory listing at url which matches 
+    namepattern (a pattern, or a list of patterns) to savedir, and for which
+    select(filename) is True, if select is given. The listing is only 
+    fetched if it isn't already held in listing_cache.
+    
+    If a KernelDownloader is passed as downloader, the downloads are only 
+    queued on it and a list of Futures is returned, so that many calls can
+    share one pool of workers and connections; the caller then waits on 
+    them with downloader.wait(). Otherwise, the files are downloaded before
+    returning.
+    """
+    savedir = Path(savedir)
+    
+    #  Without a shared downloader, make one and wait for it here
+    if downloader is None:
+        with KernelDownloader(show_progress=show_progress) as downloader:
+            futures = run_urllibForSPICE(url, savedir, namepattern, force_update=force_update, 
+                                         downloader=downloader, listing_cache=listing_cache, select=select)
+            downloader.wait(futures, desc='Downloading to {}'.format(savedir))
+        return(futures)
+    
+    #  Find the files in the listing which match our namepattern
+    file_list = get_DirectoryListing(url, downloader, cache=listing_cache)
+    matching_file_list = match_DirectoryListing(file_list, namepattern)
+    if select is not None:
+        matching_file_list = [entry for entry in matching_file_list if select(entry.name)]
+    
+    # Now download, checking against published checksums where we can. The
+    # listing's sizes and times let files we already have skip the server.
+    # Labels go first, so that they're already on their way when the files
+    # they describe are checked, and needn't be fetched twice
+    names = set(entry.name for entry in file_list)
+    labels = set(find_Label(entry.name, names) for entry in matching_file_list)
+    matching_file_list.sort(key=lambda entry: entry.name not in labels)
+    futures = list()
+    for entry in matching_file_list:
+        f = entry.name
+        label = find_Label(f, names)
+        label_url = None if label is None else url+label
+        futures.append(downloader.download(url+f, savedir / f, force_update=force_update, label_url=label_url,
+                                           listed=entry))
+    
+    return(futures)
+    
+def make_Metakernel(spacecraft, basedir = '', force_update=False, start=None, stop=None,
+                    prune=False, targets=None, overwrite=None, store=None, baseurl=NAIF_BASEURL):
+    """
+    Download the kernels for spacecraft (and the generic kernels) and write
+    a metakernel pointing to them, returning its filepath. If start and/or 
+    stop are given, spacecraft kernels which certainly don't cover that
+    window are neither downloaded nor listed (see get_SpacecraftKernels).
+    
+    By default, kernels are listed alphabetically. With prune, SPKs whose
+    segments (for targets, a list of NAIF IDs, or for everything if None)
+    are entirely superseded by newer SPKs are left out, and the rest are 
+    listed oldest first, so the newest data takes priority in SPICE (see
+    kernel_coverage.prune_Kernels). targets only narrows the spacecraft
+    kernels; generic kernels are only left out if other generic kernels
+    supersede them entirely.
+    
+    If the metakernel already exists, you are asked whether to overwrite it,
+    unless overwrite is True or False.
+    
+    If store is given (True for the default location under $XDG_CACHE_HOME,
+    or a directory or KernelStore), kernels are kept once in that shared 
+    store and hardlinked into this project, and any already there are 
+    linked rather than downloaded (see kernel_store).
+    
+    baseurl may instead be a local mirror of NAIF's tree, or a tar archive
+    of one, to set up without network access (see kernel_sources), with or
+    without a trailing '/'.
+    """
     
-    generic_kernel_filepaths = get_GenericKernels(path_dict['generic_kernel_dir'], force_update=force_update)   
+    with span_Phase('make_metakernel', spacecraft=spacecraft) as span:
+        #  Get paths to store SPICE kernels, including the metakernel
+        path_dict, mk_filepath = make_SPICEDirectories(spacecraft, basedir)
+        
+        with KernelDownloader(store=store) as downloader:
+            generic_kernel_filepaths = get_GenericKernels(path_dict['generic_kernel_dir'], force_update=force_update,
+                                                          baseurl=baseurl, downloader=downloader)   
+            
+            spacecraft_kernel_filepaths = get_SpacecraftKernels(spacecraft, path_dict['spacecraft_kernel_dir'], force_update=force_update,
+                                                                start=start, stop=stop, baseurl=baseurl, downloader=downloader)
+        span.update(fetched=downloader.fetched_count, skipped=downloader.skipped_count)
+        
+        with span_Phase('write_metakernel', spacecraft=spacecraft, filepath=str(mk_filepath)) as write_span:
+            write_span['written'] = write_Metakernel(spacecraft, mk_filepath, path_dict, generic_kernel_filepaths,
+                                                     spacecraft_kernel_filepaths, basedir=basedir, prune=prune,
+                                                     targets=targets, overwrite=overwrite)
     
-    spacecraft_kernel_filepaths = get_SpacecraftKernels(spacecraft, path_dict['spacecraft_kernel_dir'], force_update=force_update)
+    return(mk_filepath)
+
+class MetakernelBuildError(Exception):
+    """
+    Some of the metakernels in a make_Metakernels batch couldn't be built.
+    errors maps each spacecraft that failed (or 'generic', if the generic
+    kernels did) to its exception; metakernels holds the result for every
+    spacecraft, as make_Metakernels would have returned it, with None for
+    those that failed.
+    """
+    def __init__(self, errors, metakernels):
+        self.errors = errors
+        self.metakernels = metakernels
+        super().__init__('Failed to build metakernels for: ' + 
+                         ', '.join('{} ({!r})'.format(name, error) for name, error in errors.items()))
+
+def make_Metakernels(spacecraft_list, basedir = '', force_update=False, start=None, stop=None,
+                     prune=False, targets=None, overwrite=True, store=None, baseurl=NAIF_BASEURL, 
+                     max_workers=8, show_progress=True):
+    """
+    Build the metakernels for every spacecraft in spacecraft_list in one go,
+    returning a dict of spacecraft: metakernel filepath (None for any which
+    aren't supported, for which nothing is created). Arguments are as for 
+    make_Metakernel.
+    
+    Everything shares one KernelDownloader and ListingCache, so the generic
+    kernels are synced once, each directory listing is fetched once, and
+    all the downloads run concurrently. Existing metakernels are 
+    overwritten by default (never prompting), so this is safe to run 
+    unattended, e.g. from cron: a spacecraft whose kernels fail to sync
+    doesn't stop the others' metakernels being written, and the failures
+    are raised together at the end as a MetakernelBuildError.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    try:
+        from .naif_listing import ListingCache
+    except ImportError:
+        from naif_listing import ListingCache
+    
+    #  Shape the spacecraft strings, dropping repeats
+    spacecraft_list = list(dict.fromkeys(sc.lower().strip().replace(' ','') for sc in spacecraft_list))
+    if len(spacecraft_list) == 0:
+        raise ValueError('No spacecraft given to make_Metakernels')
+    
+    #  Unsupported spacecraft get no directories and no metakernel
+    mk_filepaths = dict()
+    supported = list()
+    for sc in spacecraft_list:
+        if get_Mission(sc) is None:
+            print('Spacecraft ' + sc + ' is not supported; no metakernel written.')
+            mk_filepaths[sc] = None
+        else:
+            supported.append(sc)
+    if len(supported) == 0:
+        return(mk_filepaths)
+    
+    errors = dict()
+    with span_Phase('make_metakernels', spacecraft=supported) as span:
+        paths = {sc: make_SPICEDirectories(sc, basedir) for sc in supported}
+        generic_kernel_dir = paths[supported[0]][0]['generic_kernel_dir']
+        
+        listing_cache = ListingCache()
+        with KernelDownloader(max_workers=max_workers, show_progress=show_progress, store=store) as downloader:
+            #  Each search runs in its own thread, but they all queue their
+            #  files on the one downloader
+            with ThreadPoolExecutor(max_workers=len(supported) + 1) as planner:
+                generic_future = planner.submit(get_GenericKernels, generic_kernel_dir, force_update=force_update,
+                                                baseurl=baseurl, downloader=downloader, listing_cache=listing_cache)
+                spacecraft_futures = {sc: planner.submit(get_SpacecraftKernels, sc, path_dict['spacecraft_kernel_dir'],
+                                                         force_update=force_update, baseurl=baseurl, 
+                                                         downloader=downloader, listing_cache=listing_cache,
+                                                         start=start, stop=stop)
+                                      for sc, (path_dict, _) in paths.items()}
+                
+                #  One failure shouldn't cost every other spacecraft its
+                #  metakernel, but without the generic kernels none can be
+                #  written
+                try:
+                    generic_kernel_filepaths = generic_future.result()
+                except Exception as error:
+                    errors['generic'] = error
+                spacecraft_kernel_filepaths = dict()
+                for sc, future in spacecraft_futures.items():
+                    try:
+                        spacecraft_kernel_filepaths[sc] = future.result()
+                    except Exception as error:
+                        errors[sc] = error
+        span.update(fetched=downloader.fetched_count, skipped=downloader.skipped_count)
+    
+        #  Write all the metakernels at the end
+        for sc, (path_dict, mk_filepath) in paths.items():
+            mk_filepaths[sc] = None
+            if 'generic' in errors or sc not in spacecraft_kernel_filepaths:
+                continue
+            try:
+                with span_Phase('write_metakernel', spacecraft=sc, filepath=str(mk_filepath)) as write_span:
+                    write_span['written'] = write_Metakernel(sc, mk_filepath, path_dict, generic_kernel_filepaths,
+                                                             spacecraft_kernel_filepaths[sc], basedir=basedir,
+                                                             prune=prune, targets=targets, overwrite=overwrite)
+                mk_filepaths[sc] = mk_filepath
+            except Exception as error:
+                errors[sc] = error
+        span.update(failed=list(errors))
+    
+    mk_filepaths = {sc: mk_filepaths[sc] for sc in spacecraft_list}
+    if len(errors) > 0:
+        raise MetakernelBuildError(errors, mk_filepaths)
+    return(mk_filepaths)
+
+def write_Metakernel(spacecraft, mk_filepath, path_dict, generic_kernel_filepaths, spacecraft_kernel_filepaths,
+                     basedir='', prune=False, targets=None, overwrite=None):
+    """
+    Write the metakernel at mk_filepath listing the given kernels (see
+    make_Metakernel). Returns True if it was written.
+    """
+    if prune:
+        mission = get_Mission(spacecraft)
+        convention = mission.filename_convention if mission is not None else None
+        #  targets are the spacecraft's bodies; the generic kernels are only
+        #  pruned of files other generic kernels supersede
+        generic_kernel_filepaths = prune_Kernels(generic_kernel_filepaths)
+        spacecraft_kernel_filepaths = prune_Kernels(spacecraft_kernel_filepaths, targets=targets, 
+                                                    convention=convention)
     
     #  Now that you downloaded all the received Juno telemetry from the front-facing NAIF database
     #  Read the file names and construct a metakernel
@@ -305,7 +482,8 @@ def make_Metakernel(spacecraft, basedir = '', force_update=False):
             formatted_path = Path('$GENERIC') / rel_filepath
             formatted_path_str = "\t'" + str(formatted_path) + "'"
             generic_path_str_to_write.append(formatted_path_str)
-    generic_path_str_to_write.sort()
+    if not prune:
+        generic_path_str_to_write.sort()
             
     for filepath in spacecraft_kernel_filepaths:
         rel_filepath = Path(os.path.relpath(filepath, path_dict['spacecraft_kernel_dir']))
@@ -315,14 +493,15 @@ def make_Metakernel(spacecraft, basedir = '', force_update=False):
             formatted_path = Path('$SPACECRAFT') / rel_filepath
             formatted_path_str = "\t'" + str(formatted_path) + "'"
             spacecraft_path_str_to_write.append(formatted_path_str)
-    spacecraft_path_str_to_write.sort()
+    if not prune:
+        spacecraft_path_str_to_write.sort()
     
     check = 'n'
-    if os.path.exists(mk_filepath):
+    if not os.path.exists(mk_filepath) or overwrite == True:
+        check = 'y'
+    elif overwrite is None:
         print('Metakernel text file: ' + str(mk_filepath) + ' already exists.')
         check = input('Would you like to overwrite it? (y/n)  ')
-    else:
-        check = 'y'
     
     if check == 'y':
         with open(mk_filepath, mode='w') as f:
@@ -338,7 +517,7 @@ def make_Metakernel(spacecraft, basedir = '', force_update=False):
             for output_line in metakernel_footer:
                 f.write('%s\n' % output_line)
     
-    return(mk_filepath)
+    return(check == 'y')
 
 if __name__ == "__main__":
     spacecraft = input('Name of target spacecraft:')
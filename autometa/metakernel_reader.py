@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Sun Oct 18 11:02:44 2026
+
+@author: mrutala
+
+Reading metakernels (like those written by make_Metakernel) without SPICE,
+to find out which kernel files they load, and in what order.
+
+Only the parts of the text kernel format that metakernels (and simple
+kernels like the LSK) use are handled: the \\begindata blocks, quoted
+strings (with '' for a quote), numbers and @dates, and for metakernels the
+KERNELS_TO_LOAD, PATH_VALUES and PATH_SYMBOLS variables. See NAIF's
+Kernel Required Reading for the full format:
+https://naif.jpl.nasa.gov/pub/naif/toolkit_docs/C/req/kernel.html
+'''
+
+import re
+from pathlib import Path
+
+def parse_TextKernelData(text):
+    """
+    A dict of variable name: list of values from the data blocks of a text
+    kernel. Strings are returned without their quotes; numbers as floats;
+    @dates (as in leapseconds kernels) as strings without the @. += appends
+    to a variable, as in SPICE.
+    """
+    #  Keep only what's between \begindata and \begintext
+    data = list()
+    in_data = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('\\begindata'):
+            in_data = True
+        elif stripped.startswith('\\begintext'):
+            in_data = False
+        elif in_data:
+            data.append(line)
+    data = '\n'.join(data)
+
+    token_pattern = r"'((?:[^']|'')*)'|(\+?=)|([()])|([^\s,()'=+][^\s,()'=]*)"
+    variables = dict()
+    name = None
+    append = False
+    for match in re.finditer(token_pattern, data):
+        string, assignment, paren, word = match.groups()
+        if assignment is not None:
+            append = assignment == '+='
+            if not append or name not in variables:
+                variables[name] = list()
+        elif paren is not None:
+            continue
+        elif string is not None:
+            variables[name].append(string.replace("''", "'"))
+        elif word is not None:
+            if word.startswith('@'):
+                variables[name].append(word[1:])
+                continue
+            try:
+                value = float(word.replace('D', 'E').replace('d', 'e'))
+            except ValueError:
+                #  A bare word is the name of the next variable
+                name = word
+                continue
+            variables[name].append(value)
+    return(variables)
+
+def read_Metakernel(filepath):
+    """
+    The kernel file paths loaded by the metakernel at filepath, in load
+    order, with PATH_SYMBOLS substituted. Relative paths are taken relative
+    to the current directory, as SPICE does.
+    """
+    with open(filepath) as f:
+        variables = parse_TextKernelData(f.read())
+
+    symbols = dict(zip(variables.get('PATH_SYMBOLS', []), variables.get('PATH_VALUES', [])))
+    filepaths = list()
+    for kernel in variables.get('KERNELS_TO_LOAD', []):
+        for symbol, value in symbols.items():
+            kernel = kernel.replace('$' + symbol, value)
+        filepaths.append(Path(kernel))
+    return(filepaths)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Mon Oct 19 09:12:40 2026
+
+@author: mrutala
+
+The catalog of missions (and generic kernels) that make_Metakernel knows how
+to fetch. Each mission is a list of kernel sources, each a NAIF directory
+(relative to the base URL), the kind of kernel found there, and the file
+name patterns to fetch from it, plus optionally the name of the mission's
+file name convention (see kernel_coverage.FILENAME_CONVENTIONS) or a
+convention of its own.
+
+The built-in catalog is missions.json, next to this file. Site-specific
+missions can be added without editing it, by:
+    - listing extra JSON files, in the same format, in the AUTOMETA_MISSIONS
+      environment variable (separated by os.pathsep),
+    - installing a package with an 'autometa.missions' entry point, a
+      function returning a dict in the same format as the "missions"
+      section, or
+    - calling register_Mission() at runtime.
+Later sources override earlier ones, in that order. The catalog is only read
+the first time it's needed.
+'''
+
+import json
+import os
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+MISSION_CATALOG_FILEPATH = Path(__file__).with_name('missions.json')
+MISSIONS_ENVIRONMENT_VARIABLE = 'AUTOMETA_MISSIONS'
+MISSIONS_ENTRY_POINT_GROUP = 'autometa.missions'
+
+#  One NAIF directory to search: the kind of kernel (fk, spk, ...), its URL
+#  relative to the base URL, and the file name patterns to fetch
+KernelSource = namedtuple('KernelSource', ['type', 'url', 'namepatterns'])
+Mission = namedtuple('Mission', ['name', 'sources', 'filename_convention'])
+
+_catalog = None
+_registered = dict()
+_lock = threading.Lock()
+
+def normalize_MissionName(name):
+    """
+    Mission names are matched ignoring case and spaces, so 'Voyager 1'
+    is 'voyager1'
+    """
+    return(name.lower().strip().replace(' ', ''))
+
+def _parse_Sources(entries, windows=False):
+    sources = list()
+    for entry in entries:
+        namepatterns = list(entry['namepatterns'])
+        if windows and entry.get('windows_suffix'):
+            namepatterns = [namepattern + entry['windows_suffix'] for namepattern in namepatterns]
+        sources.append(KernelSource(entry['type'], entry['url'], namepatterns))
+    return(sources)
+
+def _parse_Missions(missions):
+    parsed = dict()
+    for name, entry in missions.items():
+        name = normalize_MissionName(name)
+        parsed[name] = Mission(name, _parse_Sources(entry['sources']), entry.get('filename_convention'))
+    return(parsed)
+
+def _read_CatalogFile(filepath):
+    with open(filepath) as f:
+        return(json.load(f))
+
+def _load_Catalog():
+    import platform
+    windows = 'Windows' in platform.system()
+
+    builtin = _read_CatalogFile(MISSION_CATALOG_FILEPATH)
+    catalog = {'generic': _parse_Sources(builtin['generic']['sources'], windows=windows),
+               'missions': _parse_Missions(builtin['missions'])}
+
+    for filepath in os.environ.get(MISSIONS_ENVIRONMENT_VARIABLE, '').split(os.pathsep):
+        if filepath.strip() == '':
+            continue
+        extra = _read_CatalogFile(filepath)
+        catalog['missions'].update(_parse_Missions(extra.get('missions', dict())))
+        if 'generic' in extra:
+            catalog['generic'] = _parse_Sources(extra['generic']['sources'], windows=windows)
+
+    from importlib.metadata import entry_points
+    for entry_point in entry_points(group=MISSIONS_ENTRY_POINT_GROUP):
+        catalog['missions'].update(_parse_Missions(entry_point.load()()))
+    return(catalog)
+
+def get_MissionCatalog():
+    """
+    The catalog, as {'generic': [KernelSource, ...], 'missions': {name:
+    Mission}}, read on first use
+    """
+    global _catalog
+    with _lock:
+        if _catalog is None:
+            _catalog = _load_Catalog()
+        missions = dict(_catalog['missions'])
+        missions.update(_registered)
+        return({'generic': list(_catalog['generic']), 'missions': missions})
+
+def reload_MissionCatalog():
+    """
+    Forget the catalog, so it's read again (e.g. after changing
+    AUTOMETA_MISSIONS) the next time it's needed
+    """
+    global _catalog
+    with _lock:
+        _catalog = None
+
+def register_Mission(name, sources, filename_convention=None):
+    """
+    Add (or replace) the mission name, whose sources are KernelSources or
+    dicts with 'type', 'url' and 'namepatterns' keys, for this process
+    """
+    sources = [KernelSource(**source) if isinstance(source, dict) else KernelSource(*source)
+               for source in sources]
+    name = normalize_MissionName(name)
+    with _lock:
+        _registered[name] = Mission(name, sources, filename_convention)
+    return(_registered[name])
+
+def get_Mission(name):
+    """
+    The Mission called name, or None if it isn't in the catalog
+    """
+    return(get_MissionCatalog()['missions'].get(normalize_MissionName(name)))
+
+def get_GenericSources():
+    """
+    The KernelSources of the generic kernels
+    """
+    return(get_MissionCatalog()['generic'])
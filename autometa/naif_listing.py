@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Wed Oct 14 11:08:45 2026
+
+@author: mrutala
+
+Fetching and caching NAIF directory listings. Many kernel searches look in
+the same directory (e.g. the three generic SPK patterns, or Voyager 1 and 2
+both searching VOYAGER/kernels/spk/), so each listing is fetched and parsed
+once, then kept for a while in memory (and, optionally, on disk) and matched
+against as many name patterns as needed.
+
+Listings are parsed as they stream in, line by line, into (name, size,
+mtime) records, keeping the size and last-modified columns of the Apache
+index pages NAIF serves. These are enough to tell whether a file we already
+have is unchanged without asking the server about it: if its entry is just
+as it was when we downloaded it, so is the file.
+
+Apache renders those times in the server's local time (US/Pacific, for
+NAIF) without saying so, so they aren't compared with the files' real
+modification times, only with earlier listings from the same server.
+'''
+
+import calendar
+import codecs
+import datetime as dt
+import hashlib
+import html
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from fnmatch import fnmatch
+from pathlib import Path
+
+#  One file in a directory listing: its name (as linked), its size in bytes
+#  and its modification time (to the minute, as POSIX seconds of the 
+#  server's local wall-clock time), each None if the listing doesn't show
+#  it. Sizes above 1K are only approximate, as Apache rounds them (e.g. 
+#  '5.1K', ' 31M')
+ListingEntry = namedtuple('ListingEntry', ['name', 'size', 'mtime'])
+
+#  Bumped whenever the records kept on disk change shape
+LISTING_FORMAT = 2
+
+class ListingCache:
+    """
+    Directory listings keyed by URL, each valid for ttl seconds. If cache_dir
+    is given, listings are also stored there as JSON so that they can be
+    shared between processes (e.g. successive cron jobs).
+    """
+    def __init__(self, ttl=600., cache_dir=None):
+        self.ttl = ttl
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._entries = dict()
+        self._lock = threading.Lock()
+        self._url_locks = dict()
+
+        #  Running totals, to see how much fetching we saved
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_filepath(self, url):
+        return(self.cache_dir / (hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json'))
+
+    def url_lock(self, url):
+        """
+        A lock per URL, so concurrent callers wait for one fetch rather than
+        all fetching the same listing
+        """
+        with self._lock:
+            return(self._url_locks.setdefault(url, threading.Lock()))
+
+    def get(self, url):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None and self.cache_dir is not None:
+            try:
+                with open(self._disk_filepath(url)) as f:
+                    entry = json.load(f)
+                if entry['url'] != url or entry.get('format') != LISTING_FORMAT:
+                    entry = None
+                else:
+                    entry['listing'] = [ListingEntry(*record) for record in entry['listing']]
+            except (OSError, ValueError, KeyError, TypeError):
+                entry = None
+            if entry is not None:
+                with self._lock:
+                    self._entries[url] = entry
+
+        with self._lock:
+            if entry is None or now - entry['fetched'] > self.ttl:
+                self.misses += 1
+                return(None)
+            self.hits += 1
+        return(entry['listing'])
+
+    def put(self, url, listing):
+        entry = {'url': url, 'fetched': time.time(), 'format': LISTING_FORMAT, 'listing': list(listing)}
+        with self._lock:
+            self._entries[url] = entry
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            #  Threads and processes sharing cache_dir each write their own
+            #  file, then rename it into place
+            with tempfile.NamedTemporaryFile('w', dir=self.cache_dir, suffix='.tmp', delete=False) as f:
+                json.dump(entry, f)
+            os.replace(f.name, self._disk_filepath(url))
+
+    def clear(self):
+        with self._lock:
+            self._entries = dict()
+        if self.cache_dir is not None:
+            for filepath in self.cache_dir.glob('*.json'):
+                filepath.unlink()
+
+#  Shared by every search in this process unless another cache is given
+DEFAULT_LISTING_CACHE = ListingCache()
+
+_ANCHOR_PATTERN = re.compile(r'<a\s[^>]*?href=["\']([^"\']*)["\'][^>]*>.*?</a>(.*?)(?=<a\s|$)',
+                             re.IGNORECASE | re.DOTALL)
+#  The columns after a link: last modified (e.g. '2021-02-08 13:14', or
+#  '08-Feb-2021 13:14' from older Apaches) then size (e.g. '5.1K', or '-')
+_COLUMNS_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2}|\d{2}-[A-Za-z]{3}-\d{4})\s+(\d{2}:\d{2})(?::\d{2})?'
+                              r'\s+(?:(\d+(?:\.\d+)?)([KMGT]?)\b|-)')
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+
+def _parse_ListingTime(date, time_of_day):
+    for date_format in ['%Y-%m-%d', '%d-%b-%Y']:
+        try:
+            timestamp = dt.datetime.strptime(date + ' ' + time_of_day, date_format + ' %H:%M')
+        except ValueError:
+            continue
+        #  Listings don't say which time zone they're in, so this is only
+        #  comparable with other times from the same server's listings
+        return(float(calendar.timegm(timestamp.timetuple())))
+    return(None)
+
+def _parse_ListingLine(line):
+    #  Every file linked from one line of a listing, with whatever size and
+    #  modification time follow its link. Sorting links ('?C=N;O=D'), the
+    #  parent directory and other sites are skipped
+    for match in _ANCHOR_PATTERN.finditer(line):
+        href, columns = match.groups()
+        if href.startswith(('?', '/', '#', '../', 'http:', 'https:', 'mailto:')) or href == '':
+            continue
+        size, mtime = None, None
+        columns = _COLUMNS_PATTERN.search(html.unescape(re.sub(r'<[^>]*>', ' ', columns)))
+        if columns is not None:
+            date, time_of_day, number, unit = columns.groups()
+            mtime = _parse_ListingTime(date, time_of_day)
+            if number is not None:
+                size = int(round(float(number) * _SIZE_UNITS[unit.upper()]))
+        yield(ListingEntry(href, size, mtime))
+
+def iter_DirectoryListing(chunks, encoding='utf-8'):
+    """
+    Yield a ListingEntry for each file in a directory listing page, parsing
+    it line by line as chunks (an iterable of bytes or str, e.g. reads from
+    an HTTP response) arrive, so the page is never held whole
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    buffer = ''
+    for chunk in chunks:
+        buffer += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        lines, _, buffer = buffer.rpartition('\n')
+        if lines:
+            for line in lines.split('\n'):
+                yield from _parse_ListingLine(line)
+    buffer += decoder.decode(b'', final=True)
+    yield from _parse_ListingLine(buffer)
+
+def _count_Bytes(chunks, report):
+    for chunk in chunks:
+        report['bytes'] = report.get('bytes', 0) + len(chunk)
+        yield(chunk)
+
+def stream_DirectoryListing(url, downloader, chunk_size=64*1024, report=None):
+    """
+    Yield a ListingEntry for each file in the directory listing at url, as
+    it downloads with downloader (a KernelDownloader). If report (a dict) is
+    given, the bytes read are counted in report['bytes'].
+    """
+    with downloader.open(url) as response:
+        chunks = iter(lambda: response.read(chunk_size), b'')
+        if report is not None:
+            chunks = _count_Bytes(chunks, report)
+        yield from iter_DirectoryListing(chunks)
+
+def parse_DirectoryListing(html_body):
+    """
+    The ListingEntries of the files linked from a directory listing page
+    """
+    return(list(iter_DirectoryListing([html_body])))
+
+def get_DirectoryListing(url, downloader, cache=None):
+    """
+    The ListingEntries of the files in the directory listing at url, 
+    fetched with downloader (a KernelDownloader) only if cache doesn't 
+    already hold them. url may also be a local mirror or archive (see
+    kernel_sources). Emits a 'listing' event (see sync_events).
+    """
+    #  Local mirrors and archives are listed directly (see kernel_sources)
+    try:
+        from .kernel_sources import find_LocalSource
+        from .sync_events import emit_Event
+    except ImportError:
+        from kernel_sources import find_LocalSource
+        from sync_events import emit_Event
+    start = time.perf_counter()
+    report = dict()
+    local = find_LocalSource(url)
+    if local is not None:
+        source, location = local
+        file_list = source.list_Directory(location)
+        cached = False
+    else:
+        if cache is None:
+            cache = DEFAULT_LISTING_CACHE
+
+        with cache.url_lock(url):
+            file_list = cache.get(url)
+            cached = file_list is not None
+            if not cached:
+                file_list = list(stream_DirectoryListing(url, downloader, report=report))
+                cache.put(url, file_list)
+    emit_Event('listing', url=url, cached=cached, entries=len(file_list), seconds=time.perf_counter() - start,
+               bytes=report.get('bytes'))
+    return(file_list)
+
+def match_DirectoryListing(file_list, namepatterns):
+    """
+    The entries in file_list matching any of namepatterns (a pattern or list
+    of patterns), without duplicates and in listing order
+    """
+    if type(namepatterns) == str:
+        namepatterns = [namepatterns]
+    matches = dict()
+    for entry in file_list:
+        if entry.name not in matches and any(fnmatch(entry.name, namepattern) for namepattern in namepatterns):
+            matches[entry.name] = entry
+    return(list(matches.values()))
+
+def listed_Fields(entry):
+    """
+    What to record about the ListingEntry entry of a file when it's
+    downloaded, for listing_Matches to compare later listings against
+    """
+    if entry is None or entry.size is None or entry.mtime is None:
+        return(dict())
+    return({'listed': [entry.size, entry.mtime]})
+
+def listing_Matches(entry, listed):
+    """
+    True if the ListingEntry entry shows the same size and time as listed,
+    the [size, mtime] recorded (by listed_Fields) from the listing when we
+    downloaded the file, i.e. the file hasn't changed since. Listing times
+    are in the server's unstated local time, so they're only ever compared
+    with each other.
+    """
+    if entry is None or entry.size is None or entry.mtime is None or listed is None:
+        return(False)
+    return([entry.size, entry.mtime] == list(listed))
+
+def find_Label(name, file_list):
+    """
+    The label (PDS3 .lbl, PDS4 .xml) or .md5 file for name in file_list (a
+    collection of file names), which may hold its published checksum, or
+    None
+    """
+    stem = name.rsplit('.', 1)[0]
+    for candidate in [name + '.lbl', stem + '.lbl', stem + '.xml', name + '.md5']:
+        if candidate != name and candidate in file_list:
+            return(candidate)
+    return(None)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Mon Oct 19 16:02:38 2026
+
+@author: mrutala
+
+Cutting SPKs down to the bodies and time span a job needs, so that it can
+furnish (or be shipped) a few hundred kB instead of whole planetary and
+mission ephemerides.
+
+Segments are read with daf_reader. Type 2 and 3 segments (Chebyshev
+records of fixed length, as in de440s.bsp, jup365.bsp, sat441.bsp and most
+spacecraft reconstructions) are trimmed to the records covering the
+window, with their INIT and N updated to match. Segments of other types
+can't be cut without understanding their layout, so their data are copied
+whole and only their descriptors' time spans are narrowed to the window.
+
+The output is written as a little-endian binary DAF (see NAIF's DAF and
+SPK Required Readings), readable by SPICE or spk_evaluator, with the
+subset's provenance in its comment area. Segments keep their relative
+priority: later files, and later segments in a file, still win.
+'''
+
+import math
+import os
+import shutil
+import struct
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from .daf_reader import DAFFile, RECORD_BYTES, read_SPKSegments
+    from .metakernel_reader import read_Metakernel
+    from .spk_evaluator import as_BodyCode, SPKEvaluationError
+except ImportError:
+    from daf_reader import DAFFile, RECORD_BYTES, read_SPKSegments
+    from metakernel_reader import read_Metakernel
+    from spk_evaluator import as_BodyCode, SPKEvaluationError
+
+RECORD_DOUBLES = RECORD_BYTES // 8
+
+#  The FTP validation string SPICE checks binary kernels for, to catch
+#  files mangled by ASCII-mode transfers
+_FTP_STRING = b'FTPSTR:\r:\n:\r\n:\r\x00:\x81:\x10\xce:ENDFTP'
+
+#  An SPK summary: 2 doubles (start and stop ET) and 6 integers (target,
+#  center, frame, type, begin and end addresses), packed into 5 doubles
+_SPK_ND, _SPK_NI = 2, 6
+_SUMMARY_DOUBLES = _SPK_ND + (_SPK_NI + 1) // 2
+_SUMMARIES_PER_RECORD = (RECORD_DOUBLES - 3) // _SUMMARY_DOUBLES
+_NAME_CHARACTERS = 8 * _SUMMARY_DOUBLES
+_COMMENT_CHARACTERS = 1000
+
+def _trim_Chebyshev(daf, summary, start, stop):
+    #  The records of a type 2/3 segment covering start to stop, with the
+    #  trailer (INIT, INTLEN, RSIZE, N) rewritten for them
+    init, intlen, rsize, n = np.frombuffer(daf.read_Doubles(summary.end - 3, summary.end),
+                                           dtype=daf.endian + 'f8')
+    rsize, n = int(rsize), int(n)
+    first = min(max(int(math.floor((start - init) / intlen)), 0), n - 1)
+    last = min(max(int(math.floor((stop - init) / intlen)), 0), n - 1)
+    records = np.frombuffer(daf.read_Doubles(summary.begin + first * rsize, summary.begin + (last + 1) * rsize - 1),
+                            dtype=daf.endian + 'f8').astype('<f8')
+    trailer = np.array([init + first * intlen, intlen, rsize, last - first + 1])
+    return(np.concatenate([records, trailer]))
+
+def _select_Segments(filepaths, bodies, start, stop, centers):
+    #  (filepath, summary) of every segment of bodies overlapping start to
+    #  stop, in load order, adding the bodies they're relative to if centers
+    found = list()
+    for filepath in filepaths:
+        found.extend((Path(filepath), segment) for segment in read_SPKSegments(filepath)
+                     if segment.stop_et >= start and segment.start_et <= stop)
+
+    wanted = set(bodies)
+    while centers:
+        added = set(segment.center for _, segment in found if segment.target in wanted) - wanted
+        if len(added) == 0:
+            break
+        wanted |= added
+    return([(filepath, segment) for filepath, segment in found if segment.target in wanted])
+
+def _comment_Records(comment):
+    #  Lines end in NUL and the comments in EOT, 1000 characters to a record
+    if not comment:
+        return([])
+    text = '\0'.join(comment.splitlines()).encode('latin-1', errors='replace') + b'\0\x04'
+    return([text[i:i + _COMMENT_CHARACTERS].ljust(RECORD_BYTES, b'\0')
+            for i in range(0, len(text), _COMMENT_CHARACTERS)])
+
+def write_SPK(filepath, segments, comment='', internal_filename='AutoMeta SPK subset'):
+    """
+    Write the binary SPK at filepath holding segments, a list of (summary,
+    data) with summary an SPKSegment (its begin and end are ignored) and
+    data the segment's doubles, in priority order (lowest first)
+    """
+    comment_records = _comment_Records(comment)
+    n_summary_records = max(1, math.ceil(len(segments) / _SUMMARIES_PER_RECORD))
+    fward = 2 + len(comment_records)
+    bward = fward + 2 * (n_summary_records - 1)
+
+    #  Data follow the summary and name records, back to back
+    address = (fward - 1 + 2 * n_summary_records) * RECORD_DOUBLES + 1
+    summaries = list()
+    for summary, data in segments:
+        summaries.append(summary._replace(begin=address, end=address + len(data) - 1))
+        address += len(data)
+    free = address
+
+    file_record = bytearray(RECORD_BYTES)
+    file_record[0:8] = b'DAF/SPK '
+    file_record[8:16] = struct.pack('<2i', _SPK_ND, _SPK_NI)
+    file_record[16:76] = internal_filename.encode('latin-1')[:60].ljust(60)
+    file_record[76:88] = struct.pack('<3i', fward, bward, free)
+    file_record[88:96] = b'LTL-IEEE'
+    file_record[699:699 + len(_FTP_STRING)] = _FTP_STRING
+
+    #  Written under a name no other thread or process will use, then
+    #  renamed into place
+    tmp_filepath = Path(filepath).with_name('{}.{}.tmp'.format(Path(filepath).name, uuid.uuid4().hex))
+    with open(tmp_filepath, 'wb') as f:
+        f.write(file_record)
+        for record in comment_records:
+            f.write(record)
+
+        for i in range(n_summary_records):
+            chunk = summaries[i * _SUMMARIES_PER_RECORD:(i + 1) * _SUMMARIES_PER_RECORD]
+            recno = fward + 2 * i
+            next_recno = recno + 2 if i < n_summary_records - 1 else 0
+            previous_recno = recno - 2 if i > 0 else 0
+            summary_record = struct.pack('<3d', next_recno, previous_recno, len(chunk))
+            name_record = b''
+            for summary in chunk:
+                summary_record += struct.pack('<2d6i', summary.start_et, summary.stop_et, summary.target,
+                                              summary.center, summary.frame, summary.type, summary.begin,
+                                              summary.end)
+                name_record += summary.name.encode('latin-1')[:_NAME_CHARACTERS].ljust(_NAME_CHARACTERS)
+            f.write(summary_record.ljust(RECORD_BYTES, b'\0'))
+            f.write(name_record.ljust(RECORD_BYTES, b' '))
+
+        for summary, data in segments:
+            f.write(np.ascontiguousarray(data, dtype='<f8').tobytes())
+        #  Pad out the last record
+        f.write(b'\0' * (-f.tell() % RECORD_BYTES))
+    os.replace(tmp_filepath, filepath)
+    return(Path(filepath))
+
+def subset_SPK(filepaths, output_filepath, bodies, start, stop, centers=True):
+    """
+    Write the SPK at output_filepath with only the segments of bodies (NAIF
+    names or IDs) in the SPKs at filepaths (in load order), cut to the ETs
+    start to stop. If centers, the bodies those segments are relative to are
+    kept too, recursively, so every body can still be found relative to the
+    others (e.g. a spacecraft relative to Jupiter, through the Jupiter
+    barycenter). Returns the SPKSegments written.
+    """
+    filepaths = [Path(filepath) for filepath in filepaths]
+    bodies = [as_BodyCode(body) for body in bodies]
+    selected = _select_Segments(filepaths, bodies, start, stop, centers)
+    if len(selected) == 0:
+        raise SPKEvaluationError('No segments for bodies {} between ET {} and {}'.format(bodies, start, stop))
+
+    segments = list()
+    dafs = dict()
+    try:
+        for filepath, summary in selected:
+            if filepath not in dafs:
+                dafs[filepath] = DAFFile(filepath)
+            daf = dafs[filepath]
+            if summary.type in (2, 3):
+                data = _trim_Chebyshev(daf, summary, start, stop)
+            else:
+                #  Copied, so the file can be closed
+                data = np.frombuffer(daf.read_Doubles(summary.begin, summary.end), dtype=daf.endian + 'f8').astype('<f8')
+            summary = summary._replace(start_et=max(summary.start_et, start), stop_et=min(summary.stop_et, stop))
+            segments.append((summary, data))
+
+        comment = ['Subset written by AutoMeta (spk_subset.py), with the segments of',
+                   '    NAIF IDs {}'.format(', '.join(str(body) for body in sorted(set(s.target for s, _ in segments)))),
+                   'between ET {!r} and {!r} (TDB seconds past J2000), from:'.format(float(start), float(stop))]
+        comment += ['    ' + filepath.name for filepath in dict.fromkeys(filepath for filepath, _ in selected)]
+        write_SPK(output_filepath, segments, comment='\n'.join(comment))
+    finally:
+        for daf in dafs.values():
+            daf.close()
+    return(read_SPKSegments(output_filepath))
+
+def subset_Metakernel(metakernel, output_dir, bodies, start, stop, centers=True, copy_kernels=True):
+    """
+    A self-contained kernel bundle in output_dir for a job needing bodies
+    between the ETs start and stop: the SPKs the metakernel loads, cut down
+    with subset_SPK into one file, the other kernels it loads (copied in,
+    if copy_kernels), and a metakernel loading them. Returns the new
+    metakernel's path; to move the bundle, only its PATH_VALUES need
+    changing.
+    """
+    metakernel = Path(metakernel)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    kernels = read_Metakernel(metakernel)
+    spks = [kernel for kernel in kernels if kernel.suffix.lower() == '.bsp']
+    others = [kernel for kernel in kernels if kernel.suffix.lower() != '.bsp']
+
+    spk_filepath = output_dir / (metakernel.stem + '_subset.bsp')
+    subset_SPK(spks, spk_filepath, bodies, start, stop, centers=centers)
+
+    #  Kernels that aren't copied are found through a path symbol for their
+    #  directory, as SPICE won't read a KERNELS_TO_LOAD string over 80
+    #  characters
+    path_symbols = {output_dir.resolve(): 'BUNDLE'}
+    kernels_to_load = list()
+    for kernel in others:
+        if copy_kernels:
+            shutil.copy2(kernel, output_dir / kernel.name)
+            kernels_to_load.append('$BUNDLE/' + kernel.name)
+        else:
+            symbol = path_symbols.setdefault(kernel.resolve().parent, 'KERNELS{}'.format(len(path_symbols)))
+            kernels_to_load.append('$' + symbol + '/' + kernel.name)
+    kernels_to_load.append('$BUNDLE/' + spk_filepath.name)
+
+    mk_filepath = output_dir / (metakernel.stem + '_subset.txt')
+    lines = ["# A kernel bundle subset from '" + metakernel.name + "' by AutoMeta, for NAIF IDs",
+             "#   " + ', '.join(str(body) for body in bodies) + " between ET " + repr(float(start))
+             + " and " + repr(float(stop)) + ".",
+             "\\begindata",
+             "    PATH_VALUES = ("]
+    lines += ["        '" + str(directory) + "'" for directory in path_symbols]
+    lines += ["        )",
+              "    PATH_SYMBOLS = ("]
+    lines += ["        '" + symbol + "'" for symbol in path_symbols.values()]
+    lines += ["        )",
+              "    KERNELS_TO_LOAD = ("]
+    lines += ["\t'" + kernel + "'" for kernel in kernels_to_load]
+    lines += ["        )",
+              "\\begintext"]
+    with open(mk_filepath, mode='w') as f:
+        for line in lines:
+            f.write('%s\n' % line)
+    return(mk_filepath)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Wed Oct 21 10:26:43 2026
+
+@author: mrutala
+
+Structured events from syncs and metakernel builds, for feeding into a
+metrics stack or finding where a slow sync spends its time. Each event is
+a dict with its 'event' type, a Unix 'time' and the 'thread' it came from,
+plus these fields:
+    phase_start  phase, and the phase's own fields (e.g. spacecraft)
+    phase_end    ... and seconds, error (None, or the exception's repr)
+                 and anything the phase added (e.g. files, fetched, skipped)
+    listing      url, cached (True if from a ListingCache), entries,
+                 seconds, bytes (None unless fetched over the network)
+    file         url, filepath, outcome ('fetched', 'skipped' or 'failed'),
+                 reason (for fetched: 'download', 'resume' or 'local'; for
+                 skipped: 'listing', 'store', 'not_modified' or 'local'; for
+                 failed: the exception's repr), bytes, seconds, latency
+                 (until the response headers arrived), throughput (bytes
+                 per second) and attempts
+    retry        url, attempt, error and delay (seconds before the next try)
+The phases are 'make_metakernel' and 'make_metakernels' around everything,
+'make_directories', 'sync' (with kind 'generic' or 'spacecraft') and
+'write_metakernel'.
+
+A sink is any callable taking an event. Sinks are added for the whole
+process with add_EventSink() (or for a block, with event_Sinks()), and are
+called from whichever thread emitted the event, so must be thread-safe.
+EventLog collects events in memory and sums them up; JSONLinesSink writes
+them to a file, one per line. Setting the AUTOMETA_EVENTS environment
+variable to a file path adds a JSONLinesSink writing there. With no sinks,
+emitting an event costs next to nothing.
+'''
+
+import json
+import os
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+
+EVENTS_ENVIRONMENT_VARIABLE = 'AUTOMETA_EVENTS'
+
+_sinks = list()
+_sinks_lock = threading.Lock()
+_environment_checked = False
+
+def _check_Environment():
+    #  Add the AUTOMETA_EVENTS sink, the first time any event is emitted
+    global _environment_checked
+    with _sinks_lock:
+        if _environment_checked:
+            return
+        _environment_checked = True
+        filepath = os.environ.get(EVENTS_ENVIRONMENT_VARIABLE, '').strip()
+        if filepath != '':
+            _sinks.append(JSONLinesSink(filepath))
+
+def add_EventSink(sink):
+    """
+    Send every event, from now on, to sink (a callable taking an event);
+    returns sink
+    """
+    with _sinks_lock:
+        _sinks.append(sink)
+    return(sink)
+
+def remove_EventSink(sink):
+    """
+    Stop sending events to sink
+    """
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+@contextmanager
+def event_Sinks(*sinks):
+    """
+    Send events to sinks for the duration of a with block
+    """
+    for sink in sinks:
+        add_EventSink(sink)
+    try:
+        yield(sinks)
+    finally:
+        for sink in sinks:
+            remove_EventSink(sink)
+
+def has_EventSinks():
+    """
+    True if anything is listening, so callers can skip measuring otherwise
+    """
+    if not _environment_checked:
+        _check_Environment()
+    return(len(_sinks) > 0)
+
+def emit_Event(event, **fields):
+    """
+    Send the event (its type) with fields to every sink. A sink raising an
+    exception gets a warning, but doesn't interrupt the sync.
+    """
+    if not has_EventSinks():
+        return
+    record = {'event': event, 'time': time.time(), 'thread': threading.current_thread().name}
+    record.update(fields)
+    with _sinks_lock:
+        sinks = list(_sinks)
+    for sink in sinks:
+        try:
+            sink(record)
+        except Exception as error:
+            warnings.warn('Event sink {!r} failed: {!r}'.format(sink, error))
+
+@contextmanager
+def span_Phase(phase, **fields):
+    """
+    Emit phase_start and phase_end events around a with block. Yields a dict
+    of fields, which the block can add to for the phase_end event.
+    """
+    fields = dict(fields)
+    emit_Event('phase_start', phase=phase, **fields)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield(fields)
+    except BaseException as exception:
+        error = repr(exception)
+        raise
+    finally:
+        fields.update(seconds=time.perf_counter() - start, error=error)
+        emit_Event('phase_end', phase=phase, **fields)
+
+class EventLog:
+    """
+    A sink keeping every event in .events, in the order they arrived
+    """
+    def __init__(self):
+        self.events = list()
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def summarize(self):
+        """
+        Totals over the events so far: seconds per phase, files fetched,
+        skipped (by reason) and failed, bytes fetched, listings fetched and
+        cached, retries, and the slowest files and listings
+        """
+        with self._lock:
+            events = list(self.events)
+        summary = {'phases': dict(), 'fetched': 0, 'skipped': dict(), 'failed': 0, 'bytes': 0,
+                   'listings_fetched': 0, 'listings_cached': 0, 'retries': 0}
+        files, listings = list(), list()
+        for event in events:
+            if event['event'] == 'phase_end':
+                summary['phases'][event['phase']] = summary['phases'].get(event['phase'], 0.) + event['seconds']
+            elif event['event'] == 'file':
+                files.append(event)
+                if event['outcome'] == 'fetched':
+                    summary['fetched'] += 1
+                    summary['bytes'] += event['bytes'] or 0
+                elif event['outcome'] == 'skipped':
+                    summary['skipped'][event['reason']] = summary['skipped'].get(event['reason'], 0) + 1
+                else:
+                    summary['failed'] += 1
+            elif event['event'] == 'listing':
+                listings.append(event)
+                summary['listings_cached' if event['cached'] else 'listings_fetched'] += 1
+            elif event['event'] == 'retry':
+                summary['retries'] += 1
+        summary['slowest_files'] = [(event['url'], event['seconds'])
+                                    for event in sorted(files, key=lambda event: -event['seconds'])[:5]]
+        summary['slowest_listings'] = [(event['url'], event['seconds'])
+                                       for event in sorted(listings, key=lambda event: -event['seconds'])[:5]]
+        return(summary)
+
+class JSONLinesSink:
+    """
+    A sink appending each event to the file at filepath as a line of JSON
+    """
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._file = open(filepath, 'a')
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
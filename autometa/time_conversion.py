@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Sun Oct 18 16:31:48 2026
+
+@author: mrutala
+
+Converting whole arrays of UTC times to ephemeris times (ET, i.e. TDB
+seconds past J2000) and back with NumPy, using the constants and leap
+second table of a leapseconds kernel (LSK), rather than calling str2et or
+datetime2et once per epoch.
+
+As in SPICE (see the Time Required Reading,
+https://naif.jpl.nasa.gov/pub/naif/toolkit_docs/C/req/time.html):
+    TAI = UTC + DELTA_AT            (from the LSK's leap second table)
+    TDT = TAI + DELTA_T_A           (32.184 s)
+    TDB = TDT + K sin(E),  E = M + EB sin(M),  M = M0 + M1 TDT
+where UTC is counted in "formal" seconds past 2000-01-01T12:00:00, i.e.
+86400 per day. The inverse of the last step is solved by iteration, as in
+SPICE. Results agree with str2et/et2utc to well under a microsecond; ETs
+are float64, so the precision is that of a double near 1e9 s (~0.1 us).
+
+NumPy's datetime64 has no 23:59:60, so times within a leap second are
+returned as a repeat of 23:59:59 by LeapSecondsKernel.et_to_UTC, which can
+also return a mask of which times those are.
+
+Before the first entry in the leap second table (1972-01-01), SPICE takes
+DELTA_AT to be one second less than that entry's (i.e. 9 s), as though a
+leap second ended 1971; so does LeapSecondsKernel, so that earlier epochs
+still agree with str2et/et2utc.
+'''
+
+import datetime as dt
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from .metakernel_reader import parse_TextKernelData
+except ImportError:
+    from metakernel_reader import parse_TextKernelData
+
+#  The origin of UTC formal seconds, and of ET
+J2000_UTC = np.datetime64('2000-01-01T12:00:00', 'ns')
+
+def _parse_LSKDate(date):
+    #  e.g. '1972-JAN-1'
+    return(dt.datetime.strptime(date.strip().title(), '%Y-%b-%d'))
+
+class LeapSecondsKernel:
+    """
+    The time constants and leap seconds in the LSK at filepath (e.g. the
+    latest_leapseconds.tls fetched by get_GenericKernels)
+    """
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        with open(self.filepath) as f:
+            variables = parse_TextKernelData(f.read())
+        try:
+            self.delta_t_a = variables['DELTET/DELTA_T_A'][0]
+            self.k = variables['DELTET/K'][0]
+            self.eb = variables['DELTET/EB'][0]
+            self.m0, self.m1 = variables['DELTET/M'][:2]
+            delta_at = variables['DELTET/DELTA_AT']
+        except (KeyError, ValueError, IndexError):
+            raise ValueError('{} is not a leapseconds kernel'.format(self.filepath))
+
+        #  Each leap second table entry is (TAI-UTC, the UTC date it starts),
+        #  after SPICE's entry for everything before the table (see the 
+        #  module notes)
+        delta_ats = np.array(delta_at[0::2], dtype=np.float64)
+        self.delta_ats = np.concatenate([[delta_ats[0] - 1], delta_ats])
+        leap_dates = np.array([np.datetime64(_parse_LSKDate(date), 'ns') for date in delta_at[1::2]])
+        self.leap_utcs = np.concatenate([[-np.inf], (leap_dates - J2000_UTC) / np.timedelta64(1, 's')])
+
+        #  ...and the TAI at which each starts, with the size of its jump
+        self.leap_tais = self.leap_utcs + self.delta_ats
+        self.leap_sizes = np.diff(self.delta_ats, prepend=self.delta_ats[0])
+
+    def _tdt_to_TDB(self, tdt):
+        m = self.m0 + self.m1 * tdt
+        return(tdt + self.k * np.sin(m + self.eb * np.sin(m)))
+
+    def _tdb_to_TDT(self, tdb):
+        tdt = tdb.copy()
+        for iteration in range(3):
+            m = self.m0 + self.m1 * tdt
+            tdt = tdb - self.k * np.sin(m + self.eb * np.sin(m))
+        return(tdt)
+
+    def utc_to_ET(self, times):
+        """
+        The ETs of times, which may be datetime64s, datetimes or ISO 8601
+        strings (or arrays of them), all taken as UTC. Times before 1972
+        take DELTA_AT as 9 s, as SPICE does.
+        """
+        times = np.asarray(times, dtype='datetime64[ns]')
+        #  Whole and fractional seconds are separated before converting to
+        #  float, to keep the nanoseconds
+        ns = (times - J2000_UTC).astype(np.int64)
+        seconds, fraction = np.divmod(ns, 1000000000)
+        utc = seconds.astype(np.float64)
+
+        index = np.searchsorted(self.leap_utcs, utc, side='right') - 1
+        tdt = utc + (self.delta_ats[index] + self.delta_t_a)
+        tdb = self._tdt_to_TDB(tdt + fraction * 1e-9)
+        return(tdb)
+
+    def et_to_UTC(self, ets, return_leap_seconds=False):
+        """
+        The UTC times, as datetime64[ns], of ets. Times within a leap second
+        come out as a repeat of the preceding second (see the module notes);
+        if return_leap_seconds, a boolean mask of them is returned too. As in
+        SPICE, ETs before 1972 take DELTA_AT as 9 s, with a leap second at
+        the end of 1971.
+        """
+        ets = np.asarray(ets, dtype=np.float64)
+        tai = self._tdb_to_TDT(ets) - self.delta_t_a
+
+        index = np.searchsorted(self.leap_tais, tai, side='right') - 1
+        utc = tai - self.delta_ats[index]
+
+        #  The second before each (positive) leap second starts is counted
+        #  twice; TAI during it falls in the last second before leap_tais
+        following = np.clip(index + 1, 0, len(self.leap_tais) - 1)
+        leap = ((index + 1 < len(self.leap_tais)) & (self.leap_sizes[following] > 0)
+                & (tai >= self.leap_tais[following] - self.leap_sizes[following]))
+        utc = np.where(leap, tai - self.delta_ats[following], utc)
+
+        seconds = np.floor(utc)
+        ns = seconds.astype(np.int64) * 1000000000 + np.round((utc - seconds) * 1e9).astype(np.int64)
+        times = J2000_UTC + ns.astype('timedelta64[ns]')
+        if return_leap_seconds:
+            return(times, leap)
+        return(times)
+
+def find_LSK(basedir=''):
+    """
+    The latest_leapseconds.tls in the SPICE directory under basedir, as
+    laid out by make_SPICEDirectories
+    """
+    return(Path(basedir) / 'SPICE' / 'generic' / 'kernels' / 'lsk' / 'latest_leapseconds.tls')
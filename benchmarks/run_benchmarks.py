@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Tue Oct 20 13:52:06 2026
+
+@author: mrutala
+
+Benchmarks for syncing kernels and building metakernels, run against a
+local stand-in for NAIF (tests/fake_NAIF.FakeNAIFServer) rather than the live
+site, so results are repeatable and can be tracked between changes.
+
+The fake tree holds the generic kernels get_GenericKernels fetches, a
+Juno-like kernels/spk/ directory of --spk-files reconstructions, and one
+--large-size file (sparse, so multi-GB sizes cost nothing to make). Each
+benchmark is run --repeat times; the results, with the configuration and
+the machine and commit they came from, are written as JSON:
+    $ python benchmarks/run_benchmarks.py --spk-files 2000 --latency 0.05 --output results.json
+and a previous run can be compared against:
+    $ python benchmarks/run_benchmarks.py --compare results.json
+
+Benchmarks:
+    parse_listing         parsing the Juno SPK listing page (no network)
+    fetch_listing         fetching and parsing it (cold listing cache)
+    generic_sync_cold     get_GenericKernels into an empty directory
+    generic_sync_warm     ... and again, with everything up to date
+    spacecraft_sync_cold  get_SpacecraftKernels('juno') into an empty directory
+    spacecraft_sync_warm  ... and again, with everything up to date
+    metakernel_cold       make_Metakernel('juno') from scratch
+    metakernel_warm       ... and again, rewriting only the metakernel
+    large_download        downloading the single large file
+'''
+
+import argparse
+import contextlib
+import datetime as dt
+import fnmatch
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPOSITORY_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPOSITORY_DIR / 'autometa'))
+sys.path.insert(0, str(REPOSITORY_DIR / 'tests'))
+
+from fake_NAIF import FakeNAIFServer, make_FakeNAIFTree
+from kernel_download import KernelDownloader
+from make_Metakernel import get_GenericKernels, get_SpacecraftKernels, make_Metakernel
+from naif_listing import DEFAULT_LISTING_CACHE, ListingCache, get_DirectoryListing, iter_DirectoryListing
+
+MiB = 1024**2
+
+def make_BenchmarkTree(root, spk_files, spk_size, generic_size, large_size):
+    """
+    The fake NAIF tree the benchmarks run against; returns the total bytes
+    of each part
+    """
+    generic = {'generic_kernels/lsk/naif0012.tls': 5257,
+               'generic_kernels/lsk/latest_leapseconds.tls': 5257,
+               'generic_kernels/pck/pck00011.tpc': 130000,
+               'generic_kernels/spk/planets/de440s.bsp': generic_size,
+               'generic_kernels/spk/satellites/jup365.bsp': generic_size,
+               'generic_kernels/spk/satellites/sat441.bsp': generic_size}
+
+    #  Three-day reconstructions, one a day, as in JUNO/kernels/spk/
+    spacecraft = {'JUNO/kernels/fk/juno_v12.tf': 80000}
+    first = dt.date(2011, 8, 5)
+    for i in range(spk_files):
+        start = first + dt.timedelta(days=i)
+        name = 'spk_rec_{:%y%m%d}_{:%y%m%d}_{:%y%m%d}.bsp'.format(start, start + dt.timedelta(days=3),
+                                                                  start + dt.timedelta(days=30))
+        spacecraft['JUNO/kernels/spk/' + name] = spk_size
+
+    make_FakeNAIFTree(root, generic)
+    make_FakeNAIFTree(root, spacecraft)
+    make_FakeNAIFTree(root, {'LARGE/kernels/spk/large.bsp': large_size}, sparse=True)
+    return({'generic': sum(generic.values()), 'spacecraft': sum(spacecraft.values()), 'large': large_size})
+
+def _fresh_Directory(path):
+    path = Path(path)
+    if path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True)
+    return(path)
+
+def _run(name, function, repeat, server, setup=None, **extra):
+    #  Time function() repeat times (calling setup() before each, untimed)
+    #  and count the requests the server saw during the last run
+    seconds = list()
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        server.reset_stats()
+        with contextlib.redirect_stderr(io.StringIO()):
+            start = time.perf_counter()
+            function()
+            seconds.append(time.perf_counter() - start)
+    result = {'seconds': seconds, 'min': min(seconds), 'median': statistics.median(seconds),
+              'requests': len(server.requests)}
+    result.update(extra)
+    if result.get('bytes'):
+        result['mib_per_s'] = result['bytes'] / MiB / result['median']
+    if result.get('entries'):
+        result['entries_per_s'] = result['entries'] / result['median']
+    print('{:22s} median {:9.4f} s  min {:9.4f} s  {:5d} requests'.format(name, result['median'], result['min'],
+                                                                        result['requests']), file=sys.stderr)
+    return(result)
+
+def run_Benchmarks(args, workdir):
+    """
+    Run every benchmark selected by args.only, returning {name: result}
+    """
+    workdir = Path(workdir)
+    sizes = make_BenchmarkTree(workdir / 'naif', args.spk_files, args.spk_size, args.generic_size, args.large_size)
+    selected = lambda name: any(fnmatch.fnmatch(name, pattern) for pattern in args.only)
+    results = dict()
+
+    with FakeNAIFServer(workdir / 'naif', latency=args.latency) as server:
+        baseurl = server.baseurl
+        spk_url = baseurl + 'JUNO/kernels/spk/'
+
+        if selected('parse_listing'):
+            import urllib.request
+            page = urllib.request.urlopen(spk_url).read()
+            results['parse_listing'] = _run('parse_listing', lambda: list(iter_DirectoryListing([page])),
+                                            args.repeat, server, entries=args.spk_files, page_bytes=len(page))
+
+        if selected('fetch_listing'):
+            def fetch_Listing():
+                with KernelDownloader(show_progress=False) as downloader:
+                    get_DirectoryListing(spk_url, downloader, cache=ListingCache())
+            results['fetch_listing'] = _run('fetch_listing', fetch_Listing, args.repeat, server,
+                                            entries=args.spk_files)
+
+        for kind, sync in [('generic', lambda directory, downloader: get_GenericKernels(
+                                directory, baseurl=baseurl, downloader=downloader, listing_cache=ListingCache())),
+                           ('spacecraft', lambda directory, downloader: get_SpacecraftKernels(
+                                'juno', directory, baseurl=baseurl, downloader=downloader,
+                                listing_cache=ListingCache()))]:
+            directory = workdir / 'sync' / kind
+            def run_Sync():
+                with KernelDownloader(show_progress=False) as downloader:
+                    sync(directory, downloader)
+            name = kind + '_sync_cold'
+            if selected(name):
+                results[name] = _run(name, run_Sync, args.repeat, server, setup=lambda: _fresh_Directory(directory),
+                                     bytes=sizes[kind])
+            name = kind + '_sync_warm'
+            if selected(name):
+                if not directory.exists():
+                    _fresh_Directory(directory)
+                    run_Sync()
+                results[name] = _run(name, run_Sync, args.repeat, server)
+
+        #  make_Metakernel uses the process's listing cache, so that's
+        #  emptied before each run too
+        basedir = workdir / 'metakernel'
+        build = lambda: make_Metakernel('juno', basedir=basedir, baseurl=baseurl, overwrite=True)
+        def fresh_Metakernel():
+            _fresh_Directory(basedir)
+            DEFAULT_LISTING_CACHE.clear()
+        if selected('metakernel_cold'):
+            results['metakernel_cold'] = _run('metakernel_cold', build, args.repeat, server,
+                                              setup=fresh_Metakernel,
+                                              bytes=sizes['generic'] + sizes['spacecraft'])
+        if selected('metakernel_warm'):
+            if not (basedir / 'SPICE').exists():
+                fresh_Metakernel()
+                with contextlib.redirect_stderr(io.StringIO()):
+                    build()
+            results['metakernel_warm'] = _run('metakernel_warm', build, args.repeat, server,
+                                              setup=DEFAULT_LISTING_CACHE.clear)
+
+        if selected('large_download'):
+            filepath = workdir / 'large' / 'large.bsp'
+            def download_Large():
+                with KernelDownloader(show_progress=False) as downloader:
+                    downloader.wait([downloader.download(baseurl + 'LARGE/kernels/spk/large.bsp', filepath)])
+            results['large_download'] = _run('large_download', download_Large, args.repeat, server,
+                                             setup=lambda: _fresh_Directory(filepath.parent), bytes=sizes['large'])
+    return(results)
+
+def get_Commit():
+    """
+    The git commit being benchmarked, if this is a git checkout
+    """
+    try:
+        return(subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPOSITORY_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return(None)
+
+def compare_Results(results, previous):
+    """
+    Print each benchmark's median relative to a previous results file's
+    """
+    print('{:22s} {:>10s} {:>10s} {:>7s}'.format('benchmark', 'before', 'after', 'ratio'), file=sys.stderr)
+    for name, result in results.items():
+        before = previous['results'].get(name)
+        if before is None:
+            continue
+        print('{:22s} {:10.4f} {:10.4f} {:7.2f}'.format(name, before['median'], result['median'],
+                                                        result['median'] / before['median']), file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark AutoMeta syncs against a local fake NAIF server')
+    parser.add_argument('--spk-files', type=int, default=1000, help='files in the Juno-like SPK directory')
+    parser.add_argument('--spk-size', type=int, default=64*1024, help='bytes per Juno-like SPK')
+    parser.add_argument('--generic-size', type=int, default=4*MiB, help='bytes per generic SPK')
+    parser.add_argument('--large-size', type=int, default=512*MiB, help='bytes in the large file')
+    parser.add_argument('--latency', type=float, default=0., help='seconds added to every response')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each benchmark')
+    parser.add_argument('--only', nargs='+', default=['*'], help='benchmarks to run (glob patterns)')
+    parser.add_argument('--workdir', default=None, help='directory to work in (default: a temporary one)')
+    parser.add_argument('--output', default=None, help='JSON file to write (default: standard output)')
+    parser.add_argument('--compare', default=None, help='previous JSON results to compare against')
+    args = parser.parse_args()
+
+    if args.workdir is None:
+        with tempfile.TemporaryDirectory(prefix='autometa-benchmarks-') as workdir:
+            results = run_Benchmarks(args, workdir)
+    else:
+        results = run_Benchmarks(args, args.workdir)
+
+    report = {'created': dt.datetime.now(dt.timezone.utc).isoformat(),
+              'commit': get_Commit(),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'cpu_count': os.cpu_count(),
+              'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+              'results': results}
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare_Results(results, json.load(f))
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
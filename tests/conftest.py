@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+#  The modules import each other as top-level modules when not installed
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'autometa'))
+
+DAY = 86400.
+
+@pytest.fixture
+def spk(tmp_path):
+    """
+    A synthetic SPK: body 1000 moving along x relative to the SSB, as one
+    linear type 2 record spanning +/- 10 days around J2000
+    """
+    from daf_reader import SPKSegment
+    from spk_subset import write_SPK
+
+    record = [0., 10*DAY, 1000., 500., 0., 0., 0., 0.]
+    data = np.array(record + [-10*DAY, 20*DAY, len(record), 1])
+    filepath = tmp_path / 'test.bsp'
+    write_SPK(filepath, [(SPKSegment(1000, 0, 1, 2, -10*DAY, 10*DAY, 0, 0, 'TEST'), data)])
+    return(filepath)
+
+@pytest.fixture
+def metakernel(spk, tmp_path):
+    """
+    A metakernel loading the synthetic spk
+    """
+    filepath = tmp_path / 'test.tm'
+    filepath.write_text("\\begindata\nKERNELS_TO_LOAD = ( '{}' )\n\\begintext\n".format(spk))
+    return(filepath)
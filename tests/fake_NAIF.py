@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+'''
+Created on Mon Oct 12 14:03:17 2026
+
+@author: mrutala
+
+A local stand-in for https://naif.jpl.nasa.gov/pub/naif/, for exercising the
+download code without touching the real server. It serves a directory tree
+over HTTP/1.1 (with keep-alive) and renders directories as Apache-style
+listings, like NAIF's. It is used by the tests and by
+benchmarks/run_benchmarks.py, and isn't part of the autometa package.
+
+Usage:
+    >>> make_FakeNAIFTree('fake_naif', {'generic_kernels/lsk/naif0012.tls': 5257})
+    >>> with FakeNAIFServer('fake_naif') as server:
+    ...     get_GenericKernels('SPICE/generic/kernels', baseurl=server.baseurl)
+'''
+
+import datetime as dt
+import html
+import io
+import os
+import threading
+import time
+import urllib.parse
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+def _format_ApacheSize(size):
+    #  Apache's human-readable sizes, e.g. '5.1K', ' 31M'
+    for unit in ['', 'K', 'M', 'G']:
+        if size < 1024 or unit == 'G':
+            break
+        size /= 1024.
+    if unit == '':
+        return('{:d}'.format(int(size)))
+    if size < 9.95:
+        return('{:.1f}{}'.format(size, unit))
+    return('{:.0f}{}'.format(size, unit))
+
+def make_FakeNAIFTree(root, files, sparse=False):
+    """
+    Write a fake NAIF tree under root. files maps paths relative to root
+    (e.g. 'JUNO/kernels/spk/spk_rec_110805_111026_120302.bsp') to either
+    the file contents (bytes) or a size in bytes, in which case the file is
+    filled with a repeating, name-dependent pattern; or, if sparse, left as
+    a sparse file of zeros, so multi-GB files take no time or disk to make
+    """
+    root = Path(root)
+    for relpath, content in files.items():
+        filepath = root / relpath
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, int) and sparse:
+            with open(filepath, 'wb') as f:
+                f.truncate(content)
+        elif isinstance(content, int):
+            block = (filepath.name.encode() + b'\n') * 64
+            with open(filepath, 'wb') as f:
+                remaining = content
+                while remaining > 0:
+                    f.write(block[:remaining])
+                    remaining -= len(block)
+        else:
+            filepath.write_bytes(content)
+    return(root)
+
+class _FakeNAIFHandler(SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    #  Headers and body go out in separate writes; on a keep-alive
+    #  connection, Nagle's algorithm would hold the body back until the
+    #  client's delayed ACK (~40 ms a response)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        #  Stay quiet; requests are recorded on the server instead
+        return
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connection_count += 1
+
+    def _record(self):
+        with self.server.stats_lock:
+            self.server.requests.append((self.command, self.path))
+            self.server.request_headers.append(dict(self.headers))
+
+    def send_head(self):
+        #  Apache-like ETags, honouring If-None-Match, and single byte ranges
+        #  (with If-Range); If-Modified-Since is already handled by 
+        #  SimpleHTTPRequestHandler
+        self._etag = None
+        self._remaining = None
+        self._is_file = False
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return(super().send_head())
+
+        self._is_file = True
+        stat = os.stat(path)
+        self._etag = '"{:x}-{:x}"'.format(stat.st_size, stat.st_mtime_ns)
+        last_modified = self.date_time_string(stat.st_mtime)
+
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            if self._etag in [tag.strip() for tag in if_none_match.split(',')]:
+                self.send_response(304)
+                self.end_headers()
+                return(None)
+
+        byte_range = self.headers.get('Range', '')
+        if_range = self.headers.get('If-Range')
+        if byte_range.startswith('bytes=') and if_range in (None, self._etag, last_modified):
+            first, _, last = byte_range[len('bytes='):].partition('-')
+            if first.isdigit():
+                first = int(first)
+                last = int(last) if last.isdigit() else stat.st_size - 1
+                last = min(last, stat.st_size - 1)
+                if first >= stat.st_size:
+                    self.send_response(416)
+                    self.send_header('Content-Range', 'bytes */{}'.format(stat.st_size))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return(None)
+                f = open(path, 'rb')
+                f.seek(first)
+                self._remaining = last - first + 1
+                self.send_response(206)
+                self.send_header('Content-type', self.guess_type(path))
+                self.send_header('Content-Range', 'bytes {}-{}/{}'.format(first, last, stat.st_size))
+                self.send_header('Content-Length', str(self._remaining))
+                self.send_header('Last-Modified', last_modified)
+                self.end_headers()
+                return(f)
+
+        return(super().send_head())
+
+    def copyfile(self, source, outputfile):
+        #  Send only the requested range and, to mimic a flaky link, drop
+        #  the connection part way through files if asked to
+        limit = self._remaining
+        interrupt_after = self.server.interrupt_after
+        if self._is_file and interrupt_after is not None:
+            if limit is None or interrupt_after < limit:
+                limit = interrupt_after
+                self.close_connection = True
+        if limit is None:
+            return(super().copyfile(source, outputfile))
+        while limit > 0:
+            buffer = source.read(min(limit, 64*1024))
+            if not buffer:
+                break
+            outputfile.write(buffer)
+            limit -= len(buffer)
+
+    def end_headers(self):
+        if getattr(self, '_etag', None) is not None:
+            self.send_header('ETag', self._etag)
+        super().end_headers()
+
+    def _delay(self):
+        #  Mimic the round trip to a distant server
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_GET(self):
+        self._record()
+        self._delay()
+        super().do_GET()
+
+    def do_HEAD(self):
+        self._record()
+        self._delay()
+        super().do_HEAD()
+
+    def list_directory(self, path):
+        try:
+            names = sorted(os.listdir(path))
+        except OSError:
+            self.send_error(404, 'No permission to list directory')
+            return(None)
+
+        urlpath = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        title = 'Index of ' + html.escape(urlpath)
+        lines = ['<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 3.2 Final//EN">',
+                 '<html>',
+                 ' <head>',
+                 '  <title>' + title + '</title>',
+                 ' </head>',
+                 ' <body>',
+                 '<h1>' + title + '</h1>',
+                 '<pre><img src="/icons/blank.gif" alt="Icon "> <a href="?C=N;O=D">Name</a>'
+                 '                    <a href="?C=M;O=A">Last modified</a>      '
+                 '<a href="?C=S;O=A">Size</a>  <a href="?C=D;O=A">Description</a><hr>'
+                 '<img src="/icons/back.gif" alt="[PARENTDIR]"> <a href="'
+                 + html.escape(str(Path(urlpath).parent).rstrip('/') + '/') + '">Parent Directory</a>'
+                 '                             -   ']
+        for name in names:
+            fullpath = os.path.join(path, name)
+            stat = os.stat(fullpath)
+            mtime = dt.datetime.fromtimestamp(stat.st_mtime, self.server.listing_timezone).strftime('%Y-%m-%d %H:%M')
+            if os.path.isdir(fullpath):
+                name += '/'
+                icon, alt, size = 'folder.gif', '[DIR]', '-'
+            else:
+                icon, alt, size = 'unknown.gif', '[   ]', _format_ApacheSize(stat.st_size)
+            link = '<a href="' + urllib.parse.quote(name) + '">' + html.escape(name) + '</a>'
+            padding = ' ' * max(1, 24 - len(name))
+            lines.append('<img src="/icons/' + icon + '" alt="' + alt + '"> ' + link
+                         + padding + mtime + '  ' + size.rjust(4) + '  ')
+        lines.extend(['<hr></pre>', '</body></html>'])
+
+        encoded = '\n'.join(lines).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html;charset=UTF-8')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        return(io.BytesIO(encoded))
+
+class FakeNAIFServer:
+    """
+    Serve root on 127.0.0.1 from a background thread. The URL to use in
+    place of NAIF's is available as .baseurl; every request made is
+    recorded in .requests (and its headers in .request_headers), and every
+    TCP connection opened is counted in .connection_count. If interrupt_after is set, the connection is dropped
+    after sending that many bytes of any file. If latency is set, every
+    response is delayed by that many seconds. Listings show times in
+    listing_timezone (a tzinfo), as NAIF's show US/Pacific times.
+    """
+    def __init__(self, root, host='127.0.0.1', port=0, interrupt_after=None, latency=None,
+                 listing_timezone=dt.timezone.utc):
+        handler = partial(_FakeNAIFHandler, directory=str(root))
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stats_lock = threading.Lock()
+        self.httpd.requests = list()
+        self.httpd.request_headers = list()
+        self.httpd.connection_count = 0
+        self.httpd.interrupt_after = interrupt_after
+        self.httpd.latency = latency
+        self.httpd.listing_timezone = listing_timezone
+        self._thread = None
+
+    @property
+    def baseurl(self):
+        host, port = self.httpd.server_address[:2]
+        return('http://{}:{}/'.format(host, port))
+
+    @property
+    def requests(self):
+        with self.httpd.stats_lock:
+            return(list(self.httpd.requests))
+
+    @property
+    def request_headers(self):
+        with self.httpd.stats_lock:
+            return(list(self.httpd.request_headers))
+
+    @property
+    def interrupt_after(self):
+        return(self.httpd.interrupt_after)
+
+    @interrupt_after.setter
+    def interrupt_after(self, interrupt_after):
+        self.httpd.interrupt_after = interrupt_after
+
+    @property
+    def latency(self):
+        return(self.httpd.latency)
+
+    @latency.setter
+    def latency(self, latency):
+        self.httpd.latency = latency
+
+    @property
+    def connection_count(self):
+        with self.httpd.stats_lock:
+            return(self.httpd.connection_count)
+
+    def reset_stats(self):
+        with self.httpd.stats_lock:
+            self.httpd.requests = list()
+            self.httpd.request_headers = list()
+            self.httpd.connection_count = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return(self)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return(self.start())
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,62 @@
+'''
+Synthetic SPKs for the tests: type 2 and 3 segments of random (but smooth)
+Chebyshev records, and type 13 segments of Hermite-interpolated states,
+written with spk_subset.write_SPK, so results can be compared with CSPICE
+without any real kernels.
+'''
+
+import numpy as np
+
+from daf_reader import SPKSegment
+from spk_subset import write_SPK
+
+DAY = 86400.
+
+def make_ChebyshevSegment(target, center, start, stop, n_records, type=2, frame=1, ncoef=8, scale=1e5,
+                          seed=0):
+    """
+    A (summary, data) type 2 or 3 segment of body target relative to center
+    from ET start to stop, split into n_records records of ncoef
+    coefficients per component, with positions of order scale km
+    """
+    rng = np.random.default_rng(seed)
+    ncomp = 3 if type == 2 else 6
+    intlen = (stop - start) / n_records
+    decay = 1. / np.arange(1, ncoef + 1)**3
+    records = list()
+    for i in range(n_records):
+        coefs = rng.normal(size=(ncomp, ncoef)) * decay
+        coefs[:3] *= scale
+        #  Velocities (for type 3) in km/s, roughly consistent with positions
+        coefs[3:] *= scale / intlen
+        records.append(np.concatenate([[start + (i + 0.5) * intlen, intlen / 2], coefs.ravel()]))
+    rsize = 2 + ncomp * ncoef
+    data = np.concatenate(records + [[start, intlen, rsize, n_records]])
+    return(SPKSegment(target, center, frame, type, start, stop, 0, 0, 'SYNTHETIC {}'.format(target)), data)
+
+def write_SyntheticSPK(filepath, segments):
+    """
+    Write segments (from make_ChebyshevSegment, lowest priority first) as
+    the SPK at filepath
+    """
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    write_SPK(filepath, segments)
+    return(filepath)
+
+def make_HermiteSegment(target, center, start, stop, n_states, window=8, radius=7e4, period=2*DAY):
+    """
+    A (summary, data) type 13 segment of body target on a circular orbit of
+    radius km about center, with n_states states from ET start to stop
+    interpolated window at a time
+    """
+    epochs = np.linspace(start, stop, n_states)
+    phase = 2 * np.pi * epochs / period
+    rate = 2 * np.pi / period
+    states = np.stack([radius * np.cos(phase), radius * np.sin(phase), 0.1 * radius * np.sin(phase / 3),
+                       -radius * rate * np.sin(phase), radius * rate * np.cos(phase),
+                       0.1 * radius * rate / 3 * np.cos(phase / 3)], axis=-1)
+    #  Every 100th epoch (but never the last), then the window size less one
+    #  and the count
+    directory = epochs[99:n_states - 1:100]
+    data = np.concatenate([states.ravel(), epochs, directory, [window - 1, n_states]])
+    return(SPKSegment(target, center, 1, 13, start, stop, 0, 0, 'HERMITE {}'.format(target)), data)
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+spice = pytest.importorskip('spiceypy')
+
+from body_frames import (BodyOrientations, latitudinal_to_Rectangular, rectangular_to_Latitudinal,
+                         rectangular_to_Spherical, spherical_to_Rectangular)
+from synthetic_kernels import DAY
+
+#  IAU-style constants: Jupiter and Io with linear nutation/precession
+#  angles, Saturn with quadratic ones (MAX_PHASE_DEGREE), the Moon with
+#  angles on the Earth-Moon system, and the Earth with none at all
+PCK = r'''KPL/PCK
+
+\begindata
+
+BODY399_POLE_RA = ( 0. -0.641 0. )
+BODY399_POLE_DEC = ( 90. -0.557 0. )
+BODY399_PM = ( 190.147 360.9856235 0. )
+
+BODY3_NUT_PREC_ANGLES = ( 125.045 -1935.5364525000
+                          250.089 -3871.0729050000
+                          260.008 475263.3328725000 )
+BODY301_POLE_RA = ( 269.9949 0.0031 0. )
+BODY301_POLE_DEC = ( 66.5392 0.0130 0. )
+BODY301_PM = ( 38.3213 13.17635815 -1.4D-12 )
+BODY301_NUT_PREC_RA = ( -3.8787 -0.1204 0.0700 )
+BODY301_NUT_PREC_DEC = ( 1.5419 0.0239 -0.0278 )
+BODY301_NUT_PREC_PM = ( 3.5610 0.1208 -0.0642 )
+
+BODY5_NUT_PREC_ANGLES = ( 99.360714 4850.4046
+                          175.895369 1191.9605
+                          300.323162 262.5475
+                          114.012305 6070.2476
+                          49.511251 64.3000
+                          200.39 -0.004 )
+BODY599_POLE_RA = ( 268.056595 -0.006499 0. )
+BODY599_POLE_DEC = ( 64.495303 0.002413 0. )
+BODY599_PM = ( 284.95 870.5360000 0. )
+BODY599_NUT_PREC_RA = ( 0. 0. 0. 0. 0. 0.000117 )
+BODY599_NUT_PREC_DEC = ( 0. 0. 0. 0. 0. 0.000050 )
+
+BODY501_POLE_RA = ( 268.05 -0.009 0. )
+BODY501_POLE_DEC = ( 64.50 0.003 0. )
+BODY501_PM = ( 200.39 203.4889538 0. )
+BODY501_NUT_PREC_RA = ( 0. 0. 0.094 0.024 )
+BODY501_NUT_PREC_DEC = ( 0. 0. 0.040 0.011 )
+BODY501_NUT_PREC_PM = ( 0. 0. -0.085 -0.022 )
+
+BODY6_MAX_PHASE_DEGREE = 2
+BODY6_NUT_PREC_ANGLES = ( 353.32 75706.7 0.5
+                          28.72 75706.7 -0.25 )
+BODY699_POLE_RA = ( 40.589 -0.036 0. )
+BODY699_POLE_DEC = ( 83.537 -0.004 0. )
+BODY699_PM = ( 38.90 810.7939024 0. )
+BODY699_NUT_PREC_RA = ( 0.01 -0.02 )
+BODY699_NUT_PREC_DEC = ( -0.003 0.001 )
+BODY699_NUT_PREC_PM = ( 0.05 0. )
+
+BODY799_POLE_RA = ( 257.311 0. 0. )
+BODY799_POLE_DEC = ( -15.175 0. 0. )
+BODY799_PM = ( 203.81 -501.1600928 0. )
+BODY799_CONSTANTS_REF_FRAME = 4
+
+\begintext
+'''
+
+BODIES = {399: 'IAU_EARTH', 301: 'IAU_MOON', 599: 'IAU_JUPITER', 501: 'IAU_IO', 699: 'IAU_SATURN'}
+
+#  A century either side of J2000, including J2000 itself
+ETS = np.concatenate([np.linspace(-36525*DAY, 36525*DAY, 201), [0.]])
+
+@pytest.fixture
+def pck(tmp_path):
+    filepath = tmp_path / 'synthetic.tpc'
+    filepath.write_text(PCK)
+    spice.kclear()
+    spice.furnsh(str(filepath))
+    yield(filepath)
+    spice.kclear()
+
+@pytest.mark.parametrize('body', BODIES)
+def test_rotations_match_pxform(pck, body):
+    rotations = BodyOrientations(pck).get_Rotations(body, ETS)
+    expected = np.array([spice.pxform('J2000', BODIES[body], et) for et in ETS])
+    assert rotations.shape == (len(ETS), 3, 3)
+    assert np.abs(rotations - expected).max() < 1e-10
+
+@pytest.mark.parametrize('body', BODIES)
+def test_state_transformations_match_sxform(pck, body):
+    transformations = BodyOrientations(pck).get_StateTransformations(body, ETS)
+    expected = np.array([spice.sxform('J2000', BODIES[body], et) for et in ETS])
+    assert np.abs(transformations[:, :3, :3] - expected[:, :3, :3]).max() < 1e-10
+    assert np.all(transformations[:, :3, 3:] == 0.)
+    #  The derivative block scales with the rotation rate (< 2e-4 rad/s)
+    assert np.abs(transformations[:, 3:, :3] - expected[:, 3:, :3]).max() < 1e-10 * 2e-4
+
+def test_body_fixed_states_round_trip(pck):
+    orientations = BodyOrientations(pck)
+    rng = np.random.default_rng(0)
+    states = rng.normal(size=(2, len(ETS), 6)) * [7e5, 7e5, 7e5, 10., 10., 10.]
+    fixed = orientations.to_BodyFixed(599, ETS, states)
+    expected = np.einsum('nij,knj->kni', np.array([spice.sxform('J2000', 'IAU_JUPITER', et) for et in ETS]), states)
+    assert np.allclose(fixed, expected, rtol=0., atol=1e-4)
+    assert np.allclose(orientations.from_BodyFixed(599, ETS, fixed), states, rtol=0., atol=1e-4)
+    positions = orientations.to_BodyFixed(599, ETS, states[..., :3])
+    assert np.array_equal(positions, fixed[..., :3])
+
+def test_unsupported_bodies_raise(pck):
+    orientations = BodyOrientations(pck)
+    with pytest.raises(ValueError, match='not relative to J2000'):
+        orientations.get_Rotations(799, ETS)
+    with pytest.raises(ValueError, match='No orientation model'):
+        orientations.get_Rotations(899, ETS)
+
+def test_coordinate_conversions_match_spice():
+    rng = np.random.default_rng(1)
+    xyz = rng.normal(size=(4, 50, 3)) * 1e4
+    #  Poles and the origin, where the angles are conventions
+    xyz[0, :3] = [[0., 0., 5.], [0., 0., -5.], [0., 0., 0.]]
+    spherical = rectangular_to_Spherical(xyz)
+    latitudinal = rectangular_to_Latitudinal(xyz)
+    for point, sph, lat in zip(xyz.reshape(-1, 3), spherical.reshape(-1, 3), latitudinal.reshape(-1, 3)):
+        assert np.allclose(sph, spice.recsph(point), rtol=1e-15, atol=1e-15)
+        assert np.allclose(lat, spice.reclat(point), rtol=1e-15, atol=1e-15)
+        assert np.allclose(spherical_to_Rectangular(sph), spice.sphrec(*sph), rtol=0., atol=1e-11)
+        assert np.allclose(latitudinal_to_Rectangular(lat), spice.latrec(*lat), rtol=0., atol=1e-11)
+    assert np.allclose(spherical_to_Rectangular(spherical), xyz, rtol=0., atol=1e-11)
+    assert np.allclose(latitudinal_to_Rectangular(latitudinal), xyz, rtol=0., atol=1e-11)
@@ -0,0 +1,74 @@
+import http.client
+import os
+
+import pytest
+
+from fake_NAIF import FakeNAIFServer, make_FakeNAIFTree
+from kernel_download import KernelDownloader
+
+NAME = 'K/spk/a.bsp'
+
+@pytest.fixture
+def naif(tmp_path):
+    make_FakeNAIFTree(tmp_path / 'naif', {NAME: 50000})
+    os.utime(tmp_path / 'naif' / NAME, (1.5e9, 1.5e9))
+    with FakeNAIFServer(tmp_path / 'naif') as server:
+        yield(server)
+
+def _download(server, filepath, force_update=False, **kwargs):
+    #  A fresh downloader each time, as for separate syncs
+    server.reset_stats()
+    with KernelDownloader(show_progress=False, **kwargs) as downloader:
+        downloader.wait([downloader.download(server.baseurl + NAME, filepath, force_update=force_update)])
+    return(downloader)
+
+def _conditional(headers):
+    return({key: value for key, value in headers.items() if key.startswith('If-')})
+
+def test_unchanged_files_get_a_304(naif, tmp_path):
+    filepath = tmp_path / 'spk' / 'a.bsp'
+    assert _download(naif, filepath).fetched_count == 1
+    assert _conditional(naif.request_headers[0]) == {}
+    #  Stamped with the server's time, like wget --timestamping
+    assert filepath.stat().st_mtime == 1.5e9
+    inode = filepath.stat().st_ino
+
+    downloader = _download(naif, filepath)
+    assert downloader.skipped_count == 1
+    assert set(_conditional(naif.request_headers[0])) == {'If-Modified-Since', 'If-None-Match'}
+    assert filepath.stat().st_ino == inode
+
+def test_changed_files_are_fetched_again(naif, tmp_path):
+    filepath = tmp_path / 'spk' / 'a.bsp'
+    _download(naif, filepath)
+    make_FakeNAIFTree(tmp_path / 'naif', {NAME: b'new version'})
+    os.utime(tmp_path / 'naif' / NAME, (1.6e9, 1.6e9))
+    assert _download(naif, filepath).fetched_count == 1
+    assert filepath.read_bytes() == b'new version'
+    assert filepath.stat().st_mtime == 1.6e9
+
+def test_edited_local_copies_are_replaced(naif, tmp_path):
+    filepath = tmp_path / 'spk' / 'a.bsp'
+    _download(naif, filepath)
+    with open(filepath, 'ab') as f:
+        f.write(b'edited')
+    #  The recorded size no longer matches, so neither header is trusted
+    assert _download(naif, filepath).fetched_count == 1
+    assert _conditional(naif.request_headers[0]) == {}
+    assert filepath.read_bytes() == (tmp_path / 'naif' / NAME).read_bytes()
+
+def test_force_update_downloads_everything(naif, tmp_path):
+    filepath = tmp_path / 'spk' / 'a.bsp'
+    _download(naif, filepath)
+    assert _download(naif, filepath, force_update=True).fetched_count == 1
+    assert _conditional(naif.request_headers[0]) == {}
+
+def test_failed_updates_leave_the_old_file_in_place(naif, tmp_path):
+    filepath = tmp_path / 'spk' / 'a.bsp'
+    _download(naif, filepath)
+    old = filepath.read_bytes()
+    make_FakeNAIFTree(tmp_path / 'naif', {NAME: 80000})
+    naif.interrupt_after = 1000
+    with pytest.raises((OSError, http.client.HTTPException)):
+        _download(naif, filepath, max_retries=0)
+    assert filepath.read_bytes() == old
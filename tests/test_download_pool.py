@@ -0,0 +1,63 @@
+import urllib.error
+
+import pytest
+
+from fake_NAIF import FakeNAIFServer, make_FakeNAIFTree
+from kernel_download import KernelDownloader
+from make_Metakernel import run_urllibForSPICE
+from naif_listing import ListingCache
+
+FILES = {'K/spk/k{:02d}.bsp'.format(i): 1000 + 997 * i for i in range(24)}
+
+@pytest.fixture
+def naif(tmp_path):
+    make_FakeNAIFTree(tmp_path / 'naif', FILES)
+    with FakeNAIFServer(tmp_path / 'naif', latency=0.01) as server:
+        yield(server)
+
+def test_connections_are_reused_and_capped_per_host(naif, tmp_path):
+    with KernelDownloader(max_workers=8, max_per_host=2, show_progress=False) as downloader:
+        downloader.wait([downloader.download(naif.baseurl + name, tmp_path / name) for name in FILES])
+        assert downloader.fetched_count == len(FILES)
+    for name in FILES:
+        assert (tmp_path / name).read_bytes() == (tmp_path / 'naif' / name).read_bytes()
+    assert len(naif.requests) == len(FILES)
+    #  Eight workers, but never more than two connections, each kept alive
+    assert naif.connection_count <= 2
+
+def test_the_same_file_is_transferred_once(naif, tmp_path):
+    with KernelDownloader(show_progress=False) as downloader:
+        futures = [downloader.download(naif.baseurl + 'K/spk/k00.bsp', tmp_path / 'k00.bsp') for _ in range(5)]
+        downloader.wait(futures)
+    assert naif.requests == [('GET', '/K/spk/k00.bsp')]
+
+def test_failures_are_raised_after_the_other_downloads_finish(naif, tmp_path):
+    with KernelDownloader(max_retries=0, show_progress=False) as downloader:
+        futures = [downloader.download(naif.baseurl + 'K/spk/missing.bsp', tmp_path / 'missing.bsp')]
+        futures += [downloader.download(naif.baseurl + name, tmp_path / name) for name in FILES]
+        with pytest.raises(urllib.error.HTTPError) as info:
+            downloader.wait(futures)
+    assert info.value.code == 404
+    assert all((tmp_path / name).exists() for name in FILES)
+    assert not (tmp_path / 'missing.bsp').exists()
+
+def test_redirects_are_followed(naif):
+    with KernelDownloader(show_progress=False) as downloader:
+        #  The server redirects a directory without its trailing slash
+        listing = downloader.fetch_text(naif.baseurl + 'K/spk')
+    assert 'k23.bsp' in listing
+    assert naif.requests == [('GET', '/K/spk'), ('GET', '/K/spk/')]
+
+def test_patterns_are_queued_on_a_shared_downloader(naif, tmp_path):
+    with KernelDownloader(show_progress=False) as downloader:
+        futures = run_urllibForSPICE(naif.baseurl + 'K/spk/', tmp_path / 'spk', ['k0*.bsp', 'k1[0-4].bsp'],
+                                     downloader=downloader, listing_cache=ListingCache())
+        assert len(futures) == 15
+        downloader.wait(futures)
+    assert sorted(path.name for path in (tmp_path / 'spk').glob('*.bsp')) == \
+        ['k{:02d}.bsp'.format(i) for i in range(15)]
+
+    #  Without one, the files are downloaded before returning
+    run_urllibForSPICE(naif.baseurl + 'K/spk/', tmp_path / 'own', 'k23.bsp', show_progress=False,
+                       listing_cache=ListingCache())
+    assert (tmp_path / 'own' / 'k23.bsp').exists()
@@ -0,0 +1,67 @@
+import http.client
+
+import pytest
+
+from fake_NAIF import FakeNAIFServer, make_FakeNAIFTree
+from kernel_download import PARTIAL_SUFFIX, KernelDownloader
+from make_Metakernel import glob_Kernels
+
+NAME = 'K/spk/a.bsp'
+SIZE = 100000
+
+@pytest.fixture
+def naif(tmp_path):
+    make_FakeNAIFTree(tmp_path / 'naif', {NAME: SIZE})
+    with FakeNAIFServer(tmp_path / 'naif') as server:
+        yield(server)
+
+def _download(server, filepath, **kwargs):
+    server.reset_stats()
+    with KernelDownloader(show_progress=False, retry_backoff=0., **kwargs) as downloader:
+        downloader.wait([downloader.download(server.baseurl + NAME, filepath)])
+    return(downloader)
+
+def _ranges(server):
+    return([headers.get('Range') for headers in server.request_headers])
+
+def test_interrupted_transfers_resume(naif, tmp_path):
+    filepath = tmp_path / 'spk' / 'a.bsp'
+    naif.interrupt_after = 30000
+    _download(naif, filepath, max_retries=5)
+    assert filepath.read_bytes() == (tmp_path / 'naif' / NAME).read_bytes()
+    assert _ranges(naif) == [None, 'bytes=30000-', 'bytes=60000-', 'bytes=90000-']
+    assert all(headers.get('If-Range') for headers in naif.request_headers[1:])
+    assert not filepath.with_name('a.bsp' + PARTIAL_SUFFIX).exists()
+
+def test_changed_files_are_sent_whole(naif, tmp_path):
+    filepath = tmp_path / 'spk' / 'a.bsp'
+    naif.interrupt_after = 30000
+    with pytest.raises((OSError, http.client.HTTPException)):
+        _download(naif, filepath, max_retries=0)
+    assert filepath.with_name('a.bsp' + PARTIAL_SUFFIX).stat().st_size == 30000
+
+    #  If-Range no longer matches, so the server sends the new version whole
+    make_FakeNAIFTree(tmp_path / 'naif', {NAME: b'new version' * 5000})
+    naif.interrupt_after = None
+    _download(naif, filepath)
+    assert _ranges(naif) == ['bytes=30000-']
+    assert filepath.read_bytes() == b'new version' * 5000
+
+def test_partials_that_dont_fit_start_again(naif, tmp_path):
+    filepath = tmp_path / 'spk' / 'a.bsp'
+    naif.interrupt_after = 30000
+    with pytest.raises((OSError, http.client.HTTPException)):
+        _download(naif, filepath, max_retries=0)
+    with open(filepath.with_name('a.bsp' + PARTIAL_SUFFIX), 'ab') as f:
+        f.write(b'\0' * SIZE)
+
+    #  Asking for bytes past the end gets a 416; the partial is discarded
+    naif.interrupt_after = None
+    _download(naif, filepath, max_retries=0)
+    assert _ranges(naif) == ['bytes={}-'.format(30000 + SIZE), None]
+    assert filepath.read_bytes() == (tmp_path / 'naif' / NAME).read_bytes()
+
+def test_partials_never_reach_a_metakernel(tmp_path):
+    for name in ['a.bsp', 'b.bsp' + PARTIAL_SUFFIX, '.autometa_manifest.json', '.c.bsp.link']:
+        (tmp_path / name).write_bytes(b'')
+    assert [path.name for path in glob_Kernels(tmp_path, '*')] == ['a.bsp']
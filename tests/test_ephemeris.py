@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+spice = pytest.importorskip('spiceypy')
+
+import ephemeris
+
+DAY = 86400.
+
+def test_public_API_fallback_matches(spk, monkeypatch):
+    ets = np.linspace(-5*DAY, 5*DAY, 7)
+    states, lighttimes = ephemeris.get_States(spk, [1000, 0], 0, 'J2000', ets, lighttimes=True)
+    rotations = ephemeris.get_Rotations(None, 'J2000', 'ECLIPJ2000', ets)
+    assert np.allclose(states[0, :, 0], 1000. + 500. * ets / (10*DAY))
+
+    monkeypatch.setattr(ephemeris, '_get_LibSPICE', lambda function: None)
+    fallback_states, fallback_lighttimes = ephemeris.get_States(spk, [1000, 0], 0, 'J2000', ets, lighttimes=True)
+    assert np.array_equal(states, fallback_states)
+    assert np.array_equal(lighttimes, fallback_lighttimes)
+    assert np.array_equal(ephemeris.get_Positions(spk, 1000, 0, 'J2000', ets)[0], states[0, :, :3])
+    assert np.array_equal(rotations, ephemeris.get_Rotations(None, 'J2000', 'ECLIPJ2000', ets))
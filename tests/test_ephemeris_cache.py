@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+spice = pytest.importorskip('spiceypy')
+
+from ephemeris_cache import EphemerisCache
+
+DAY = 86400.
+
+def test_hits_are_read_only_memory_maps(metakernel, tmp_path):
+    cache = EphemerisCache(tmp_path / 'cache')
+    ets = np.linspace(-5*DAY, 5*DAY, 7)
+    computed = cache.get_States(metakernel, 1000, 0, 'J2000', ets)
+    cached = cache.get_States(metakernel, 1000, 0, 'J2000', ets)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert np.array_equal(computed, cached)
+    assert isinstance(cached, np.memmap)
+    for result in (computed, cached, cache.get_States(metakernel, [1000, 0], 0, 'J2000', ets)):
+        assert not result.flags.writeable
+        with pytest.raises(ValueError):
+            result[0, 0, 0] = 0.
+
+def test_a_multi_target_miss_evicts_once(metakernel, tmp_path, monkeypatch):
+    cache = EphemerisCache(tmp_path / 'cache')
+    evictions = list()
+    evict = cache.evict
+    monkeypatch.setattr(cache, 'evict', lambda max_bytes=None: evictions.append(evict(max_bytes)))
+    cache.get_Positions(metakernel, [1000, 0, 1000], 0, 'J2000', np.linspace(-DAY, DAY, 5))
+    assert cache.misses == 3
+    assert len(evictions) == 1
+
+def test_threads_can_store_the_same_key(tmp_path):
+    cache = EphemerisCache(tmp_path / 'cache')
+    arrays = [np.full((1000, 6), float(i)) for i in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda array: [cache.store('key', array) for _ in range(20)], arrays))
+    assert cache.load('key').shape == (1000, 6)
+    assert [path.name for path in (tmp_path / 'cache').iterdir()] == ['key.npy']
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+spice = pytest.importorskip('spiceypy')
+
+from ephemeris import get_Positions, get_States
+from ephemeris_pool import EphemerisPool
+from synthetic_kernels import DAY, make_ChebyshevSegment, write_SyntheticSPK
+
+TARGETS = ['3', '399', '301']
+
+@pytest.fixture
+def metakernel(tmp_path):
+    spk = write_SyntheticSPK(tmp_path / 'planets.bsp', [
+        make_ChebyshevSegment(3, 0, -20*DAY, 20*DAY, 5, type=3, scale=1.5e8, seed=1),
+        make_ChebyshevSegment(399, 3, -20*DAY, 20*DAY, 9, scale=5e3, seed=2),
+        make_ChebyshevSegment(301, 3, -20*DAY, 20*DAY, 9, scale=4e5, seed=3)])
+    filepath = tmp_path / 'planets.tm'
+    filepath.write_text("\\begindata\nKERNELS_TO_LOAD = ( '{}' )\n\\begintext\n".format(spk))
+    spice.kclear()
+    yield(filepath)
+    spice.kclear()
+
+@pytest.fixture
+def pool(metakernel):
+    with EphemerisPool(metakernel, processes=2) as pool:
+        yield(pool)
+
+ETS = np.linspace(-15*DAY, 15*DAY, 5000)
+
+def test_results_match_get_States_exactly(pool, metakernel):
+    #  Small chunks, so each target is split across both workers
+    states = pool.get_States(TARGETS, '399', 'ECLIPJ2000', ETS, chunk_size=700)
+    assert np.array_equal(states, get_States(metakernel, TARGETS, '399', 'ECLIPJ2000', ETS))
+    positions = pool.get_Positions(TARGETS, '0', 'J2000', ETS)
+    assert np.array_equal(positions, get_Positions(metakernel, TARGETS, '0', 'J2000', ETS))
+    assert pool.get_States(TARGETS, '0', 'J2000', []).shape == (3, 0, 6)
+
+def test_workers_ignore_the_parents_kernels(metakernel, tmp_path):
+    #  A kernel the parent has loaded, which a forked worker inherits, for a
+    #  body the metakernel doesn't have
+    extra = write_SyntheticSPK(tmp_path / 'extra.bsp', [make_ChebyshevSegment(-77, 399, -20*DAY, 20*DAY, 2)])
+    spice.furnsh(str(extra))
+    with EphemerisPool(metakernel, processes=2) as pool:
+        with pytest.raises(spice.exceptions.SpiceyError, match='SPKINSUFFDATA'):
+            pool.get_States('-77', '399', 'J2000', ETS)
+        assert np.array_equal(pool.get_States('399', '3', 'J2000', ETS),
+                              get_States(metakernel, '399', '3', 'J2000', ETS))
+
+def test_worker_errors_are_raised(pool):
+    ets = np.linspace(-15*DAY, 25*DAY, 5000)
+    with pytest.raises(spice.exceptions.SpiceyError, match='SPKINSUFFDATA'):
+        pool.get_States(TARGETS, '0', 'J2000', ets, chunk_size=500)
+    #  The pool is still usable afterwards
+    assert np.isfinite(pool.get_States('301', '0', 'J2000', ETS[:10])).all()
@@ -0,0 +1,66 @@
+import datetime as dt
+import os
+
+import numpy as np
+
+from daf_reader import SPKSegment
+from kernel_coverage import as_Datetime, overlaps_Window, prune_Kernels
+from make_Metakernel import write_Metakernel
+from spk_subset import write_SPK
+
+DAY = 86400.
+
+def _write_SPK(filepath, bodies, start, stop, mtime):
+    #  One type 2 segment (a single, constant record) per (target, center)
+    segments = list()
+    for target, center in bodies:
+        record = [(start + stop) / 2, (stop - start) / 2, 1., 0., 0.]
+        data = np.array(record + [start, stop - start, len(record), 1])
+        segments.append((SPKSegment(target, center, 1, 2, start, stop, 0, 0, 'TEST'), data))
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    write_SPK(filepath, segments)
+    os.utime(filepath, (mtime, mtime))
+    return(filepath)
+
+def _make_Kernels(tmp_path):
+    generic = [_write_SPK(tmp_path / 'generic' / 'spk' / 'de440s.bsp', [(6, 0), (5, 0), (399, 3), (3, 0)],
+                          -100*DAY, 100*DAY, 1e9),
+               _write_SPK(tmp_path / 'generic' / 'spk' / 'sat441.bsp', [(699, 6), (606, 6)],
+                          -100*DAY, 100*DAY, 1e9)]
+    spacecraft = [_write_SPK(tmp_path / 'sc' / 'spk' / 'old.bsp', [(-82, 6)], 0., 10*DAY, 1e9),
+                  _write_SPK(tmp_path / 'sc' / 'spk' / 'new.bsp', [(-82, 6)], -DAY, 20*DAY, 2e9)]
+    return(generic, spacecraft)
+
+def test_prune_keeps_kernels_without_target_segments(tmp_path):
+    generic, spacecraft = _make_Kernels(tmp_path)
+    kept = prune_Kernels(generic + spacecraft, targets=[-82])
+    names = [filepath.name for filepath in kept]
+    #  old.bsp is entirely superseded; de440s holds the chain -82 -> 6 -> 0
+    #  and sat441 no -82 segments at all, so neither can be
+    assert 'old.bsp' not in names
+    assert {'de440s.bsp', 'sat441.bsp', 'new.bsp'} <= set(names)
+
+def test_metakernel_prune_keeps_generic_kernels(tmp_path):
+    generic, spacecraft = _make_Kernels(tmp_path)
+    path_dict = {'generic_kernel_dir': tmp_path / 'generic', 'spacecraft_kernel_dir': tmp_path / 'sc'}
+    mk_filepath = tmp_path / 'metakernel_test.txt'
+    write_Metakernel('cassini', mk_filepath, path_dict, generic, spacecraft, basedir=tmp_path,
+                     prune=True, targets=[-82], overwrite=True)
+    text = mk_filepath.read_text()
+    assert 'de440s.bsp' in text
+    assert 'sat441.bsp' in text
+    assert 'new.bsp' in text
+    assert 'old.bsp' not in text
+
+def test_time_zone_aware_windows_are_compared_in_UTC():
+    name = 'spk_rec_160826_160829_160905.bsp'
+    utc = dt.timezone.utc
+    assert as_Datetime('2016-08-27T01:00:00+05:00') == dt.datetime(2016, 8, 26, 20)
+    assert as_Datetime(dt.datetime(2016, 8, 27, tzinfo=utc)) == dt.datetime(2016, 8, 27)
+    assert overlaps_Window(name, 'juno', start=dt.datetime(2016, 8, 27, tzinfo=utc))
+    assert overlaps_Window(name, 'juno', start='2016-08-28T00:00:00+00:00', stop='2016-09-01T00:00:00+00:00')
+    assert not overlaps_Window(name, 'juno', start=dt.datetime(2016, 9, 1, tzinfo=utc))
+    #  The file covers up to the end of 2016-08-29 UTC, which is still the
+    #  29th in US/Pacific
+    assert overlaps_Window(name, 'juno', start='2016-08-29T16:00:00-07:00')
+    assert not overlaps_Window(name, 'juno', start='2016-08-29T17:00:01-07:00')
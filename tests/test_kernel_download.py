@@ -0,0 +1,53 @@
+import hashlib
+
+import pytest
+
+from fake_NAIF import FakeNAIFServer, make_FakeNAIFTree
+from kernel_download import KernelDownloader
+from kernel_manifest import KernelChecksumError
+from make_Metakernel import run_urllibForSPICE
+from naif_listing import ListingCache
+
+def _make_Tree(root, published_md5=None):
+    kernels = {'K/spk/a{}.bsp'.format(i): 'kernel {}'.format(i).encode() * 1000 for i in range(3)}
+    labels = {name[:-4] + '.lbl': 'MD5_CHECKSUM = "{}"\n'.format(published_md5 or hashlib.md5(content).hexdigest()).encode()
+              for name, content in kernels.items()}
+    make_FakeNAIFTree(root, {**kernels, **labels})
+
+def _sync(server, savedir, **kwargs):
+    with KernelDownloader(show_progress=False, **kwargs) as downloader:
+        downloader.wait(run_urllibForSPICE(server.baseurl + 'K/spk/', savedir, '*', downloader=downloader,
+                                           listing_cache=ListingCache()))
+
+def test_each_label_is_fetched_once(tmp_path):
+    _make_Tree(tmp_path / 'naif')
+    with FakeNAIFServer(tmp_path / 'naif') as server:
+        _sync(server, tmp_path / 'spk')
+        for i in range(3):
+            assert server.requests.count(('GET', '/K/spk/a{}.lbl'.format(i))) == 1
+
+def test_wrong_published_checksums_still_fail(tmp_path):
+    _make_Tree(tmp_path / 'naif', published_md5='0' * 32)
+    with FakeNAIFServer(tmp_path / 'naif') as server:
+        with pytest.raises(KernelChecksumError):
+            _sync(server, tmp_path / 'spk', max_retries=0)
+
+def test_label_transport_errors_leave_the_kernel_unverified(tmp_path, monkeypatch):
+    _make_Tree(tmp_path / 'naif')
+    with FakeNAIFServer(tmp_path / 'naif') as server:
+        with KernelDownloader(show_progress=False) as downloader:
+            fetch_text = downloader.fetch_text
+            def flaky_FetchText(url, encoding='utf-8'):
+                if url.endswith('.lbl'):
+                    raise ConnectionResetError('dropped')
+                return(fetch_text(url, encoding=encoding))
+            monkeypatch.setattr(downloader, 'fetch_text', flaky_FetchText)
+            with pytest.warns(UserWarning, match='unverified'):
+                downloader.wait([downloader.download(server.baseurl + 'K/spk/a0.bsp', tmp_path / 'spk' / 'a0.bsp',
+                                                     label_url=server.baseurl + 'K/spk/a0.lbl')])
+            assert server.requests == [('GET', '/K/spk/a0.bsp')]
+            assert downloader.get_manifest(tmp_path / 'spk').get('a0.bsp')['checksum_verified'] is False
+
+            #  The failure isn't remembered as "no label"
+            monkeypatch.setattr(downloader, 'fetch_text', fetch_text)
+            assert downloader.get_PublishedChecksum(server.baseurl + 'K/spk/a0.lbl') is not None
@@ -0,0 +1,154 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+spice = pytest.importorskip('spiceypy')
+
+from daf_reader import SPKSegment
+from ephemeris import get_Positions, get_Rotations, get_States, get_StateTransformations
+from kernel_server import _LENGTH, KernelClient, KernelServer, KernelServerError, recv_Message
+from spk_subset import write_SPK
+from synthetic_kernels import DAY, make_ChebyshevSegment, write_SyntheticSPK
+
+@pytest.fixture
+def server(metakernel, tmp_path):
+    with KernelServer(metakernel, socket_path=tmp_path / 'k.sock', poll_interval=60.) as server:
+        yield(server)
+
+def _send_Raw(server, header):
+    #  The reply to a hand-made message, and whether the server then hung up
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(10.)
+    sock.connect(str(server.socket_path))
+    with sock:
+        encoded = json.dumps(header).encode('utf-8')
+        sock.sendall(_LENGTH.pack(len(encoded)) + encoded)
+        reply, arrays = recv_Message(sock)
+        return(reply, sock.recv(1) == b'')
+
+@pytest.mark.parametrize('spec', [{'dtype': '|O', 'shape': [4], 'nbytes': 32},
+                                  {'dtype': '<f8', 'shape': [2**40], 'nbytes': 8 * 2**40},
+                                  {'dtype': '<f8', 'shape': [4, 4], 'nbytes': 128},
+                                  {'dtype': '<f8', 'shape': [4], 'nbytes': 8},
+                                  {'dtype': '<f8', 'shape': [-1]},
+                                  'nonsense'])
+def test_malformed_arrays_are_refused(server, spec):
+    header = {'query': 'states', 'targets': ['1000'], 'observer': '0', 'frame': 'J2000', 'arrays': [spec]}
+    reply, closed = _send_Raw(server, header)
+    assert reply['status'] == 'error'
+    assert reply['error'] == 'KernelMessageError'
+    assert closed
+    assert server.query_count == 0
+
+    #  Other clients are still served
+    with KernelClient(server.socket_path, timeout=10.) as client:
+        assert client.get_Positions(1000, 0, 'J2000', [0.]).shape == (1, 1, 3)
+
+def test_oversized_headers_are_refused(server):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(10.)
+    sock.connect(str(server.socket_path))
+    with sock:
+        sock.sendall(_LENGTH.pack(2**40))
+        reply, arrays = recv_Message(sock)
+    assert reply['error'] == 'KernelMessageError'
+
+@pytest.fixture
+def bodies_metakernel(tmp_path):
+    #  Several bodies in two SPKs, and epochs in and out of one of them
+    planets = write_SyntheticSPK(tmp_path / 'planets.bsp', [
+        make_ChebyshevSegment(3, 0, -20*DAY, 20*DAY, 5, type=3, frame=17, scale=1.5e8, seed=1),
+        make_ChebyshevSegment(399, 3, -20*DAY, 20*DAY, 9, scale=5e3, seed=2)])
+    spacecraft = write_SyntheticSPK(tmp_path / 'spacecraft.bsp', [
+        make_ChebyshevSegment(-77, 399, -10*DAY, 10*DAY, 30, type=3, ncoef=5, scale=1e4, seed=3)])
+    filepath = tmp_path / 'bodies.tm'
+    filepath.write_text("\\begindata\nKERNELS_TO_LOAD = ( '{}'\n                    '{}' )\n\\begintext\n"
+                        .format(planets, spacecraft))
+    return(filepath)
+
+ETS = np.linspace(-10*DAY, 10*DAY, 1001)
+
+def test_queries_match_ephemeris(bodies_metakernel, tmp_path):
+    #  Everything is evaluated in this process's pool before the server
+    #  (which clears it) starts. Light time correction needs the spacecraft
+    #  a moment before each epoch, so those skip the first
+    spice.kclear()
+    expected = {'states': get_States(bodies_metakernel, [3, 399, -77], 0, 'ECLIPJ2000', ETS),
+                'positions': get_Positions(bodies_metakernel, [-77], 3, 'J2000', ETS[1:], abcorr='LT+S'),
+                'rotations': get_Rotations(bodies_metakernel, 'J2000', 'ECLIPJ2000', ETS),
+                'transformations': get_StateTransformations(bodies_metakernel, 'B1950', 'ECLIPJ2000', ETS)}
+    with KernelServer(bodies_metakernel, socket_path=tmp_path / 'k.sock', poll_interval=60.) as server:
+        with KernelClient(server.socket_path, timeout=10.) as client:
+            results = {'states': client.get_States([3, 399, -77], 0, 'ECLIPJ2000', ETS),
+                       'positions': client.get_Positions(-77, 3, 'J2000', ETS[1:], abcorr='LT+S'),
+                       'rotations': client.get_Rotations('J2000', 'ECLIPJ2000', ETS),
+                       'transformations': client.get_StateTransformations('B1950', 'ECLIPJ2000', ETS)}
+            for query in expected:
+                assert np.array_equal(results[query], expected[query]), query
+
+            #  Results are received straight into out
+            out = np.full((3, len(ETS), 6), np.nan)
+            assert client.get_States([3, 399, -77], 0, 'ECLIPJ2000', ETS, out=out) is out
+            assert np.array_equal(out, expected['states'])
+
+            #  Errors come back as KernelServerError, and the connection
+            #  stays usable
+            with pytest.raises(KernelServerError, match='SPKINSUFFDATA'):
+                client.get_States(-77, 0, 'J2000', [15*DAY])
+            assert np.array_equal(client.get_Rotations('J2000', 'ECLIPJ2000', ETS), expected['rotations'])
+
+            info = client.get_Info()
+            assert info['metakernels'] == [str(bodies_metakernel.resolve())]
+            assert info['load_count'] == 1
+            assert info['load_error'] is None
+            assert info['kernel_count'] == 3
+            assert info['query_count'] == 7
+    assert not (tmp_path / 'k.sock').exists()
+
+def _wait_For(condition, timeout=20.):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+def test_changed_kernels_are_reloaded(metakernel, spk, tmp_path):
+    with KernelServer(metakernel, socket_path=tmp_path / 'k.sock', poll_interval=0.1) as server:
+        with KernelClient(server.socket_path, timeout=10.) as client:
+            assert client.get_Positions(1000, 0, 'J2000', [DAY])[0, 0, 0] == 1050.
+
+            #  The body moves twice as fast in the replacement kernel
+            replacement = tmp_path / 'replacement.bsp'
+            record = [0., 10*DAY, 1000., 1000., 0., 0., 0., 0.]
+            write_SPK(replacement, [(SPKSegment(1000, 0, 1, 2, -10*DAY, 10*DAY, 0, 0, 'TEST'),
+                                     np.array(record + [-10*DAY, 20*DAY, len(record), 1]))])
+            os.replace(replacement, spk)
+            _wait_For(lambda: client.get_Info()['load_count'] >= 2)
+            assert client.get_Positions(1000, 0, 'J2000', [DAY])[0, 0, 0] == 1100.
+
+            #  An explicit reload too
+            client.reload()
+            assert client.get_Info()['load_count'] >= 3
+
+def test_command_line_server(metakernel, tmp_path):
+    socket_path = tmp_path / 'cli.sock'
+    script = Path(__file__).resolve().parents[1] / 'autometa' / 'kernel_server.py'
+    process = subprocess.Popen([sys.executable, str(script), str(metakernel), '--socket', str(socket_path),
+                                '--poll', '0.5'], stdout=subprocess.DEVNULL)
+    try:
+        _wait_For(socket_path.exists)
+        with KernelClient(socket_path, timeout=10.) as client:
+            assert np.array_equal(client.get_Positions(1000, 0, 'J2000', [0., DAY])[0, :, 0], [1000., 1050.])
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=20.) == 0
+    finally:
+        process.kill()
+        process.wait()
+    assert not socket_path.exists()
@@ -0,0 +1,26 @@
+import os
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+
+from kernel_sources import ArchiveSource, link_File
+
+def test_threads_can_place_the_same_file(tmp_path):
+    source = tmp_path / 'mirror' / 'a.bsp'
+    source.parent.mkdir()
+    source.write_bytes(b'kernel' * 10000)
+    with tarfile.open(tmp_path / 'kernels.tar', 'w') as tar:
+        tar.add(source, arcname='spk/a.bsp')
+    archive = ArchiveSource(tmp_path / 'kernels.tar')
+
+    (tmp_path / 'linked').mkdir()
+    (tmp_path / 'extracted').mkdir()
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: link_File(source, tmp_path / 'linked' / 'a.bsp'), range(64)))
+        list(pool.map(lambda _: archive.fetch('spk/a.bsp', tmp_path / 'extracted' / 'a.bsp', force_update=True),
+                      range(64)))
+    archive.close()
+
+    assert os.path.samefile(source, tmp_path / 'linked' / 'a.bsp')
+    assert (tmp_path / 'extracted' / 'a.bsp').read_bytes() == source.read_bytes()
+    assert os.listdir(tmp_path / 'linked') == ['a.bsp']
+    assert os.listdir(tmp_path / 'extracted') == ['a.bsp']
@@ -0,0 +1,40 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from kernel_store import KernelStore
+
+def test_threads_can_add_and_record_the_same_kernel(tmp_path):
+    store = KernelStore(tmp_path / 'store')
+    content = b'kernel' * 10000
+    sha256 = hashlib.sha256(content).hexdigest()
+    filepaths = [tmp_path / 'project{}'.format(i) / 'a.bsp' for i in range(16)]
+    for filepath in filepaths:
+        filepath.parent.mkdir()
+        filepath.write_bytes(content)
+
+    def add(filepath):
+        store.add(filepath, sha256)
+        store.record('https://example.com/a.bsp', sha256=sha256, size=len(content))
+        #  Linking again over an existing link leaves nothing behind
+        store.link(sha256, filepath.with_name('b.bsp'))
+        store.link(sha256, filepath.with_name('b.bsp'))
+    with ThreadPoolExecutor(16) as pool:
+        list(pool.map(add, filepaths))
+
+    for filepath in filepaths:
+        assert os.path.samefile(filepath, store.object_path(sha256))
+        assert sorted(path.name for path in filepath.parent.iterdir()) == ['a.bsp', 'b.bsp']
+    assert store.lookup('https://example.com/a.bsp')['sha256'] == sha256
+    assert [path.name for path in store.object_path(sha256).parent.iterdir()] == [sha256]
+    assert len(list(store.urls_dir.iterdir())) == 1
+
+def test_url_records_follow_the_umask(tmp_path):
+    store = KernelStore(tmp_path / 'store')
+    umask = os.umask(0o022)
+    try:
+        store.record('https://example.com/a.bsp', sha256='0' * 64)
+    finally:
+        os.umask(umask)
+    [record] = store.urls_dir.iterdir()
+    assert record.stat().st_mode & 0o777 == 0o644
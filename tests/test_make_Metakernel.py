@@ -0,0 +1,45 @@
+import pytest
+
+import mission_catalog
+from fake_NAIF import FakeNAIFServer, make_FakeNAIFTree
+from make_Metakernel import MetakernelBuildError, make_Metakernels
+from mission_catalog import get_GenericSources, register_Mission
+
+@pytest.fixture
+def naif(tmp_path):
+    files = {source.url + pattern.replace('*', 'x'): 100
+             for source in get_GenericSources() for pattern in source.namepatterns}
+    files['JUNO/kernels/spk/spk_rec_110805_110808_110904.bsp'] = 100
+    files['JUNO/kernels/fk/juno_v12.tf'] = 100
+    make_FakeNAIFTree(tmp_path / 'naif', files)
+    with FakeNAIFServer(tmp_path / 'naif') as server:
+        yield(server)
+
+def test_make_Metakernels_rejects_empty_list(tmp_path):
+    with pytest.raises(ValueError):
+        make_Metakernels([], basedir=tmp_path)
+
+def test_make_Metakernels_isolates_failures(naif, tmp_path, monkeypatch):
+    #  Registered for this test only
+    monkeypatch.setattr(mission_catalog, '_registered', dict(mission_catalog._registered))
+    register_Mission('broken', [{'type': 'spk', 'url': 'BROKEN/kernels/spk/', 'namepatterns': ['*.bsp']}])
+    basedir = tmp_path / 'project'
+    with pytest.raises(MetakernelBuildError) as info:
+        make_Metakernels(['juno', 'broken', 'nonesuch'], basedir=basedir, baseurl=naif.baseurl,
+                         show_progress=False)
+    error = info.value
+    assert list(error.errors) == ['broken']
+    assert error.metakernels['juno'].exists()
+    assert error.metakernels['broken'] is None
+    assert error.metakernels['nonesuch'] is None
+    #  Unsupported spacecraft get no directories
+    assert not (basedir / 'SPICE' / 'nonesuch').exists()
+
+def test_mirror_baseurl_without_trailing_slash(naif, tmp_path):
+    metakernels = make_Metakernels(['juno'], basedir=tmp_path / 'project', baseurl=str(tmp_path / 'naif'),
+                                   show_progress=False)
+    text = metakernels['juno'].read_text()
+    assert 'spk_rec_110805_110808_110904.bsp' in text
+
+def test_registered_missions_dont_leak_between_tests():
+    assert mission_catalog.get_Mission('broken') is None
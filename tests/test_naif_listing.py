@@ -0,0 +1,40 @@
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_NAIF import FakeNAIFServer, make_FakeNAIFTree
+from kernel_download import KernelDownloader
+from make_Metakernel import run_urllibForSPICE
+from naif_listing import ListingCache, ListingEntry
+
+PACIFIC = dt.timezone(dt.timedelta(hours=-7))
+
+def _sync(server, savedir):
+    with KernelDownloader(show_progress=False) as downloader:
+        downloader.wait(run_urllibForSPICE(server.baseurl + 'JUNO/kernels/spk/', savedir, '*.bsp',
+                                           downloader=downloader, listing_cache=ListingCache()))
+        return(downloader)
+
+def test_unchanged_files_skip_the_server_with_a_non_UTC_listing(tmp_path):
+    make_FakeNAIFTree(tmp_path / 'naif', {'JUNO/kernels/spk/a.bsp': 5000, 'JUNO/kernels/spk/b.bsp': 800})
+    with FakeNAIFServer(tmp_path / 'naif', listing_timezone=PACIFIC) as server:
+        assert _sync(server, tmp_path / 'spk').fetched_count == 2
+
+        #  Only the listing is fetched the second time
+        server.reset_stats()
+        downloader = _sync(server, tmp_path / 'spk')
+        assert downloader.skipped_count == 2
+        assert server.requests == [('GET', '/JUNO/kernels/spk/')]
+
+        #  A changed file shows up in the listing, so is fetched again
+        make_FakeNAIFTree(tmp_path / 'naif', {'JUNO/kernels/spk/b.bsp': 900})
+        server.reset_stats()
+        assert _sync(server, tmp_path / 'spk').fetched_count == 1
+        assert (tmp_path / 'spk' / 'b.bsp').stat().st_size == 900
+
+def test_threads_can_cache_the_same_listing(tmp_path):
+    cache = ListingCache(cache_dir=tmp_path / 'listings')
+    listing = [ListingEntry('a{}.bsp'.format(i), i, None) for i in range(1000)]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: cache.put('https://example.com/spk/', listing), range(64)))
+    assert len(list((tmp_path / 'listings').iterdir())) == 1
+    assert ListingCache(cache_dir=tmp_path / 'listings').get('https://example.com/spk/') == listing
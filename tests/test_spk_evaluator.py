@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+spice = pytest.importorskip('spiceypy')
+
+from spk_evaluator import SPKEphemeris, SPKEvaluationError
+from synthetic_kernels import DAY, make_ChebyshevSegment, write_SyntheticSPK
+
+@pytest.fixture
+def spks(tmp_path):
+    #  Earth-Moon barycenter about the SSB (type 3, ecliptic), the Earth and
+    #  Moon about it (type 2), and a later file replacing the Earth for part
+    #  of the time and adding a spacecraft about the Earth
+    planets = write_SyntheticSPK(tmp_path / 'planets.bsp', [
+        make_ChebyshevSegment(3, 0, -20*DAY, 20*DAY, 5, type=3, frame=17, scale=1.5e8, seed=1),
+        make_ChebyshevSegment(399, 3, -20*DAY, 20*DAY, 9, scale=5e3, seed=2),
+        make_ChebyshevSegment(301, 3, -20*DAY, 20*DAY, 9, scale=4e5, seed=3)])
+    update = write_SyntheticSPK(tmp_path / 'update.bsp', [
+        make_ChebyshevSegment(399, 3, -5*DAY, 5*DAY, 4, ncoef=12, scale=5e3, seed=4),
+        make_ChebyshevSegment(-77, 399, -10*DAY, 10*DAY, 30, type=3, ncoef=5, scale=1e4, seed=5)])
+    filepaths = [planets, update]
+    spice.kclear()
+    for filepath in filepaths:
+        spice.furnsh(str(filepath))
+    yield(filepaths)
+    spice.kclear()
+
+#  Record boundaries, segment boundaries and everything in between
+ETS = np.concatenate([np.linspace(-10*DAY, 10*DAY, 1001), [-5*DAY, 5*DAY, -10*DAY + 1e-3, 0.]])
+
+@pytest.mark.parametrize('observer', [0, 3, 399, 301, -77])
+@pytest.mark.parametrize('frame', ['J2000', 'ECLIPJ2000'])
+def test_states_match_spkezr(spks, observer, frame):
+    targets = [3, 399, 301, -77]
+    with SPKEphemeris(spks) as ephemeris:
+        states = ephemeris.get_States(targets, observer, frame, ETS)
+    for i, target in enumerate(targets):
+        expected, _ = spice.spkezr(str(target), ETS, frame, 'NONE', str(observer))
+        expected = np.array(expected)
+        #  A few ulp of the largest state in the chain (~1.5e8 km)
+        assert np.abs(states[i, :, :3] - expected[:, :3]).max() < 1e-6
+        assert np.abs(states[i, :, 3:] - expected[:, 3:]).max() < 1e-11
+
+def test_nearby_bodies_match_closely(spks):
+    #  Where the chain doesn't pass through the SSB, there's no large state
+    #  to lose precision in
+    with SPKEphemeris(spks) as ephemeris:
+        states = ephemeris.get_States(['-77', 301], 399, 'J2000', ETS)
+    for i, target in enumerate(['-77', '301']):
+        expected = np.array(spice.spkezr(target, ETS, 'J2000', 'NONE', '399')[0])
+        assert np.abs(states[i] - expected).max() < 2e-10 * np.abs(expected).max()
+
+def test_positions_and_names(spks):
+    with SPKEphemeris(spks) as ephemeris:
+        positions = ephemeris.get_Positions('MOON', 'EARTH', 'J2000', ETS[:10])
+        assert ephemeris.bodies() == [-77, 3, 301, 399]
+    expected = np.array(spice.spkpos('MOON', ETS[:10], 'J2000', 'NONE', 'EARTH')[0])
+    assert np.allclose(positions[0], expected, rtol=0, atol=1e-6)
+
+def test_gaps_and_unsupported_segments_raise(spks, tmp_path):
+    with SPKEphemeris(spks) as ephemeris:
+        #  The spacecraft only has data for +/- 10 days, as SPICE would say
+        with pytest.raises(SPKEvaluationError):
+            ephemeris.get_States(-77, 399, 'J2000', [15*DAY])
+        with pytest.raises(spice.exceptions.SpiceSPKINSUFFDATA):
+            spice.spkezr('-77', 15*DAY, 'J2000', 'NONE', '399')
+        with pytest.raises(SPKEvaluationError):
+            ephemeris.get_States(399, 0, 'IAU_EARTH', [0.])
+
+    #  A segment in a frame we can't rotate isn't skipped, as that would
+    #  give a different answer to SPICE's
+    b1950 = write_SyntheticSPK(tmp_path / 'b1950.bsp', [make_ChebyshevSegment(301, 3, -DAY, DAY, 1, frame=2)])
+    with SPKEphemeris(spks + [b1950]) as ephemeris:
+        ephemeris.get_States(301, 3, 'J2000', [2*DAY])
+        with pytest.raises(SPKEvaluationError):
+            ephemeris.get_States(301, 3, 'J2000', [0.])
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+spice = pytest.importorskip('spiceypy')
+
+from daf_reader import read_SPKSegments
+from spk_evaluator import SPKEvaluationError
+from spk_subset import subset_Metakernel, subset_SPK
+from synthetic_kernels import DAY, make_ChebyshevSegment, make_HermiteSegment, write_SyntheticSPK
+
+START, STOP = -3.3*DAY, 4.1*DAY
+
+@pytest.fixture
+def spks(tmp_path):
+    #  The Earth-Moon system about the SSB, a spacecraft about the Earth (type
+    #  2, with a later type 13 segment overriding part of it), and a lander
+    #  about the Moon in 80 short segments, so that both the full kernel and
+    #  the subset need more than one summary record
+    planets = write_SyntheticSPK(tmp_path / 'kernels' / 'planets.bsp', [
+        make_ChebyshevSegment(3, 0, -20*DAY, 20*DAY, 5, type=3, frame=17, scale=1.5e8, seed=1),
+        make_ChebyshevSegment(399, 3, -20*DAY, 20*DAY, 9, scale=5e3, seed=2),
+        make_ChebyshevSegment(301, 3, -20*DAY, 20*DAY, 9, scale=4e5, seed=3),
+        make_ChebyshevSegment(599, 5, -20*DAY, 20*DAY, 3, scale=1e4, seed=4),
+        make_ChebyshevSegment(5, 0, -20*DAY, 20*DAY, 3, scale=7e8, seed=5)])
+    spacecraft = write_SyntheticSPK(tmp_path / 'kernels' / 'spacecraft.bsp', [
+        make_ChebyshevSegment(-77, 399, -10*DAY, 10*DAY, 40, ncoef=6, scale=1e4, seed=6),
+        make_HermiteSegment(-77, 399, -1*DAY, 2*DAY, 250)])
+    lander = write_SyntheticSPK(tmp_path / 'kernels' / 'lander.bsp', [
+        make_ChebyshevSegment(-78, 301, i*DAY/4, (i + 1)*DAY/4, 3, type=3, scale=2e3, seed=50 + i)
+        for i in range(-40, 40)])
+    return([planets, spacecraft, lander])
+
+def _get_States(filepaths, targets, ets):
+    spice.kclear()
+    try:
+        for filepath in filepaths:
+            spice.furnsh(str(filepath))
+        return(np.array([[spice.spkez(target, et, 'J2000', 'NONE', 0)[0] for et in ets] for target in targets]))
+    finally:
+        spice.kclear()
+
+def _is_Missing(filepaths, target, et):
+    spice.kclear()
+    try:
+        for filepath in filepaths:
+            spice.furnsh(str(filepath))
+        spice.spkez(target, et, 'J2000', 'NONE', 0)
+    except spice.utils.exceptions.SpiceSPKINSUFFDATA:
+        return(True)
+    finally:
+        spice.kclear()
+    return(False)
+
+#  The window's edges, record and segment boundaries, and in between
+ETS = np.concatenate([np.linspace(START, STOP, 501), [-DAY, 2*DAY, 0., DAY/2]])
+
+def test_subset_states_match_full_kernels(spks, tmp_path):
+    subset = tmp_path / 'subset.bsp'
+    segments = subset_SPK(spks, subset, [-77, -78], START, STOP)
+    assert len(read_SPKSegments(spks[2])) == 80
+    assert len(segments) > 25
+    assert set(segment.target for segment in segments) == {-77, -78, 399, 301, 3}
+    assert 13 in set(segment.type for segment in segments)
+    assert all(START <= segment.start_et and segment.stop_et <= STOP for segment in segments)
+    assert subset.stat().st_size < sum(spk.stat().st_size for spk in spks) / 2
+
+    targets = [-77, -78, 399, 301, 3]
+    assert np.array_equal(_get_States([subset], targets, ETS), _get_States(spks, targets, ETS))
+
+    #  Outside the window, and bodies that weren't needed, are gone
+    for target, et in [(-77, START - 1.), (-77, STOP + 1.), (-78, -5*DAY), (599, 0.), (5, 0.)]:
+        assert _is_Missing([subset], target, et)
+        assert not _is_Missing(spks, target, et)
+
+def test_subset_without_centers(spks, tmp_path):
+    subset = tmp_path / 'subset.bsp'
+    segments = subset_SPK(spks, subset, ['-77'], START, STOP, centers=False)
+    assert set(segment.target for segment in segments) == {-77}
+    assert _is_Missing([subset], -77, 0.)
+    assert not _is_Missing([subset] + spks[:1], -77, 0.)
+
+def test_no_segments_raises(spks, tmp_path):
+    with pytest.raises(SPKEvaluationError):
+        subset_SPK(spks, tmp_path / 'subset.bsp', [-77], 30*DAY, 40*DAY)
+    assert not (tmp_path / 'subset.bsp').exists()
+
+@pytest.mark.parametrize('copy_kernels', [True, False])
+def test_subset_metakernel_bundle(spks, tmp_path, copy_kernels):
+    constants = tmp_path / 'kernels' / 'constants.tpc'
+    constants.write_text('KPL/PCK\n\\begindata\nBODY399_RADII = ( 6378.1366 6378.1366 6356.7519 )\n\\begintext\n')
+    metakernel = tmp_path / 'full.tm'
+    metakernel.write_text("\\begindata\nPATH_VALUES = ( '{}' )\nPATH_SYMBOLS = ( 'K' )\nKERNELS_TO_LOAD = (\n"
+                          "'$K/constants.tpc'\n'$K/planets.bsp'\n'$K/spacecraft.bsp'\n'$K/lander.bsp' )\n"
+                          "\\begintext\n".format(tmp_path / 'kernels'))
+    bundle = subset_Metakernel(metakernel, tmp_path / 'bundle', [-77], START, STOP, copy_kernels=copy_kernels)
+    assert bundle.parent == tmp_path / 'bundle'
+    assert (tmp_path / 'bundle' / 'full_subset.bsp').exists()
+    assert (tmp_path / 'bundle' / 'constants.tpc').exists() == copy_kernels
+
+    targets = [-77, 399, 3]
+    assert np.array_equal(_get_States([bundle], targets, ETS), _get_States([metakernel], targets, ETS))
+    assert _is_Missing([bundle], -78, 0.)
+
+    spice.kclear()
+    spice.furnsh(str(bundle))
+    try:
+        assert spice.ktotal('ALL') == 3
+        assert np.array_equal(spice.bodvrd('EARTH', 'RADII', 3)[1], [6378.1366, 6378.1366, 6356.7519])
+    finally:
+        spice.kclear()
@@ -0,0 +1,148 @@
+import json
+import urllib.error
+
+import pytest
+
+import sync_events
+from fake_NAIF import FakeNAIFServer, make_FakeNAIFTree
+from kernel_download import KernelDownloader
+from make_Metakernel import make_Metakernels
+from mission_catalog import get_GenericSources
+from sync_events import EventLog, JSONLinesSink, emit_Event, event_Sinks, has_EventSinks, span_Phase
+
+@pytest.fixture(autouse=True)
+def no_sinks(monkeypatch):
+    #  No sinks left over from other tests, and none from the environment
+    monkeypatch.delenv(sync_events.EVENTS_ENVIRONMENT_VARIABLE, raising=False)
+    monkeypatch.setattr(sync_events, '_sinks', list())
+    monkeypatch.setattr(sync_events, '_environment_checked', False)
+
+@pytest.fixture
+def naif(tmp_path):
+    files = {source.url + pattern.replace('*', 'x'): 100
+             for source in get_GenericSources() for pattern in source.namepatterns}
+    files['JUNO/kernels/spk/spk_rec_110805_110808_110904.bsp'] = 100
+    files['JUNO/kernels/fk/juno_v12.tf'] = 100
+    make_FakeNAIFTree(tmp_path / 'naif', files)
+    with FakeNAIFServer(tmp_path / 'naif') as server:
+        yield(server)
+
+def _sync(naif, tmp_path):
+    log = EventLog()
+    with event_Sinks(log):
+        make_Metakernels(['juno'], basedir=tmp_path / 'project', baseurl=naif.baseurl, show_progress=False)
+    return(log)
+
+def test_sync_events(naif, tmp_path):
+    log = _sync(naif, tmp_path)
+    events = log.events
+    assert all({'event', 'time', 'thread'} <= set(event) for event in events)
+
+    #  Every phase starts and ends, and the outermost span holds the rest
+    starts = [event['phase'] for event in events if event['event'] == 'phase_start']
+    ends = [event for event in events if event['event'] == 'phase_end']
+    assert sorted(starts) == sorted(event['phase'] for event in ends)
+    assert set(starts) == {'make_metakernels', 'make_directories', 'sync', 'write_metakernel'}
+    assert events[0]['event'] == 'phase_start' and events[0]['phase'] == 'make_metakernels'
+    assert events[-1]['event'] == 'phase_end' and events[-1]['phase'] == 'make_metakernels'
+    assert all(event['error'] is None and event['seconds'] >= 0. for event in ends)
+    assert sorted(event['kind'] for event in ends if event['phase'] == 'sync') == ['generic', 'spacecraft']
+
+    files = [event for event in events if event['event'] == 'file']
+    assert len(files) == sum(not path.endswith('/') for _, path in naif.requests)
+    assert all(event['outcome'] == 'fetched' and event['reason'] == 'download' for event in files)
+    assert all(event['bytes'] == 100 and event['attempts'] == 1 for event in files)
+    assert {'spk_rec_110805_110808_110904.bsp', 'juno_v12.tf'} <= set(event['url'].rsplit('/', 1)[1]
+                                                                     for event in files)
+    listings = [event for event in events if event['event'] == 'listing']
+    #  Each directory is fetched once, and taken from the cache after that
+    fetched_listings = [event['url'] for event in listings if not event['cached']]
+    assert len(fetched_listings) == sum(path.endswith('/') for _, path in naif.requests)
+    assert len(set(fetched_listings)) == len(fetched_listings)
+    assert all(event['entries'] > 0 for event in listings)
+
+    summary = log.summarize()
+    assert summary['fetched'] == len(files)
+    assert summary['bytes'] == 100 * len(files)
+    assert summary['skipped'] == {} and summary['failed'] == 0 and summary['retries'] == 0
+    assert summary['listings_fetched'] == len(fetched_listings)
+    assert summary['listings_cached'] == len(listings) - len(fetched_listings)
+    assert set(summary['phases']) == set(starts)
+    assert len(summary['slowest_files']) == min(5, len(files))
+
+    #  A second sync has nothing to fetch
+    summary = _sync(naif, tmp_path).summarize()
+    assert summary['fetched'] == 0
+    assert sum(summary['skipped'].values()) == len(files)
+
+def test_retries_and_failures(naif, tmp_path):
+    name = 'JUNO/kernels/spk/spk_rec_110805_110808_110904.bsp'
+    make_FakeNAIFTree(tmp_path / 'naif', {name: 10000})
+    naif.interrupt_after = 4000
+    log = EventLog()
+    with event_Sinks(log), KernelDownloader(show_progress=False, retry_backoff=0., max_retries=5) as downloader:
+        downloader.wait([downloader.download(naif.baseurl + name, tmp_path / 'a.bsp')])
+        with pytest.raises(urllib.error.HTTPError):
+            downloader.wait([downloader.download(naif.baseurl + 'JUNO/missing.bsp', tmp_path / 'b.bsp')])
+
+    retries = [event for event in log.events if event['event'] == 'retry']
+    assert [event['attempt'] for event in retries] == [1, 2]
+    assert all(event['url'] == naif.baseurl + name and event['delay'] == 0. for event in retries)
+    fetched, failed = [event for event in log.events if event['event'] == 'file']
+    assert fetched['outcome'] == 'fetched' and fetched['attempts'] == 3 and fetched['bytes'] == 10000
+    assert failed['outcome'] == 'failed' and failed['url'].endswith('missing.bsp')
+    summary = log.summarize()
+    assert (summary['fetched'], summary['failed'], summary['retries']) == (1, 1, 2)
+
+def test_phase_errors_are_recorded():
+    log = EventLog()
+    with event_Sinks(log):
+        with pytest.raises(KeyError):
+            with span_Phase('sync', kind='generic') as span:
+                span['files'] = 3
+                raise KeyError('x')
+    start, end = log.events
+    assert start == {'event': 'phase_start', 'time': start['time'], 'thread': start['thread'], 'phase': 'sync',
+                     'kind': 'generic'}
+    assert end['error'] == repr(KeyError('x'))
+    assert end['files'] == 3
+
+def test_sinks_are_removed_after_the_block():
+    assert not has_EventSinks()
+    log = EventLog()
+    with event_Sinks(log):
+        assert has_EventSinks()
+        emit_Event('listing', url='a')
+    emit_Event('listing', url='b')
+    assert [event['url'] for event in log.events] == ['a']
+    assert not has_EventSinks()
+
+def test_failing_sinks_warn():
+    def broken(event):
+        raise RuntimeError('full')
+    log = EventLog()
+    with event_Sinks(broken, log):
+        with pytest.warns(UserWarning, match='full'):
+            emit_Event('retry', url='a', attempt=1)
+    #  The other sinks still get the event
+    assert len(log.events) == 1
+
+def test_json_lines(tmp_path):
+    sink = JSONLinesSink(tmp_path / 'events.jsonl')
+    with event_Sinks(sink):
+        emit_Event('file', url='a', filepath=tmp_path / 'a', outcome='fetched')
+        emit_Event('file', url='b', outcome='skipped')
+    sink.close()
+    lines = (tmp_path / 'events.jsonl').read_text().splitlines()
+    events = [json.loads(line) for line in lines]
+    assert [event['url'] for event in events] == ['a', 'b']
+    assert events[0]['filepath'] == str(tmp_path / 'a')
+
+def test_environment_variable(tmp_path, monkeypatch):
+    filepath = tmp_path / 'events.jsonl'
+    monkeypatch.setenv(sync_events.EVENTS_ENVIRONMENT_VARIABLE, str(filepath))
+    assert has_EventSinks()
+    emit_Event('listing', url='a', cached=True)
+    sink, = sync_events._sinks
+    sink.close()
+    assert json.loads(filepath.read_text())['url'] == 'a'
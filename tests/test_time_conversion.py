@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+spice = pytest.importorskip('spiceypy')
+
+from time_conversion import LeapSecondsKernel
+
+LSK = r"""KPL/LSK
+\begindata
+DELTET/DELTA_T_A = 32.184
+DELTET/K = 1.657D-3
+DELTET/EB = 1.671D-2
+DELTET/M = ( 6.239996D0 1.99096871D-7 )
+DELTET/DELTA_AT = ( 10, @1972-JAN-1
+                    11, @1972-JUL-1
+                    12, @1973-JAN-1
+                    36, @2015-JUL-1
+                    37, @2017-JAN-1 )
+\begintext
+"""
+
+TIMES = ['1950-06-01T00:00:00.250000', '1971-12-31T12:00:00', '1971-12-31T23:59:59.500000',
+         '1972-01-01T00:00:00', '1972-03-01T06:30:00.125000', '1972-06-30T23:59:59',
+         '1972-07-01T00:00:00', '2000-01-01T12:00:00', '2016-12-31T23:59:59.999000',
+         '2017-01-01T00:00:00', '2030-05-17T08:00:00.000001']
+
+@pytest.fixture
+def lsk(tmp_path):
+    filepath = tmp_path / 'test.tls'
+    filepath.write_text(LSK)
+    spice.kclear()
+    spice.furnsh(str(filepath))
+    yield(LeapSecondsKernel(filepath))
+    spice.kclear()
+
+def test_utc_to_ET_matches_str2et(lsk):
+    expected = np.array([spice.str2et(time) for time in TIMES])
+    ets = lsk.utc_to_ET(np.array(TIMES, dtype='datetime64[ns]'))
+    assert np.allclose(ets, expected, rtol=0, atol=1e-6)
+
+def test_et_to_UTC_matches_et2utc(lsk):
+    ets = np.array([spice.str2et(time) for time in TIMES])
+    expected = np.array([spice.et2utc(et, 'ISOC', 6) for et in ets], dtype='datetime64[ns]')
+    assert np.all(np.abs(lsk.et_to_UTC(ets) - expected) <= np.timedelta64(1000, 'ns'))
+
+def test_leap_seconds_match_SPICE(lsk):
+    #  Including the leap second SPICE puts at the end of 1971, before the
+    #  table starts
+    for leap_second in ['1971-12-31T23:59:60.500000', '1972-06-30T23:59:60.250000', '2016-12-31T23:59:60.750000']:
+        et = spice.str2et(leap_second)
+        assert spice.et2utc(et, 'ISOC', 6) == leap_second
+        times, leap = lsk.et_to_UTC(np.array([et - 1., et, et + 1.]), return_leap_seconds=True)
+        assert list(leap) == [False, True, False]
+        #  Shown as a repeat of 23:59:59
+        repeat = np.datetime64(leap_second.replace(':60.', ':59.'), 'ns')
+        assert np.all(np.abs(times[:2] - repeat) <= np.timedelta64(1000, 'ns'))
+        assert np.allclose(lsk.utc_to_ET(times[2:]), [et + 1.], rtol=0, atol=1e-6)